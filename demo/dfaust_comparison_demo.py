@@ -23,6 +23,7 @@ import __init__
 from src import skinning
 from src.kinematics import inverse_kinematics
 from src.helper_handler import HelperBonesHandler
+from src.simulation.differentiable import DifferentiableHelperRig, fit_helper_parameters
 from src.utils.linalg_utils import normalize_arr_np
 from src.data.skeleton_data import get_smpl_skeleton
 from src.skeleton import create_skeleton, add_helper_bones, extract_headtail_locations
@@ -56,6 +57,10 @@ DAMPING = 10 #50.
 MASS_DSCALE = 0.2        # Scales mass velocity (Use [0.0, 1.0] range to slow down)
 SPRING_DSCALE = 3.0     # Scales spring forces (increase for more jiggling)
 
+FIT_PARAMETERS = False  # Set true to fit the helper mass, stiffness and damping to DFAUST with gradient descent before simulating
+FIT_EPOCHS = 20
+FIT_WINDOW = 12         # Frames of a truncated backpropagation window
+
 ALGO = "T" # T or RST, if T is selected, only translations will be concerned. Note that RST fails at current stage. TODO: investigate it.
 ERR_MODE = "SMPL" # "DFAUST" or "SMPL", determines which mesh to take as reference for error distances
 err_cmap = cm.jet #winter, jet, brg, gnuplot2, autumn, viridis or see https://matplotlib.org/stable/users/explain/colors/colormaps.html
@@ -172,7 +177,7 @@ prev_V = V_smpl[0]
 
 n_bones = len(skeleton.rest_bones)
 n_bones_rigid = n_bones - len(helper_idxs)
-for frame in range(n_frames):
+def get_rigidly_posed_locations(frame):
     # WARNING:I'm using pose parameters in the dataset to apply FK for helper bones
     # but when the bones are actually posed with these parameters, the skeleton 
     # is not the same as the provided joint locations from the SMPL model. That is
@@ -198,6 +203,21 @@ for frame in range(n_frames):
     # (Try to comment the couple lines right below this to see the effect.)
     smpl_J_frame = extract_headtail_locations(J[frame], smpl_kintree, exclude_root=False)
     rigidly_posed_locations[:len(smpl_J_frame)] = smpl_J_frame 
+    return rigidly_posed_locations
+
+if FIT_PARAMETERS:
+    # Fit the helper parameters to the ground truth, starting from the config values
+    assert INTEGRATION == "PBD", "Expected PBD integration to fit the helper parameters."
+    fit_rig = DifferentiableHelperRig(helper_rig)
+    rigid_locations = np.array([get_rigidly_posed_locations(frame) for frame in range(n_frames)])
+    fit_helper_parameters(fit_rig, rigid_locations, V_smpl, V_gt, helper_W, n_epochs=FIT_EPOCHS, 
+                          window=FIT_WINDOW, algorithm=ALGO, rest_locations=rest_bone_locations,
+                          jiggle_scale=JIGGLE_SCALE, normalize_weights=NORMALIZE_WEIGHTS)
+    helper_rig.set_parameters(**fit_rig.get_parameters())
+    print(">> Fitted helper stiffnesses: ", np.round(helper_rig.get_parameters()["stiffness"], 2))
+
+for frame in range(n_frames):
+    rigidly_posed_locations = get_rigidly_posed_locations(frame)
     
     # 1.1 - Compute dynamic joint locations via simulation
     dyn_posed_locations = helper_rig.update_bones(rigidly_posed_locations) # Update the rigidly posed locations
@@ -12,6 +12,7 @@ import pyvista as pv
 
 import __init__
 from src.mass_spring import MassSpringSystem
+from src.simulation.stability import SubstepController
         
 # -------------------------------- MAIN ---------------------------------------
 # -----------------------------------------------------------------------------
@@ -38,33 +39,24 @@ lattice_faces = lattice_mesh[3]
 # Create masses. Connect masses together. Fixate some of the masses
 # -----------------------------------------------------------------------------
 # Initiate a mass spring system container
-TIME_STEP = 1. / 30 # Time step of 1/24 is too large for the system, make it at least 30 frames per second.
-DAMPING = 5.0       # Setting it 0.0 or more than 25.0 explodes the system.
+TIME_STEP = 1. / 24 # The substep controller splits the frame if it's too large for the stiffness and damping.
+DAMPING = 5.0       # Setting it 0.0 explodes the system, large values take more substeps.
 SPRING_DSCALE = 1.0 # This is for scaling the spring force, better be set to 1.0 for no scale (it's handy for finetuning sometimes).
 GRAVITY = [0.0, -9.81, 0.0]
 
-# Initiate the mass spring system
-mass_spring_system = MassSpringSystem(TIME_STEP)
-
-# Add masses at vertex locations
-n_masses = lattice_verts.shape[0]
-for i in range(n_masses):
-    mass_spring_system.add_mass(mass_coordinate=lattice_verts[i], mass=m, gravity=GRAVITY)
-
-# Add springs at the edges
-for face in lattice_faces:
-    for f in range(len(face)-1):
-        # For stability, either increase it to 10~ if the system is not moving, 
-        # or decrease it < 1.0 if the system is overflowing
-        # In this test, try setting it 0.25, you'll see how system overflows slowly 
-        mass_spring_system.connect_masses(int(face[f]), int(face[f+1]), 
-                                          stiffness=k, 
-                                          dscale=SPRING_DSCALE,
-                                          damping=DAMPING)
-
-# Fix certain masses' motion
-for idx in fixed_pts:
-    mass_spring_system.fix_mass(idx-1)
+# Initiate the mass spring system with masses at vertex locations and springs
+# at the unique edges, then fix certain masses' motion (indices are 1-based in json)
+# For stability, either increase stiffness to 10~ if the system is not moving, 
+# or decrease it < 1.0 if the system is overflowing
+# In this test, try setting it 0.25, you'll see how system overflows slowly 
+mass_spring_system = MassSpringSystem.from_mesh(lattice_verts, lattice_faces, TIME_STEP,
+                                                mass=m,
+                                                stiffness=k,
+                                                damping=DAMPING,
+                                                spring_dscale=SPRING_DSCALE,
+                                                gravity=GRAVITY,
+                                                fixed_idxs=np.array(fixed_pts) - 1,
+                                                substep_controller=SubstepController())
 
 # -----------------------------------------------------------------------------
 # Create renderer
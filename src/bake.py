@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 09:27:51 2026
+
+Offline bake of helper rig animations. The rig is simulated once over the
+animation, i.e. Forward Kinematics, HelperBonesHandler.update_bones() and the
+transformation inference of the helpers, and the bone transformations of
+every frame are stored. They're tiny compared with the mesh vertices, which
+are reconstructed from them with Linear Blend Skinning at playback, so
+renders and comparisons only pay for the skinning.
+
+The bakes can be saved in a cache directory under the hash of everything
+that determines them: the skeleton, the helper rig settings, parameters and
+state, the colliders, the substep controller, the animation and the
+transformation algorithm. A later bake with the same inputs loads the file
+instead of simulating.
+
+@author: bartu
+"""
+import os
+import hashlib
+import numpy as np
+
+from . import skinning
+from .global_vars import VERBOSE
+from .kinematics import inverse_kinematics
+from .utils.linalg_utils import get_transform_mats_from_quat_rots
+
+def _per_frame(values, n_frames, shape):
+    # Broadcast values shared by the frames to shape (n_frames, *shape)
+    values = np.asarray(values, dtype=float)
+    if values.shape == shape: values = np.broadcast_to(values, (n_frames,) + shape)
+    assert values.shape == (n_frames,) + shape, f"Expected shape {shape} or {(n_frames,) + shape}, got {values.shape}."
+    return values
+
+def _hash_settings(digest, obj, skip=()):
+    # Class and attributes of a collider or a substep controller, arrays by
+    # their values and the rest by their repr
+    digest.update(type(obj).__name__.encode())
+    for name, value in sorted(vars(obj).items()):
+        if name in skip: continue
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray): digest.update(np.ascontiguousarray(value, dtype=np.float64).tobytes())
+        else: digest.update(repr(value).encode())
+
+def get_bake_key(handler, thetas, translations=None, degrees=False, algorithm="RST"):
+    """
+    Content hash of a bake, see BakedHelperAnimation.bake() for the parameters.
+    It covers the skeleton, the helper rig settings, its parameters and
+    simulation state, the collisions and the substep controller, the 
+    animation and the algorithm.
+    """
+    skeleton, simulator = handler.skeleton, handler.simulator
+    n_frames, n_bones = len(thetas), len(skeleton.rest_bones)
+    if translations is None: translations = np.zeros((n_bones, 3))
+
+    parents = [-1 if bone.parent is None else bone.parent.idx for bone in skeleton.rest_bones]
+    settings = (simulator.integration_mode, simulator.dt, simulator.edge_constraint, simulator.constraint_solver,
+                simulator.relaxation, simulator.substeps, simulator.iterations, simulator.tolerance,
+                simulator.sleep_threshold, simulator.dtype, simulator.backend, simulator.self_collision,
+                handler.compliance, handler.compliance_ours, handler.FIXED_SCALE, degrees, algorithm)
+    parameters = handler.get_parameters()
+
+    digest = hashlib.sha1()
+    arrays = [np.array(skeleton.get_rest_bone_locations(exclude_root=False)), parents, handler.helper_idxs,
+              simulator.rest_lengths, simulator.radii, simulator.gravities, handler.snapshot(), thetas,
+              _per_frame(translations, n_frames, (n_bones, 3))]
+    arrays += [parameters[name] for name in sorted(parameters)]
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    digest.update(repr(settings).encode())
+
+    # Bone colliders follow the rigid bones at every frame, only their radii
+    # matter. Other colliders stay where they are during the bake.
+    if handler.bone_colliders is not None:
+        _hash_settings(digest, handler.bone_colliders, skip=("starts", "ends", "bvh", "contacts"))
+        digest.update(np.ascontiguousarray(handler.collider_idxs, dtype=np.float64).tobytes())
+    for collider in simulator.colliders:
+        if collider is not handler.bone_colliders: _hash_settings(digest, collider, skip=("bvh", "contacts"))
+    if simulator.substep_controller is not None:
+        _hash_settings(digest, simulator.substep_controller, skip=("last_substeps",))
+    return digest.hexdigest()
+
+class BakedHelperAnimation:
+    def __init__(self, locations, transforms, helper_idxs, key=None):
+        """
+        Baked animation of a helper rig.
+
+        Parameters
+        ----------
+        locations : np.ndarray
+            Simulated bone locations of every frame, 2 joints per bone, has
+            shape (n_frames, 2 * n_bones, 3).
+        transforms : np.ndarray
+            Absolute 4x4 bone transformations of every frame, has shape
+            (n_frames, n_bones, 4, 4). Rigid bones have their Forward Kinematics
+            transformations and helper bones the inferred ones.
+        helper_idxs : np.ndarray
+            Bone indices of the helpers.
+        key : str, optional
+            Content hash of the bake, see get_bake_key(). The default is None.
+        """
+        self.locations = np.asarray(locations)
+        self.transforms = np.asarray(transforms)
+        self.helper_idxs = np.asarray(helper_idxs, dtype=int)
+        self.key = key
+        assert len(self.locations) == len(self.transforms), "Expected locations and transforms for every frame."
+
+    @property
+    def n_frames(self):
+        return len(self.transforms)
+
+    @classmethod
+    def bake(cls, handler, thetas, translations=None, degrees=False, algorithm="RST",
+             cache_dir=None, verbose=VERBOSE):
+        """
+        Simulate the helper rig over the animation and store the bone
+        transformations of every frame. The simulation starts from the current
+        state of the handler, that is restored at the end together with the
+        state of the substep controller, so baking doesn't change the handler.
+
+        Parameters
+        ----------
+        handler : HelperBonesHandler
+            Helper rig to simulate.
+        thetas : np.ndarray
+            Relative bone rotations of every frame, has shape (n_frames, n_bones, 3),
+            see Skeleton.pose_bones().
+        translations : np.ndarray, optional
+            Relative bone translations, either shared by the frames with shape
+            (n_bones, 3) or for every frame with shape (n_frames, n_bones, 3).
+            If None, zero translations. The default is None.
+        degrees : bool, optional
+            If True, the rotations are in degrees. The default is False.
+        algorithm : str, optional
+            Transformation inference of the helpers, "RST", "SVD" or "T", see
+            kinematics.inverse_kinematics.get_absolute_transformations(). The
+            default is "RST".
+        cache_dir : str, optional
+            If given, the bake is saved there under its content hash, and
+            loaded back at the next call with the same inputs. The default is None.
+
+        Returns
+        -------
+        BakedHelperAnimation
+        """
+        thetas = np.asarray(thetas, dtype=float)
+        key, path = None, None
+        if cache_dir is not None:
+            key = get_bake_key(handler, thetas, translations, degrees, algorithm)
+            path = os.path.join(cache_dir, f"bake_{key}.npz")
+            if os.path.exists(path):
+                if verbose: print(f">> Loaded baked animation from {path}")
+                return cls.load(path)
+
+        skeleton = handler.skeleton
+        n_frames, n_bones = len(thetas), len(skeleton.rest_bones)
+        translations = _per_frame(np.zeros((n_bones, 3)) if translations is None else translations, n_frames, (n_bones, 3))
+
+        helper_rows = np.stack([2 * handler.helper_idxs, 2 * handler.helper_idxs + 1], axis=-1).ravel()
+        rest_locations = np.array(skeleton.get_rest_bone_locations(exclude_root=False))[helper_rows]
+
+        locations = np.empty((n_frames, 2 * n_bones, 3))
+        transforms = np.empty((n_frames, n_bones, 4, 4))
+        state = handler.snapshot()
+        controller = handler.simulator.substep_controller
+        controller_state = None if controller is None else dict(vars(controller))
+        try:
+            for frame in range(n_frames):
+                rigidly_posed_locations, abs_rot_quat, abs_trans = skeleton.pose_bones(thetas[frame], translations[frame],
+                                                                                       get_transforms=True, degrees=degrees)
+                transforms[frame] = get_transform_mats_from_quat_rots(abs_trans, abs_rot_quat)
+                locations[frame] = handler.update_bones(np.array(rigidly_posed_locations))
+                transforms[frame, handler.helper_idxs] = inverse_kinematics.get_absolute_transformations(rest_locations,
+                                                                                                         locations[frame, helper_rows],
+                                                                                                         return_mat=True,
+                                                                                                         algorithm=algorithm,
+                                                                                                         dtype=np.float64)
+        finally:
+            handler.restore(state)
+            if controller is not None: vars(controller).update(controller_state)
+
+        baked = cls(locations, transforms, handler.helper_idxs, key)
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            baked.save(path)
+            if verbose: print(f">> Saved baked animation to {path}")
+        return baked
+
+    def save(self, path):
+        np.savez(path, locations=self.locations, transforms=self.transforms, helper_idxs=self.helper_idxs,
+                 key="" if self.key is None else self.key)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["locations"], data["transforms"], data["helper_idxs"], str(data["key"]) or None)
+
+    def get_transforms(self, frame, exclude_root=True):
+        """
+        Get the bone transformations of the frame, has shape (n_bones, 4, 4),
+        or (n_bones - 1, 4, 4) without the root bone.
+        """
+        return self.transforms[frame, 1:] if exclude_root else self.transforms[frame]
+
+    def get_bone_locations(self, frame, exclude_root=True):
+        """
+        Get the simulated bone locations of the frame, 2 joints per bone.
+        """
+        return self.locations[frame, 2:] if exclude_root else self.locations[frame]
+
+    def deform(self, frame, V_rest, W, use_normalized_weights=True, exclude_root=True, dtype=None):
+        """
+        Reconstruct the mesh vertices of the frame with Linear Blend Skinning,
+        see skinning.LBS_from_mat(). W has a column per bone, excluding the
+        root bone if exclude_root is True.
+        """
+        return skinning.LBS_from_mat(V_rest, W, self.get_transforms(frame, exclude_root),
+                                     use_normalized_weights=use_normalized_weights, dtype=dtype)
@@ -15,6 +15,11 @@ HOMO_COORD = False  # Adds 1 to the transformation dimensions if True
 # WARNING: This is not used in every function yet
 VERBOSE = True        
 
+# Default floating point precision of the simulation, skinning and kinematics
+# arrays, either "float64" or "float32". See utils/precision.py to change it 
+# at runtime or to override it per object.
+FLOAT_DTYPE = "float64"
+
 # TODO: why don't you use os.path...? 
 ABS_PATH = "/Users/bartu/Documents/Github/Spring-Decomp/"
 RESULT_PATH = ABS_PATH + "results/"
@@ -15,12 +15,23 @@ from numpy import linalg as LA
 
 from .skeleton import Skeleton, Bone
 from .mass_spring import MassSpringSystem
+from .simulation.ensemble import EnsembleMassSpringSystem
+from .simulation.colliders import CapsuleColliders
+
+def _per_helper(values, n_helper):
+    # Broadcast a scalar or a value per helper to shape (n_helper, )
+    values = np.asarray(values, dtype=float)
+    assert values.ndim == 0 or values.shape == (n_helper,), f"Expected a scalar or {n_helper} values, got shape {values.shape}."
+    return np.broadcast_to(values, (n_helper,))
 
 class HelperBonesHandler:
     
-    # TODO: We should be able to change the individual masses and stiffness, 
-    # for optimization we should be able to provide an array of particle mass
-    # that will update the individual Particle.mass in the system
+    _PARAMETER_ARRAYS = {"mass"          : "particle_masses",
+                         "mass_dscale"   : "mass_dscales",
+                         "stiffness"     : "stiffnesses",
+                         "damping"       : "dampings",
+                         "spring_dscale" : "spring_dscales"}
+    
     def __init__(self, 
                  skeleton, 
                  helper_idxs, 
@@ -33,8 +44,17 @@ class HelperBonesHandler:
                  simulation_mode="PBD",
                  fixed_scale=False,
                  edge_constraint=False,
-                 compliance=0.0, # Only works for PBD
-                 compliance_ours=0.0 
+                 compliance=0.0, # Only works for PBD and XPBD
+                 compliance_ours=0.0,
+                 substeps=1,     # Only works for XPBD
+                 iterations=1,   # Only works for XPBD
+                 backend="numpy", # Kernels of the simulator, NUMPY or NUMBA
+                 sleep_threshold=None, # Let the still helpers sleep, see MassSpringSystem
+                 n_threads=1,    # Threads of the constraint projection with NUMBA
+                 substep_controller=None, # Adaptive substeps, see simulation.stability
+                 dtype=None,     # Floating point type of the simulation, see utils.precision
+                 self_collision=False, # Keep the helper tips from overlapping, only works for PBD and XPBD
+                 bone_colliders=None # Capsule radius of the rigid bones, keeps the helper tips out of them in PBD and XPBD
                  ):
         """
         Create a mass-spring system provided an array of Bone objects.
@@ -46,6 +66,16 @@ class HelperBonesHandler:
         If 0, the default simulation is used. If 1, point-spring simulation
         will be used. Please do not use simulation_mode=1 if there's no point
         springs.
+        
+        The physical parameters mass, stiffness, damping, mass_dscale and 
+        spring_dscale are either a scalar shared by the helpers or an array of
+        shape (n_helper, ) with a value per helper, in the order of helper_idxs.
+        They can be changed later with set_parameters().
+        
+        If bone_colliders is set, the rigid bones are capsules with that radius
+        (a scalar or a radius per bone), that follow the rigid skeleton in 
+        update_bones(). The root bone, the helper bones and the bones that
+        carry a helper are left out, since the helper tips start inside them.
         """
         # ---------------------------------------------------------------------
         # Precomputation type checks
@@ -61,10 +91,14 @@ class HelperBonesHandler:
         
         self.POINT_SPRINGS = point_spring
         self.compliance = compliance
-        if compliance and simulation_mode != "PBD" : print(f">> WARNING: Complience is set but simulation mode {simulation_mode} is not PBD, compliance will have no effect.")
+        if compliance and simulation_mode not in ("PBD", "XPBD") : print(f">> WARNING: Complience is set but simulation mode {simulation_mode} is not PBD, compliance will have no effect.")
         
         self.helper_idxs = np.array(helper_idxs, dtype=int)
-        self.simulator = MassSpringSystem(dt, mode=simulation_mode, edge_constraint=edge_constraint)
+        self.simulator = MassSpringSystem(dt, mode=simulation_mode, edge_constraint=edge_constraint,
+                                          substeps=substeps, iterations=iterations, backend=backend,
+                                          sleep_threshold=sleep_threshold, n_threads=n_threads,
+                                          substep_controller=substep_controller, dtype=dtype,
+                                          self_collision=self_collision)
         self.FIXED_SCALE = fixed_scale
         self.compliance_ours = compliance_ours
 
@@ -72,23 +106,25 @@ class HelperBonesHandler:
         self.helper_lengths = []
         helper_bones = np.array(skeleton.rest_bones)[helper_idxs]
         n_helper = len(helper_bones)
+        mass, stiffness, damping = [_per_helper(values, n_helper) for values in (mass, stiffness, damping)]
+        mass_dscale, spring_dscale = _per_helper(mass_dscale, n_helper), _per_helper(spring_dscale, n_helper)
         for i in range(n_helper):
             helper_start = helper_bones[i].start_location
             helper_end = helper_bones[i].end_location
             self.helper_lengths.append(np.linalg.norm(helper_end - helper_start))
             
             if point_spring: # Add zero-length springs at the tip of the helper bone
-                free_mass = self.simulator.add_mass(helper_end, mass=mass, dscale=mass_dscale)
-                fixed_mass = self.simulator.add_mass(helper_end, mass=mass, dscale=mass_dscale)
+                free_mass = self.simulator.add_mass(helper_end, mass=mass[i], dscale=mass_dscale[i])
+                fixed_mass = self.simulator.add_mass(helper_end, mass=mass[i], dscale=mass_dscale[i])
             else:            # Make the helper bone itself a spring
-                free_mass = self.simulator.add_mass(helper_end, mass=mass, dscale=mass_dscale)
-                fixed_mass = self.simulator.add_mass(helper_start, mass=mass, dscale=mass_dscale)
+                free_mass = self.simulator.add_mass(helper_end, mass=mass[i], dscale=mass_dscale[i])
+                fixed_mass = self.simulator.add_mass(helper_start, mass=mass[i], dscale=mass_dscale[i])
 
             self.simulator.connect_masses(free_mass, 
                                           fixed_mass, 
-                                          stiffness = stiffness, 
-                                          damping   = damping,
-                                          dscale    = spring_dscale)
+                                          stiffness = stiffness[i], 
+                                          damping   = damping[i],
+                                          dscale    = spring_dscale[i])
             self.simulator.fix_mass(fixed_mass) # Fix the mass that's added to the tip
             
             # Print warnings if the settings are conflicting.
@@ -108,6 +144,20 @@ class HelperBonesHandler:
  
         self.fixed_idxs = self.simulator.fixed_indices
         self.free_idxs = self.simulator.get_free_mass_indices()
+        self.spring_idxs = np.arange(n_helper) # A spring per helper, in the order of helper_idxs
+        
+        self.collider_idxs = None
+        self.bone_colliders = None
+        if bone_colliders is not None:
+            n_bones = len(skeleton.rest_bones)
+            excluded = set(self.helper_idxs.tolist()) | {0}
+            excluded |= {skeleton.rest_bones[i].parent.idx for i in self.helper_idxs if skeleton.rest_bones[i].parent is not None}
+            self.collider_idxs = np.array([i for i in range(n_bones) if i not in excluded], dtype=int)
+            
+            radii = np.broadcast_to(np.asarray(bone_colliders, dtype=float), (n_bones,))[self.collider_idxs]
+            rest_locations = np.array(skeleton.get_rest_bone_locations(exclude_root=False))
+            self.bone_colliders = CapsuleColliders.from_bone_locations(rest_locations, radii, self.collider_idxs)
+            self.simulator.add_collider(self.bone_colliders)
         
         # ---------------------------------------------------------------------
         # Post-computation sanity checks 
@@ -115,58 +165,150 @@ class HelperBonesHandler:
         assert len(self.free_idxs) == n_helper, f"Expected each jiggle bone to have a single \
                                                  free mass. Got {len(self.free_idxs)} masses \
                                                  for {n_helper} jiggle bones."
+
+        self._compile_rig()
+    
+    def _compile_rig(self):
+        """
+        Precompute the index arrays of update_bones(), so that a frame update
+        is a few array operations per kinematic level instead of loops over 
+        the helpers.
+        
+        The helpers are sorted into levels with a breadth first search over the
+        skeleton, where the level of a helper is the number of helpers above 
+        it. The levels are updated one after another, so that a helper of a 
+        chain is anchored at the simulated tip of its parent helper. Every 
+        level moves the bones below its helpers along with the simulated tips,
+        a tree depth at a time.
+        """
+        self.helper_lengths = np.asarray(self.helper_lengths, dtype=float)
+        self._helper_start_rows = 2 * self.helper_idxs # Bone locations have 2 joints per bone
+        self._helper_end_rows = 2 * self.helper_idxs + 1
+        
+        bones = self.skeleton.rest_bones
+        helper_positions = {int(helper_idx) : i for i, helper_idx in enumerate(self.helper_idxs)}
+        helper_levels = np.zeros(len(self.helper_idxs), dtype=int)
+        queue = [(bone, 0) for bone in bones if bone.parent is None]
+        while queue:
+            bone, n_above = queue.pop(0)
+            if bone.idx in helper_positions:
+                helper_levels[helper_positions[bone.idx]] = n_above
+                n_above += 1
+            queue.extend((child, n_above) for child in bone.children)
+        
+        # Every level has its helpers, and for every depth of the bones below
+        # them the end row of the parent, the start row of the child and its 
+        # offset to the parent.
+        self._levels = []
+        for level in range(helper_levels.max() + 1 if len(helper_levels) else 0):
+            helpers = np.flatnonzero(helper_levels == level)
+            fixups = []
+            parents = [bones[idx] for idx in self.helper_idxs[helpers]]
+            while parents:
+                children = [(parent, child) for parent in parents for child in parent.children]
+                if not children: break
+                parent_rows = np.array([2 * parent.idx + 1 for parent, _ in children], dtype=int)
+                child_rows = np.array([2 * child.idx for _, child in children], dtype=int)
+                child_offsets = np.array([child.t for _, child in children], dtype=float).reshape(-1, 3)
+                fixups.append((parent_rows, child_rows, child_offsets))
+                parents = [child for _, child in children]
+            self._levels.append((helpers, fixups))
+        
+        # Levels are simulated one after another if the integrator can simulate 
+        # a subset of the helpers, else all at once from the rigid skeleton. 
+        # The fixed masses follow the joint they're placed at, on every level:
+        # the bone tip with point springs, else the bone start. The starts of
+        # the chained helpers are the simulated tips of their parents.
+        self._anchor_rows = self._helper_end_rows if self.POINT_SPRINGS else self._helper_start_rows
+        mode = self.simulator.integration_mode.upper()
+        if len(self._levels) > 1 and mode not in MassSpringSystem._SUBSET_MODES:
+            print(f">> WARNING: Chained helpers are simulated from the rigid skeleton with {mode} integration.")
+            self._passes = [(np.arange(len(self.helper_idxs)), self._anchor_rows, self._levels)]
+        else:
+            self._passes = [(helpers, self._anchor_rows[helpers], [(helpers, fixups)]) for helpers, fixups in self._levels]
     
-    def _preserve_bone_length(self, bone_start : np.ndarray,  
-                                free_mass_idx  : int, 
-                                original_length : float,
-                                comp = 0.0):
+    def _preserve_bone_lengths(self, bone_starts, free_mass_idxs, original_lengths, comp=0.0):
         """
-        Given the original length and start-end locations of the bone, rescale 
-        the bone vector to its original length. The scaling is done at the bone 
-        tip. 
+        Given the original lengths and start locations of the bones, rescale 
+        the bone vectors to their original lengths. The scaling is done at the
+        bone tips, i.e. the free masses are moved.
+        
         Parameters
         ----------
-        bone_start : np.ndarray
-            3D vector of the bone start point.
-        free_mass_idx : int
-            Index of the free mass that we'll consider as the new bone length.
-        original_length : float
-            Original bone length that is from the T-pose. 
+        bone_starts : np.ndarray
+            Bone start points, has shape (n_bones, 3).
+        free_mass_idxs : np.ndarray
+            Indices of the free masses at the bone tips, has shape (n_bones, ).
+        original_lengths : np.ndarray
+            Original bone lengths that are from the T-pose, has shape (n_bones, ).
         Returns
         -------
-        adjust_vec : TYPE
-            DESCRIPTION.
+        adjust_vecs : np.ndarray
+            Translations of the free masses, has shape (n_bones, 3).
+        new_endpoints : np.ndarray
+            New locations of the free masses, has shape (n_bones, 3).
         """
-    
-        assert type(free_mass_idx) is int or np.int64, f"Expected free mass type int, got {type(free_mass_idx)}"
-    
-        free_mass = self.simulator.masses[free_mass_idx] 
-        assert free_mass.mass > 1e-18, f"Expected free mass to have a weight greater than zero, got mass {free_mass.mass}."
-    
-        direction = bone_start - free_mass.center
-        d_norm = np.linalg.norm(direction) # TODO: dir_norm would be a better name
+        assert np.all(self.simulator.particle_masses[free_mass_idxs] > 1e-18), "Expected free masses to have a weight greater than zero."
+        
+        # Change the free mass locations aligned with the bone lengths.
+        complied_orig_lengths = original_lengths * np.exp(comp)
+        adjust_vecs, new_endpoints = self.simulator.kernels.preserve_bone_lengths(self.simulator.positions, bone_starts,
+                                                                                  free_mass_idxs, complied_orig_lengths)
         
-        #if d_norm < 1e-8:
-        #    direction += np.array([0.01, 0.01, 0.01]) # fix for point handles case
-        #    d_norm = np.linalg.norm(direction) 
-        complied_orig_length = original_length * np.exp(comp)
-        scale = d_norm - complied_orig_length # TODO: Horrible naming! This isn't scale but difference.
-                                        
-        if d_norm > 1e-20:
-            adjust_vec = (direction/d_norm) * scale # Normalize direction and scale it
-        else:
-            print(">> WARNING: Found zero-length norm")
-            adjust_vec = direction * scale # zero vector
-            
-        # Change the free mass location aligned with the bone length.
-        self.simulator.masses[free_mass_idx].center = free_mass.center + adjust_vec
-    
         # Sanity check
-        new_length = np.linalg.norm(bone_start - self.simulator.masses[free_mass_idx].center)
-        assert np.abs(new_length - complied_orig_length) < 1e-4, f"Expected the adjustment function to preserve original bone lengths got length {new_length} instead of {complied_orig_length}." 
-    
-        return adjust_vec, self.simulator.masses[free_mass_idx].center
+        new_lengths = np.linalg.norm(bone_starts - new_endpoints, axis=-1)
+        assert np.all(np.abs(new_lengths - complied_orig_lengths) < 1e-4), f"Expected the adjustment function to preserve original bone lengths got lengths {new_lengths} instead of {complied_orig_lengths}." 
+        
+        return adjust_vecs, new_endpoints
 
+    def _move_anchors(self, fixed_idxs, translate_vecs):
+        fixed_locations = self.simulator.positions[fixed_idxs] + translate_vecs
+        self.simulator.set_kinematic_positions(fixed_idxs, fixed_locations)
+        
+    def _simulate_helpers(self, dt, free_idxs=None):
+        self.simulator.simulate(dt, alpha=self.compliance, mass_idxs=free_idxs)
+        
+    def _get_tip_locations(self, free_idxs):
+        return self.simulator.positions[free_idxs]
+    
+    def _propagate_levels(self, simulated_locations, dt=None):
+        """
+        Simulate the helpers level by level and move the bones below them, see
+        _compile_rig(). simulated_locations holds the rigidly posed locations,
+        and it's updated in place. Its leading axes, if any, are the copies of
+        an ensemble.
+        """
+        single_pass = len(self._passes) == 1
+        for pass_helpers, anchor_rows, levels in self._passes:
+            # Step 1 - Translate the fixed masses with their helper bones, that
+            # includes the simulated motion of the parent helpers.
+            # TODO: how to handle an offset? For now, we assume there's no offset between parent and this bone.
+            translate_vecs = simulated_locations[..., anchor_rows, :] - self.prev_sim_locations[..., anchor_rows, :]
+            self._move_anchors(self.fixed_idxs[pass_helpers], translate_vecs)
+            
+            # Step 2 - Simulate the mass spring system with the new mass locations
+            self._simulate_helpers(dt, None if single_pass else self.free_idxs[pass_helpers])
+            
+            for helpers, fixups in levels:
+                # Step 3 - Get simulated mass positions
+                end_rows = self._helper_end_rows[helpers]
+                simulated_locations[..., end_rows, :] = self._get_tip_locations(self.free_idxs[helpers])
+                
+                # Adjust the bones to preserve their original lengths (optional)
+                if self.FIXED_SCALE:
+                    bone_starts = simulated_locations[..., self._helper_start_rows[helpers], :]
+                    _, new_endpoints = self._preserve_bone_lengths(bone_starts, self.free_idxs[helpers], 
+                                                                   self.helper_lengths[helpers], comp=self.compliance_ours)
+                    simulated_locations[..., end_rows, :] = new_endpoints
+                
+                # Step 4 - Adjust the bone starting points to parent's simulated 
+                # end point, and translate the bone endpoints too, a depth at a time
+                # TODO: how about if a child has an offset? we should add it to child_bone_start
+                for parent_rows, child_rows, child_offsets in fixups:
+                    child_bone_starts = simulated_locations[..., parent_rows, :] - child_offsets
+                    translation_amounts = child_bone_starts - simulated_locations[..., child_rows, :]
+                    simulated_locations[..., child_rows, :] = child_bone_starts
+                    simulated_locations[..., child_rows + 1, :] += translation_amounts
 
     def update_bones(self, rigidly_posed_locations, dt=None):
         """
@@ -195,57 +337,11 @@ class HelperBonesHandler:
         
         if self.prev_sim_locations is None:
             self.prev_sim_locations = rigidly_posed_locations
+        if self.bone_colliders is not None:
+            self.bone_colliders.update_from_bone_locations(rigidly_posed_locations, self.collider_idxs)
         
-        # WARNING: You're taking the difference data from the rigid skeleton, but what happens
-        # if you had a chain of helper bones that are affecting each other? i.e.
-        diff = rigidly_posed_locations - self.prev_sim_locations # rigidly_posed_locations is the target. 
-        helper_end_idxs = (2 * self.helper_idxs) + 1 # bone locations have 2 joints per bone
-        translate_vec = diff[helper_end_idxs] 
-        # TODO: how to handle an offset? For now, we assume there's no offset between parent and this bone.
- 
-        # Step 1 - Translate the fixed masses at the endpoint of each helper bone
-        for i, helper_idx in enumerate(self.helper_idxs):
-            self.simulator.translate_mass(self.fixed_idxs[i], translate_vec[i])
-        
-        # Step 2 - Simulate the mass spring system with the new mass locations
-        self.simulator.simulate(dt, alpha=self.compliance)
-           
-        # Step 3 - Get simulated mass positions
-        cur_mass_locations = self.simulator.get_mass_locations()
-        free_mass_locations = cur_mass_locations[self.free_idxs] 
-        simulated_locations[helper_end_idxs] = free_mass_locations 
-        
-        # Step 4 - Adjust the bone starting points to parent's simulated end point + TODO: offset?
-        for i, helper_idx in enumerate(self.helper_idxs):            
-            bone = self.skeleton.rest_bones[helper_idx]
-            end_idx = helper_idx * 2 + 1
-            
-            # Adjust the bone to preserve its original length (optional)
-            if self.FIXED_SCALE:
-                free_idx = self.free_idxs[i]  # Warning: this assumes every bone has one free index (and one fixed) 
-                start_idx = helper_idx * 2    # TODO: could we change the data storage such that we don't have to remember to multiply by 2 every time?
-                orig_length = self.helper_lengths[i]  #* (1+self.compliance)     
-                
-                #if orig_length < 1e-8: # If point handle
-                #    orig_length += self.compliance 
-               
-                bone_start = simulated_locations[start_idx]
-                _, new_endpoint = self._preserve_bone_length(bone_start, free_idx, orig_length, comp=self.compliance_ours)
-                
-                simulated_locations[end_idx] = new_endpoint
-                
-            # Adjust the child bones' starting points
-            for child in bone.children:
-                child_start_idx = child.idx * 2
-                child_bone_start = simulated_locations[end_idx]  - child.t       # Parent's endpoint is the new start point
-                
-                previous_start = simulated_locations[child_start_idx].copy() # without copying, translation gets zero.
-                simulated_locations[child_start_idx] = child_bone_start # Save the new start location
-                # TODO: how about if a child has an offset? we should add it to child_bone_start
-                # Translate the child endpoint too
-                translation_amount = child_bone_start - previous_start
-                #if np.sum(translation_amount) > 0: print("translation: ", translation_amount)
-                simulated_locations[child_start_idx + 1] += translation_amount
+        # Steps 1-4 - Simulate the helpers level by level
+        self._propagate_levels(simulated_locations, dt)
                 
         # This part didn't work, I'll keep our kinematic constraints outside of PBD, without velocity updates.      
         # # Update final mass locations and velocities --> PBD updating velocities after constraints
@@ -266,7 +362,179 @@ class HelperBonesHandler:
         # Return checks
         # ---------------------------------------------------------------------
         return simulated_locations
+
+    def set_parameters(self, mass=None, stiffness=None, damping=None, 
+                       mass_dscale=None, spring_dscale=None):
+        """
+        Change the physical parameters of the helpers in place, e.g. between 
+        the iterations of an optimization, without rebuilding the simulator
+        or resetting its state. Every parameter is either a scalar shared by 
+        the helpers or an array of shape (n_helper, ), parameters that are 
+        None are left unchanged.
+        """
+        n_helper = len(self.helper_idxs)
+        values = {name : None if value is None else _per_helper(value, n_helper) 
+                  for name, value in zip(("mass", "stiffness", "damping", "mass_dscale", "spring_dscale"), 
+                                         (mass, stiffness, damping, mass_dscale, spring_dscale))}
+        self.simulator.set_parameters(mass_idxs=self.free_idxs, spring_idxs=self.spring_idxs, **values)
+    
+    def get_parameters(self):
+        """
+        Get the physical parameters of the helpers as a dictionary of arrays 
+        of shape (n_helper, ), with the keys of set_parameters().
+        """
+        return {name : getattr(self.simulator, array)[self._parameter_idxs(name)].copy() 
+                for name, array in self._PARAMETER_ARRAYS.items()}
+    
+    def _parameter_idxs(self, name):
+        return self.free_idxs if name in ("mass", "mass_dscale") else self.spring_idxs
+
+    @property
+    def _state_system(self):
+        # The mass-spring system that's simulated by update_bones()
+        return self.simulator
+    
+    @property
+    def _locations_shape(self):
+        return (2 * len(self.skeleton.rest_bones), 3)
+    
+    def snapshot(self, path=None):
+        """
+        Save the state of the rig, i.e. the simulation state (see 
+        MassSpringSystem.snapshot()) and the simulated bone locations of the
+        last frame, into a single flat buffer. If path is given, the buffer is
+        also saved as an .npy file.
+        """
+        has_prev = self.prev_sim_locations is not None
+        prev = self.prev_sim_locations if has_prev else np.zeros(self._locations_shape)
+        system = self._state_system
+        flag = np.array([has_prev], dtype=system.dtype) # Keeps the buffer, and the int64 header bytes of the system, in the system dtype
+        state = np.concatenate((flag, np.asarray(prev, dtype=system.dtype).ravel(), system.snapshot()))
+        if path is not None: np.save(path, state)
+        return state
+    
+    def restore(self, state, copy=True):
+        """
+        Restore the rig from a snapshot() buffer or its .npy file, e.g. to 
+        continue the animation from a saved frame. See 
+        MassSpringSystem.restore() for copy.
+        """
+        if isinstance(state, str): state = np.load(state, mmap_mode="r")
+        system = self._state_system
+        state = np.asarray(state)
         
+        n_locations = int(np.prod(self._locations_shape))
+        prev = np.array(state[1:1 + n_locations], dtype=system.dtype).reshape(self._locations_shape)
+        self.prev_sim_locations = prev if state[0] else None
+        system.restore(state[1 + n_locations:], copy=copy)
+
+
+class EnsembleHelperBonesHandler(HelperBonesHandler):
+    
+    def __init__(self, 
+                 skeleton, 
+                 helper_idxs, 
+                 n_copies,
+                 mass=None, 
+                 stiffness=None, 
+                 damping=None,
+                 mass_dscale=None, 
+                 spring_dscale=None,
+                 **kwargs):
+        """
+        Simulate K variants of the same helper rig at once, e.g. for parameter 
+        sweeps. Every variant follows the same rigid animation but has its own
+        physical parameters, that can be provided either as a scalar shared by 
+        all variants, or as an array of shape (n_copies, ) with a value per 
+        variant. Parameters that are not provided keep the HelperBonesHandler
+        defaults. The rest of the keyword arguments are passed to 
+        HelperBonesHandler.
+        
+        update_bones() returns the locations of every variant, with a leading
+        axis of size n_copies.
+        """
+        super().__init__(skeleton, helper_idxs, **kwargs)
+        self.n_copies = n_copies
+        self.ensemble = EnsembleMassSpringSystem(self.simulator, n_copies,
+                                                 mass          = mass,
+                                                 stiffness     = stiffness,
+                                                 damping       = damping,
+                                                 mass_dscale   = mass_dscale,
+                                                 spring_dscale = spring_dscale)
+        
+    def _preserve_bone_lengths(self, bone_starts, free_mass_idxs, original_lengths, comp=0.0):
+        """
+        Batched version of HelperBonesHandler._preserve_bone_lengths(), where
+        bone_starts has shape (n_copies, n_bones, 3) and the free masses are
+        adjusted in every copy.
+        """
+        positions = self.ensemble.positions
+        direction = bone_starts - positions[:, free_mass_idxs]
+        d_norm = np.linalg.norm(direction, axis=-1)
+        
+        complied_orig_lengths = original_lengths * np.exp(comp)
+        scale = d_norm - complied_orig_lengths
+        adjust_vecs = direction * (scale / np.where(d_norm > 1e-20, d_norm, 1.0))[..., None]
+        
+        # Change the free mass locations aligned with the bone lengths.
+        positions[:, free_mass_idxs] += adjust_vecs
+        return adjust_vecs, positions[:, free_mass_idxs]
+    
+    def set_parameters(self, mass=None, stiffness=None, damping=None, 
+                       mass_dscale=None, spring_dscale=None):
+        """
+        Change the physical parameters of the variants in place, see 
+        HelperBonesHandler.set_parameters(). Every parameter is either a 
+        scalar, an array of shape (n_copies, ) with a value per variant, or 
+        an array of shape (n_copies, n_helper) with a value per helper of 
+        every variant.
+        """
+        self.ensemble.set_parameters(mass_idxs=self.free_idxs, spring_idxs=self.spring_idxs,
+                                     mass=mass, stiffness=stiffness, damping=damping, 
+                                     mass_dscale=mass_dscale, spring_dscale=spring_dscale)
+    
+    def get_parameters(self):
+        """
+        Get the physical parameters of the variants as a dictionary of arrays
+        of shape (n_copies, n_helper).
+        """
+        return {name : self.ensemble.get_parameters(array)[:, self._parameter_idxs(name)] 
+                for name, array in self._PARAMETER_ARRAYS.items()}
+    
+    def _move_anchors(self, fixed_idxs, translate_vecs):
+        self.ensemble.translate_masses(fixed_idxs, translate_vecs)
+        
+    def _simulate_helpers(self, dt, free_idxs=None):
+        self.ensemble.simulate(dt, alpha=self.compliance, mass_idxs=free_idxs)
+        
+    def _get_tip_locations(self, free_idxs):
+        return self.ensemble.positions[:, free_idxs]
+        
+    def update_bones(self, rigidly_posed_locations, dt=None):
+        """
+        Given the rigidly posed bone locations of shape (2*n_bones, 3), 
+        simulate every variant and return the simulated locations of 
+        shape (n_copies, 2*n_bones, 3). See HelperBonesHandler.update_bones().
+        """
+        # Step 0 - Get the rigidly posed locations as the target
+        simulated_locations = np.repeat(rigidly_posed_locations[None], self.n_copies, axis=0)
+        
+        if self.prev_sim_locations is None:
+            self.prev_sim_locations = simulated_locations.copy()
+        if self.bone_colliders is not None:
+            self.bone_colliders.update_from_bone_locations(rigidly_posed_locations, self.collider_idxs)
+        
+        # Steps 1-4 - Simulate every variant level by level
+        self._propagate_levels(simulated_locations, dt)
+        
+        # Step 5 - Save the simulated locations for the next iteration
+        self.prev_sim_locations = simulated_locations
+        return simulated_locations
     
+    @property
+    def _state_system(self):
+        return self.ensemble.system
     
-    
\ No newline at end of file
+    @property
+    def _locations_shape(self):
+        return (self.n_copies, 2 * len(self.skeleton.rest_bones), 3)
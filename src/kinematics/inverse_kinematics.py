@@ -16,6 +16,7 @@ import numpy as np
 from scipy.spatial.transform import Rotation
 
 from ..utils.linalg_utils import get_midpoint, compose_rigid_transform_matrix
+from ..utils.precision import resolve_dtype
 from .optimal_rigid_motion import get_optimal_rigid_motion
 from .rst_map import get_RST
 
@@ -82,7 +83,7 @@ def _get_bone_trans_mat(bone_rest, bone_cur):
 
 def get_absolute_transformations(rest_locations, 
                                  posed_locations, 
-                                 return_mat=False, algorithm="RST"):
+                                 return_mat=False, algorithm="RST", dtype=None):
     """
     Parameters
     ----------
@@ -103,6 +104,11 @@ def get_absolute_transformations(rest_locations,
                       WARNING: Do not use it to directly feed to the skinning algorithm
                                because it causes volume collapse.
             - "T" : Computes plain 4x4 translation matrices at the tip of the bones
+    
+    dtype : np.dtype or str
+        Floating point type of the returned transformations, float32 or 
+        float64. The transformations are computed in float64 and converted.
+        If None, the default of utils.precision is used. Default is None.
             
     Returns
     -------
@@ -146,7 +152,8 @@ def get_absolute_transformations(rest_locations,
         else: # RST or T
             abs_M[i] = get_bone_mats(bone_rest, bone_cur)
             
+    dtype = resolve_dtype(dtype)
     if return_mat: 
-        return abs_M
+        return abs_M.astype(dtype, copy=False)
     else:
-        return abs_rot_quats, abs_trans
\ No newline at end of file
+        return abs_rot_quats.astype(dtype, copy=False), abs_trans.astype(dtype, copy=False)
\ No newline at end of file
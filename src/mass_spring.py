@@ -12,13 +12,21 @@ DISCLAIMER: The simulation code is heavily based on these sources:
 
 @author: bartu
 """
-import math
 import numpy as np
 import pyvista as pv
 from numpy import linalg as LA
 
 from .utils.sanity_check import _is_equal
 from .global_vars import _SPACE_DIMS_, VERBOSE
+from .utils.precision import resolve_dtype
+from .simulation.graph import (greedy_edge_colors, group_by_color, color_new_edge,
+                               mesh_edges, shear_edges, bending_edges, 
+                               particle_islands, balanced_batches)
+from .simulation.implicit import implicit_euler_velocity_update
+from .simulation.projective_dynamics import ProjectiveDynamicsSolver
+from .simulation.stability import estimate_stable_dt, compute_energy
+from .simulation.collision import find_contacts, project_contacts
+from .simulation import kernels, numba_kernels
 
 _DEFAULT_STIFFNESS = 1.5
 _DEFAULT_DAMPING = 0.5
@@ -30,66 +38,100 @@ _DEFAULT_MASS_SCALE = 1.
 # Particle Class
 # =============================================================================
 class Particle:
-    def __init__(self, 
-                 coordinate, 
-                 mass=_DEFAULT_MASS, 
-                 dscale=_DEFAULT_MASS_SCALE,
-                 radius=0.05,
-                 gravity=False):
+    def __init__(self, system, idx):
         """
-        Point particle class to represent masses in a mass spring system.
+        Handle to a single point particle in a mass spring system. The particle
+        data itself lives in the contiguous arrays of the MassSpringSystem, 
+        this class only provides per-particle access to these arrays so that
+        the code indexing system.masses[i] keeps working.
+        
+        The handle keeps the stable id of the particle, so it stays valid 
+        when other particles are removed and this particle is moved to 
+        another row.
 
         Parameters
         ----------
-        coordinate : np.ndarray
-            3D coordinate of the particle.
-        mass : TYPE, optional
-            DESCRIPTION. The default is _DEFAULT_MASS.
-        dscale : TYPE, optional
-            DESCRIPTION. The default is _DEFAULT_MASS_SCALE.
-        radius : TYPE, optional
-            DESCRIPTION. The default is 0.05.
-        gravity : bool or np.ndarray or List, optional
-            Sets the gravitational acceleration of the particle.
-            It can be either provided as a 3d vector or can be set True
-            to set it [0.0, 0.0, -9.81]. The default is False.
+        system : MassSpringSystem
+            The system that stores the particle data.
+        idx : int
+            Row of the particle in the system arrays.
 
         Returns
         -------
         None.
 
         """
-        MAX_ALLOWED_MASS = 999
-        assert mass < MAX_ALLOWED_MASS, f"Provided mass {mass} is greater than maximum allowed mass {MAX_ALLOWED_MASS}"
+        self.system = system
+        self.id = int(system.mass_ids[idx])
         
-        self.mass = mass
+    @property
+    def idx(self):
+        idx = self.system._mass_slots[self.id]
+        assert idx >= 0, f"Particle {self.id} is removed from the system."
+        return int(idx)
         
-        if mass > 1e-15: self.w = 1 / mass 
-        else: 
-            self.w = 0.0
-            print(">> WARNING: Found zero mass, initializing its weight to zero.")
+    def __eq__(self, other):
+        return isinstance(other, Particle) and other.system is self.system and other.id == self.id
+    
+    def __hash__(self):
+        return hash((id(self.system), self.id))
+    
+    @property
+    def center(self):
+        return self.system.positions[self.idx]
+    
+    @center.setter
+    def center(self, coordinate):
+        self.system.positions[self.idx] = coordinate
         
-        self.radius = radius
-        self.dscale = dscale
-        
-        self.center = np.array(coordinate, dtype=float)
-        self.prev_center = np.array(coordinate, dtype=float)  # WARNING: it might be misleading cause prev center must be set manually 
-        
-        self.velocity = np.zeros(_SPACE_DIMS_)
-        self.springs = []
-        self.distace_constraint = None
-        if gravity is not None and gravity is not False:
-            # If gravity is set to True:
-            if gravity is True:
-                self.gravity = np.array([0.0, 0.0, -9.81])
-            # If gravity is provided via an array:
-            else: 
-                if type(gravity) is list or type(gravity) is np.ndarray:
-                    assert len(gravity) == 3, f"Expected gravity to have length 3, got {len(gravity)}"
-                    self.gravity = np.array(gravity)
-        # If gravity is set to False:
-        else:
-            self.gravity = np.array([0.0, 0.0, 0.0]) # Set no gravitational acceleration.
+    @property
+    def prev_center(self):
+        return self.system.prev_positions[self.idx]
+    
+    @prev_center.setter
+    def prev_center(self, coordinate):
+        self.system.prev_positions[self.idx] = coordinate
+    
+    @property
+    def velocity(self):
+        return self.system.velocities[self.idx]
+    
+    @velocity.setter
+    def velocity(self, velocity):
+        self.system.velocities[self.idx] = velocity
+    
+    @property
+    def mass(self):
+        return self.system.particle_masses[self.idx]
+    
+    @mass.setter
+    def mass(self, mass):
+        self.system.particle_masses[self.idx] = mass
+    
+    @property
+    def w(self):
+        return self.system.inv_masses[self.idx]
+    
+    @w.setter
+    def w(self, w):
+        self.system.inv_masses[self.idx] = w
+        
+    @property
+    def dscale(self):
+        return self.system.mass_dscales[self.idx]
+    
+    @property
+    def radius(self):
+        return self.system.radii[self.idx]
+    
+    @property
+    def gravity(self):
+        return self.system.gravities[self.idx]
+    
+    @property
+    def springs(self):
+        spring_idxs = np.nonzero(np.any(self.system.edges == self.idx, axis=1))[0]
+        return [Spring(self.system, int(i)) for i in spring_idxs]
     
     def get_opposite_mass(self, spring_idx):
         spr = self.springs[spring_idx]
@@ -99,139 +141,672 @@ class Particle:
             return False, spr.m1
         else:
             raise ValueError("Unexpected case. The mass not found on the spring.")
-        
-    def add_spring(self, spring):
-        self.springs.append(spring)
-        return
-    
-    def get_total_spring_forces(self):
-        # No gravity or other external forces exist in the current system.
-        tot_force = np.zeros_like(self.velocity, dtype=float)
-        if self.mass < 1e-20:
-            return tot_force # If mass is zero, force is zero by f = ma
-        
-        for spring in self.springs:
-            f_spring =  spring.get_force_on_mass(self)
-            assert f_spring.shape == tot_force.shape, f"Calculated force must be a 3D vector, provided {f_spring.shape}."
-            tot_force += f_spring
-            
-        
-        tot_force += self.mass * self.gravity # F = mg where g is graviational acceleration
-        return tot_force
 
 # =============================================================================
 # Spring Class
 # =============================================================================
 class Spring:
-    def __init__(self, 
-                 beginning_mass : Particle, 
-                 ending_mass : Particle,
-                 stiffness : float, 
-                 damping : float,
-                 dscale : float = _DEFAULT_SPRING_SCALE,
-                 verbose : bool = VERBOSE
-                 ):
-        
-        # TODO: Are you going to implement squared norms for optimized performance?
-        self.k = stiffness
-        self.kd = damping
-        self.distance_scale = dscale
-        self.rest_length = LA.norm(beginning_mass.center - ending_mass.center)
-        
-        if verbose:
-            if self.rest_length < 1e-20:
-                print(">> WARNING: Spring initialized at length zero.")
+    def __init__(self, system, idx):
+        """
+        Handle to a single spring in a mass spring system. Like Particle, it
+        reads and writes the spring arrays of the MassSpringSystem, and it 
+        stays valid when other springs are removed.
 
-        self.m1 = beginning_mass
-        self.m2 = ending_mass
-        
-        
-        
-    def get_force_on_mass(self, mass : Particle, tol=1e-12, verbose=VERBOSE):
+        Parameters
+        ----------
+        system : MassSpringSystem
+            The system that stores the spring data.
+        idx : int
+            Row of the spring in the system edge arrays.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.system = system
+        self.id = int(system.spring_ids[idx])
         
-        distance = LA.norm(self.m1.center - self.m2.center)
-        spring_force_amount  = (distance - self.rest_length) * self.k * self.distance_scale
+    @property
+    def idx(self):
+        idx = self.system._spring_slots[self.id]
+        assert idx >= 0, f"Spring {self.id} is removed from the system."
+        return int(idx)
         
-        # Avoid division by zero
-        if distance <  tol:
-            distance = tol
-            
-        # Find the spring direction and normalize it (if it's not a zero vector like in point springs)
-        normalized_dir = (self.m2.center - self.m1.center) / distance
-        if LA.norm(normalized_dir) > tol: # If the direction is not a zero vector
-            assert LA.norm(normalized_dir) < 1.0+tol, f"Expected normalized direction. Provided {normalized_dir} has norm {LA.norm(normalized_dir)}."
-            assert LA.norm(normalized_dir) > 1.0-tol, f"Expected normalized direction. Provided {normalized_dir} has norm {LA.norm(normalized_dir)}."
-        
-        # Find speed of contraction/expansion for damping force
-        s1 = np.dot(self.m1.velocity, normalized_dir)
-        s2 = np.dot(self.m2.velocity, normalized_dir)
-        damping_force_amount = -self.kd * (s1 + s2)
-        
-        force = None
-        if self.m1 == mass:
-            force = (spring_force_amount + damping_force_amount) * normalized_dir
-        elif self.m2 == mass:
-            force = (-spring_force_amount + damping_force_amount) * normalized_dir
-        else:
-            print(">> WARNING: Unexpected case occured, given mass location does not exist for this spring. No force is exerted.")
+    @property
+    def k(self):
+        return self.system.stiffnesses[self.idx]
+    
+    @property
+    def kd(self):
+        return self.system.dampings[self.idx]
+    
+    @property
+    def distance_scale(self):
+        return self.system.spring_dscales[self.idx]
+    
+    @property
+    def rest_length(self):
+        return self.system.rest_lengths[self.idx]
+    
+    @property
+    def m1(self):
+        return Particle(self.system, int(self.system.edges[self.idx, 0]))
+    
+    @property
+    def m2(self):
+        return Particle(self.system, int(self.system.edges[self.idx, 1]))
+
+class _HandleList:
+    # Read-only sequence of Particle or Spring handles, created on access so
+    # that system.masses[i] doesn't require storing a Python object per row.
+    def __init__(self, system, handle_type, count):
+        self.system = system
+        self.handle_type = handle_type
+        self.count = count
         
-        # if verbose:
-        #     if LA.norm(self.m1.velocity) + LA.norm(self.m2.velocity) < tol: 
-        #         print(f">>> Equilibrium reached at distance {np.round(distance,6)} with spring rest length {np.round(self.rest_length,6)}")
-            
-        assert not np.any(np.abs(force) > 1e10), f"WARNING: System got unstable with force {force}, stopping execution..."
-        return force
+    def __len__(self):
+        return self.count(self.system)
+    
+    def __getitem__(self, idx):
+        n = len(self)
+        if idx < 0: idx += n
+        if idx < 0 or idx >= n:
+            raise IndexError(f"Index {idx} is out of bounds for {n} elements.")
+        return self.handle_type(self.system, int(idx))
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.handle_type(self.system, i)
+
+def _parse_gravity(gravity):
+    # Gravity can be either provided as a 3d vector or can be set True
+    # to set it [0.0, 0.0, -9.81]. If it's False or None, there's no gravity.
+    if gravity is None or gravity is False:
+        return np.array([0.0, 0.0, 0.0]) # Set no gravitational acceleration.
+    if gravity is True:
+        return np.array([0.0, 0.0, -9.81])
+    assert len(gravity) == 3, f"Expected gravity to have length 3, got {len(gravity)}"
+    return np.array(gravity, dtype=float)
         
 # =============================================================================
 # Mass Spring System Class     
 # =============================================================================
 class MassSpringSystem:
-    def __init__(self, dt, mode="PBD", edge_constraint=False):
+    # Per-row arrays that are reordered together when a row is removed
+    _PARTICLE_ARRAYS = ("positions", "prev_positions", "velocities", "particle_masses", "inv_masses",
+                        "mass_dscales", "radii", "gravities", "free_mask", "mass_ids")
+    _SPRING_ARRAYS = ("edges", "stiffnesses", "dampings", "spring_dscales", "rest_lengths", "spring_ids")
+    # Arrays that have the floating point dtype of the system
+    _FLOAT_ARRAYS = ("positions", "prev_positions", "velocities", "particle_masses", "inv_masses", 
+                     "mass_dscales", "radii", "gravities", "stiffnesses", "dampings", "spring_dscales",
+                     "rest_lengths")
+    # Simulation state that's saved by snapshot(), after a header of the counts.
+    # The counts are stored as the bytes of int64 values, so that they stay 
+    # exact in any dtype, the header takes 8 bytes per count of the buffer.
+    _STATE_ARRAYS = ("positions", "prev_positions", "velocities", "lambdas")
+    _SNAPSHOT_HEADER = 3
+    # Integrators that can simulate a subset of the islands, see simulate()
+    _SUBSET_MODES = ("PBD", "XPBD", "EULER", "VERLET")
+    
+    def __init__(self, dt, mode="PBD", edge_constraint=False, 
+                 constraint_solver="GAUSS-SEIDEL", relaxation=1.0,
+                 substeps=1, iterations=1, tolerance=None, backend="numpy",
+                 sleep_threshold=None, sleep_frames=10, n_threads=1, substep_controller=None,
+                 dtype=None, self_collision=False):
+        """
+        Container of particles and springs between them.
+
+        Parameters
+        ----------
+        dt : float
+            Default time step of the simulation.
+        mode : str, optional
+            Integration scheme, see simulate(). The default is "PBD".
+        edge_constraint : bool, optional
+            Project the spring rest lengths as distance constraints in PBD.
+            The default is False.
+        constraint_solver : str, optional
+            Iteration type of the edge constraint projection (case insensitive).
+            "GAUSS-SEIDEL" projects the constraints color by color, where the 
+            edge coloring is cached until the topology changes. "JACOBI" 
+            projects all of them in parallel and averages the corrections of
+            the particles. The default is "GAUSS-SEIDEL".
+        relaxation : float, optional
+            Relaxation factor of the Jacobi projection. The default is 1.0.
+        substeps : int, optional
+            Number of substeps per simulate() call in XPBD mode. The default is 1.
+        iterations : int, optional
+            Number of constraint projection iterations per substep in XPBD
+            mode, or local-global iterations in PD mode. The default is 1.
+        tolerance : float, optional
+            If set, XPBD stops iterating a substep once the constraint residual
+            is below this value. The default is None.
+        backend : str, optional
+            Kernels used for the force evaluation, PBD prediction and Gauss-Seidel
+            constraint projection (case insensitive). "NUMPY" uses vectorized
+            NumPy kernels, "NUMBA" uses compiled loops and falls back to NumPy
+            if Numba isn't installed. "TAICHI" runs the whole PBD and XPBD 
+            steps as multithreaded Taichi kernels on the CPU, other modes use
+            the NumPy kernels. The default is "numpy".
+        sleep_threshold : float, optional
+            If set, islands (connected groups of free particles) whose kinetic
+            energy per unit mass, and the speed of their fixed particles 
+            measured the same way, stay below this value for sleep_frames 
+            simulate() calls are put to sleep. Sleeping islands are skipped by
+            the PBD, XPBD, Verlet and Euler integrators with the NumPy or Numba
+            kernels, and they wake up once their fixed particles move. The 
+            default is None, i.e. islands never sleep.
+        sleep_frames : int, optional
+            Number of still frames before an island sleeps. The default is 10.
+        n_threads : int, optional
+            Number of threads for the Gauss-Seidel constraint projection with
+            the Numba kernels, that release the GIL. The islands are packed 
+            into n_threads batches of similar number of springs, and every 
+            batch is projected in its own thread. The default is 1.
+        substep_controller : SubstepController, optional
+            If set, every simulate() call is split into the number of substeps
+            that the controller picks from the stable time step estimate, see
+            simulation.stability. The default is None.
+        dtype : np.dtype or str, optional
+            Floating point type of the particle and spring arrays, float32 or 
+            float64. If None, the default of utils.precision is used. The
+            default is None.
+        self_collision : bool, optional
+            Keep the particles from overlapping in PBD and XPBD (every 
+            substep), where every particle is a sphere with its radius. The
+            contacts are found with a spatial hash grid, see 
+            simulation.collision. Particles connected by a spring don't 
+            collide. The Taichi backend falls back to the NumPy kernels if
+            it's set. The default is False.
+        """
         print(">> INFO: Initiated empty mass-spring system")
-        self.masses = []
-        self.fixed_indices = []
-        self.connections = []
-        self.rest_lengths = [] # Store the rest lengths for quick access in constraint projections
+        self.dtype = resolve_dtype(dtype)
+        
+        # Particle data, every row is a particle
+        self.positions = np.empty((0, _SPACE_DIMS_), dtype=self.dtype)
+        self.prev_positions = np.empty((0, _SPACE_DIMS_), dtype=self.dtype)
+        self.velocities = np.empty((0, _SPACE_DIMS_), dtype=self.dtype)
+        self.particle_masses = np.empty((0,), dtype=self.dtype)
+        self.inv_masses = np.empty((0,), dtype=self.dtype)       # w = 1 / mass, zero for fixed masses
+        self.mass_dscales = np.empty((0,), dtype=self.dtype)
+        self.radii = np.empty((0,), dtype=self.dtype)
+        self.gravities = np.empty((0, _SPACE_DIMS_), dtype=self.dtype)
+        
+        # Spring data, every row is a spring between edges[i,0] and edges[i,1]
+        self.edges = np.empty((0, 2), dtype=int)
+        self.stiffnesses = np.empty((0,), dtype=self.dtype)
+        self.dampings = np.empty((0,), dtype=self.dtype)
+        self.spring_dscales = np.empty((0,), dtype=self.dtype)
+        self.rest_lengths = np.empty((0,), dtype=self.dtype) # Store the rest lengths for quick access in constraint projections
+        
+        # Stable ids of the rows, and the row of every id (-1 if removed). Rows 
+        # are swap-removed, so handles keep the id instead of the row.
+        self.mass_ids = np.empty((0,), dtype=int)
+        self.spring_ids = np.empty((0,), dtype=int)
+        self._mass_slots = np.empty((0,), dtype=int)
+        self._spring_slots = np.empty((0,), dtype=int)
+        
+        # Fixed (kinematic) particles only move with set_kinematic_positions() or
+        # translate_mass(), they have zero mass and zero inverse mass. Integrators
+        # only update the free particles.
+        self.free_mask = np.empty((0,), dtype=bool)
+        self.free_indices = np.empty((0,), dtype=int)
+        self.fixed_indices = np.empty((0,), dtype=int)   # In the order they're fixed
+        self._incidence = None   # Spring rows of every particle, built at the first removal and kept up to date
+        self._free_slots = None  # Row of every particle in free_indices, -1 for fixed ones
         self.dt =  dt
+        self._force_buffer = np.empty((0, _SPACE_DIMS_), dtype=self.dtype) # Reused in every force evaluation
         
         print(">> INFO: Simulation integrator is set to ", mode)
         self.integration_mode = mode
         self.edge_constraint = edge_constraint
+        
+        assert constraint_solver.upper() in ("GAUSS-SEIDEL", "JACOBI"), f"Expected constraint solver to be GAUSS-SEIDEL or JACOBI, got {constraint_solver}."
+        self.constraint_solver = constraint_solver.upper()
+        self.relaxation = relaxation
+        self._edge_color_ids = None # Cached color per edge, updated when springs are added or removed
+        self._edge_colors = None    # Edge indices of every color, regrouped from the color ids
+        
+        assert substeps >= 1 and iterations >= 1, f"Expected at least one substep and iteration, got {substeps} and {iterations}."
+        self.substeps = substeps
+        self.iterations = iterations
+        self.tolerance = tolerance
+        self.lambdas = np.empty((0,), dtype=self.dtype) # XPBD Lagrange multipliers per spring
+        self.solver_info = {}           # Convergence report of the last XPBD or implicit step
+        self._implicit_dv = None        # Warm start of the implicit solver
+        self._pd_solver = None          # Cached Projective Dynamics factorization
+        
+        assert backend.upper() in ("NUMPY", "NUMBA", "TAICHI"), f"Expected backend to be NUMPY, NUMBA or TAICHI, got {backend}."
+        self.backend = backend.upper()
+        if self.backend == "NUMBA" and not numba_kernels.NUMBA_AVAILABLE:
+            print(">> WARNING: Numba is not installed, falling back to NumPy kernels.")
+            self.backend = "NUMPY"
+        if self.backend == "TAICHI":
+            try:
+                from .simulation import taichi_solver # Taichi is imported only if it's used
+            except ImportError:
+                print(">> WARNING: Taichi is not installed, falling back to NumPy kernels.")
+                self.backend = "NUMPY"
+        self.kernels = numba_kernels if self.backend == "NUMBA" else kernels
+        self._taichi_solver = None      # Taichi fields, rebuilt when the topology changes
+        
+        self.sleep_threshold = sleep_threshold
+        self.sleep_frames = sleep_frames
+        self._islands = None            # Island ids of the particles and springs, see get_islands()
+        self._still_frames = None       # Number of consecutive still frames of every island
+        self._sleeping = None           # Sleeping islands
+        self._kinematic_snapshot = None # Fixed particle locations at the last sleep update
+        self._active_islands = None     # Islands of the current simulate() call, None for all
+        
+        assert n_threads >= 1, f"Expected at least a single thread, got {n_threads}."
+        self.n_threads = n_threads
+        self._island_batches = None     # Edge order of every batch of islands, see get_island_batches()
+        self._thread_pool = None
+        self.substep_controller = substep_controller
+        self.self_collision = self_collision
+        self._spring_pair_keys = None   # Sorted keys of the connected particle pairs, ignored by collisions
+        self.contacts = np.empty((0, 2), dtype=int) # Contact pairs of the last collision projection
+        self.collision_groups = None    # If set, only the particles of the same group collide
+        self.colliders = []             # Kinematic colliders, see add_collider()
+        
+    @property
+    def n_masses(self):
+        return len(self.positions)
+    
+    @property
+    def n_springs(self):
+        return len(self.edges)
+    
+    @property
+    def masses(self):
+        return _HandleList(self, Particle, lambda system: system.n_masses)
+    
+    @property
+    def springs(self):
+        return _HandleList(self, Spring, lambda system: system.n_springs)
+    
+    @property
+    def connections(self):
+        return self.edges
     
-    def satisfy_edge_constraints(self, P, alpha, dt=None):
+    @classmethod
+    def from_mesh(cls, V, F, dt, 
+                  mass=_DEFAULT_MASS, stiffness=_DEFAULT_STIFFNESS, damping=_DEFAULT_DAMPING,
+                  dscale=_DEFAULT_MASS_SCALE, spring_dscale=_DEFAULT_SPRING_SCALE,
+                  gravity=False, fixed_idxs=None, 
+                  tetrahedral=False, shear=False, bending=False, verbose=VERBOSE, **kwargs):
+        """
+        Create a mass-spring system with a particle at every vertex and a 
+        spring at every unique edge of the mesh.
+
+        Parameters
+        ----------
+        V : np.ndarray
+            Vertex locations, has shape (n_verts, 3).
+        F : np.ndarray
+            Faces of shape (n_faces, k), or tetrahedra of shape (n_tets, 4) if
+            tetrahedral is set. Faces with k=2 are taken as single edges.
+        dt : float
+            Default time step of the simulation.
+        mass, dscale : float or np.ndarray, optional
+            Particle parameters, either shared or per vertex, see add_masses().
+        stiffness, damping, spring_dscale : float, optional
+            Parameters of all springs.
+        gravity : bool or np.ndarray or List, optional
+            Gravitational acceleration of the particles, see add_mass(). 
+            The default is False.
+        fixed_idxs : np.ndarray, optional
+            Indices of the vertices to fix. The default is None.
+        tetrahedral : bool, optional
+            Set True if F holds tetrahedra. The default is False.
+        shear : bool, optional
+            Add springs at the face diagonals, e.g. for quad meshes. The default is False.
+        bending : bool, optional
+            Add springs across the adjacent triangles of a triangle mesh. 
+            The default is False.
+        verbose : bool, optional
+            Print a summary of the added masses and springs. The default is VERBOSE.
+        **kwargs : 
+            Simulator settings passed to __init__().
+
+        Returns
+        -------
+        system : MassSpringSystem
+        """
+        system = cls(dt, **kwargs)
+        system.add_masses(V, mass=mass, dscale=dscale, gravity=gravity, verbose=verbose)
         
-        if dt is None: dt = self.dt # Option to set custom time step
+        edges = [mesh_edges(F, tetrahedral=tetrahedral)]
+        if shear:   edges.append(shear_edges(F))
+        if bending: edges.append(bending_edges(F))
+        system.connect_many(np.concatenate(edges), stiffness=stiffness, damping=damping, 
+                            dscale=spring_dscale, verbose=verbose)
         
-        for spring_idx, edge in enumerate(self.connections):
-            idx1, idx2 = edge
-            w1 = self.masses[idx1].w
-            w2 = self.masses[idx2].w
-            spring_vec = P[idx1] - P[idx2] #P[idx2] - P[idx1]
-            spring_len = np.linalg.norm(spring_vec)
-            
-            if spring_len < 1e-20:
-                continue # Avoid division by zero
-    
-            C = spring_len - self.rest_lengths[spring_idx]
-            grad_C1 = spring_vec / spring_len
-            grad_C2 = - spring_vec / spring_len
-            assert math.isclose(np.linalg.norm(grad_C1), 1.0) # Gradients are 1 for distance constratins
-            assert math.isclose(np.linalg.norm(grad_C2), 1.0) # Gradients are 1 for distance constratins
-            
-            complience = alpha / dt / dt # alpha / dt^2
-            grad_sum = w1 + w2  # Gradients are 1 for distance constratins
-            lmbd = - C / (grad_sum + complience)
-            
-            delta_x1 = lmbd * w1 * grad_C1
-            delta_x2 = lmbd * w2 * grad_C2
+        if fixed_idxs is not None: system.fix_masses(fixed_idxs, verbose=verbose)
+        return system
+    
+    def get_spring_forces(self, spring_idxs=None):
+        """
+        Compute the total force on every particle, i.e. the spring forces
+        plus gravity, evaluating every spring once. Fixed masses get zero force.
+
+        Parameters
+        ----------
+        spring_idxs : np.ndarray, optional
+            Evaluate only the given springs, e.g. the ones of the awake islands.
+            The default is None, i.e. all springs.
+
+        Returns
+        -------
+        forces : np.ndarray
+            Has shape (n_masses, 3). Note that this is an internal buffer that
+            is overwritten at the next call.
+        """
+        if self._force_buffer.shape != self.positions.shape:
+            self._force_buffer = np.empty_like(self.positions)
+        
+        if spring_idxs is None:
+            return self.kernels.compute_spring_forces(self.positions, self.velocities, 
+                                         self.particle_masses, self.gravities,
+                                         self.edges, self.stiffnesses, self.dampings,
+                                         self.spring_dscales, self.rest_lengths,
+                                         out=self._force_buffer)
+        
+        return self.kernels.compute_spring_forces(self.positions, self.velocities, 
+                                     self.particle_masses, self.gravities,
+                                     self.edges[spring_idxs], self.stiffnesses[spring_idxs], 
+                                     self.dampings[spring_idxs], self.spring_dscales[spring_idxs], 
+                                     self.rest_lengths[spring_idxs], out=self._force_buffer)
+    
+    def _invalidate_topology(self, recolor=False):
+        # Called whenever particles, springs or fixed masses change. The edge
+        # coloring is kept valid by the edits, it's only recomputed if recolor is set.
+        if recolor: self._edge_color_ids = None
+        self._edge_colors = None
+        self._pd_solver = None
+        self._taichi_solver = None
+        self._islands = None
+        self._island_batches = None
+        self._spring_pair_keys = None
+        self._still_frames = None
+        self._sleeping = None
+        
+    def get_edge_colors(self):
+        """
+        Get the edge indices partitioned into independent sets, where no two
+        springs of a set share a movable particle. It's computed once and
+        updated in place when springs are added or removed.
+        """
+        if self._edge_color_ids is None:
+            self._edge_color_ids = greedy_edge_colors(self.edges, static_vertices=~self.free_mask)
+        if self._edge_colors is None:
+            self._edge_colors = group_by_color(self._edge_color_ids)
+        return self._edge_colors
+    
+    def get_islands(self):
+        """
+        Get the islands, i.e. the connected components of the free particles,
+        see graph.particle_islands(). It's computed once per topology change.
+
+        Returns
+        -------
+        vertex_islands : np.ndarray
+            Island id per particle, -1 for fixed particles.
+        edge_islands : np.ndarray
+            Island id per spring, -1 for springs between fixed particles.
+        n_islands : int
+            Number of islands.
+        """
+        if self._islands is None:
+            self._islands = particle_islands(self.n_masses, self.edges, self.free_mask)
+        return self._islands
+    
+    def get_island_batches(self):
+        """
+        Get the islands packed into at most n_threads batches of similar number
+        of springs, see graph.balanced_batches(). Every batch is given as its
+        edge indices in color order, so the batches can be projected 
+        independently with the same result as the Gauss-Seidel sweep over all
+        edges. It's computed once per topology change.
+        """
+        if self._island_batches is None:
+            _, edge_islands, n_islands = self.get_islands()
+            weights = np.bincount(edge_islands[edge_islands >= 0], minlength=n_islands)
+            batch_ids, n_batches = balanced_batches(weights, self.n_threads)
             
-            P[idx1] += delta_x1
-            P[idx2] += delta_x2
+            # Springs between fixed particles don't move anything, they go to the first batch
+            edge_batches = np.where(edge_islands >= 0, batch_ids[edge_islands], 0)
+            order = np.concatenate(self.get_edge_colors()) if self.n_springs else np.empty((0,), dtype=int)
+            self._island_batches = [order[edge_batches[order] == b] for b in range(n_batches)]
+        return self._island_batches
+    
+    def _get_thread_pool(self):
+        if self._thread_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.n_threads)
+        return self._thread_pool
+    
+    def wake(self, mass_idxs=None):
+        """
+        Wake the islands of the given particles up, or all islands if None.
+        Fixed particles wake the islands they're connected to.
+        """
+        if self._sleeping is None: return
+        if mass_idxs is None:
+            self._still_frames[:] = 0
+            self._sleeping[:] = False
+            return
+        
+        mass_idxs = np.atleast_1d(mass_idxs)
+        vertex_islands, edge_islands, _ = self.get_islands()
+        islands = vertex_islands[mass_idxs]
+        fixed = mass_idxs[islands < 0]
+        if len(fixed):
+            touched = np.zeros(self.n_masses, dtype=bool)
+            touched[fixed] = True
+            islands = np.concatenate((islands, edge_islands[np.any(touched[self.edges], axis=1)]))
+        islands = islands[islands >= 0]
+        self._still_frames[islands] = 0
+        self._sleeping[islands] = False
         
+    def _update_sleep(self, dt):
+        # Count the still frames of every island and put the islands to sleep, 
+        # or wake them up if their fixed particles moved since the last update.
+        vertex_islands, edge_islands, n_islands = self.get_islands()
+        if self._still_frames is None:
+            self._still_frames = np.zeros(n_islands, dtype=int)
+            self._sleeping = np.zeros(n_islands, dtype=bool)
+        
+        # Kinetic energy per unit mass of every island
+        free = self.free_indices
+        free_islands = vertex_islands[free]
+        speed2 = np.sum(self.velocities[free] ** 2, axis=-1)
+        energy = np.bincount(free_islands, weights=0.5 * self.particle_masses[free] * speed2, minlength=n_islands)
+        total_mass = np.bincount(free_islands, weights=self.particle_masses[free], minlength=n_islands)
+        still = energy < self.sleep_threshold * total_mass
+        
+        # Islands are driven by the fixed particles they're connected to
+        fixed_positions = self.positions[self.fixed_indices]
+        if self._kinematic_snapshot is None or len(self._kinematic_snapshot) != len(fixed_positions):
+            still[:] = False
+        else:
+            driver_speed2 = np.sum((fixed_positions - self._kinematic_snapshot) ** 2, axis=-1) / (dt * dt)
+            moved = np.zeros(self.n_masses, dtype=bool)
+            moved[self.fixed_indices[0.5 * driver_speed2 >= self.sleep_threshold]] = True
+            driven = edge_islands[np.any(moved[self.edges], axis=1)]
+            still[driven[driven >= 0]] = False
+        self._kinematic_snapshot = fixed_positions.copy()
+        
+        still_frames = np.where(still, self._still_frames + 1, 0)
+        if self._active_islands is not None: # Only the simulated islands are counted
+            still_frames = np.where(self._active_islands, still_frames, self._still_frames)
+        self._still_frames = still_frames
+        sleeping = self._still_frames >= self.sleep_frames
+        
+        # Islands start from rest when they fall asleep
+        asleep = sleeping & ~self._sleeping
+        if np.any(asleep): self.velocities[free[asleep[free_islands]]] = 0.0
+        self._sleeping = sleeping
+    
+    def _get_active_sets(self):
+        # Get the free particles and the springs of the awake islands that are
+        # simulated. Springs are None if all the islands are active, i.e. every 
+        # spring is active.
+        awake = None
+        if self._sleeping is not None and np.any(self._sleeping): awake = ~self._sleeping
+        if self._active_islands is not None:
+            awake = self._active_islands if awake is None else awake & self._active_islands
+        if awake is None: return self.free_indices, None
+        
+        vertex_islands, edge_islands, _ = self.get_islands()
+        awake = np.append(awake, False) # Island -1 is never active
+        free = self.free_indices[awake[vertex_islands[self.free_indices]]]
+        return free, np.flatnonzero(awake[edge_islands])
+    
+    def _use_taichi(self):
+        # Collisions and island subsets fall back to the NumPy kernels
+        return self.backend == "TAICHI" and not (self.self_collision or self.colliders or self._active_islands is not None)
+    
+    def _cast_state(self):
+        # Keep the arrays in the system dtype after they're extended with
+        # float64 values, it doesn't copy the arrays that already have it.
+        for name in self._FLOAT_ARRAYS:
+            setattr(self, name, getattr(self, name).astype(self.dtype, copy=False))
+    
+    def _new_ids(self, n, slots_name):
+        # Allocate n stable ids for the rows appended at the end
+        slots = getattr(self, slots_name)
+        n_rows = self.n_masses if slots_name == "_mass_slots" else self.n_springs
+        setattr(self, slots_name, np.concatenate((slots, np.arange(n_rows - n, n_rows))))
+        return np.arange(len(slots), len(slots) + n)
+    
+    def _reset_ids(self):
+        # Assign new ids to all rows, e.g. after the arrays are set directly
+        self.mass_ids = np.arange(self.n_masses)
+        self.spring_ids = np.arange(self.n_springs)
+        self._mass_slots = np.arange(self.n_masses)
+        self._spring_slots = np.arange(self.n_springs)
+        self._incidence = None
+        self._free_slots = None
+    
+    def _get_taichi_solver(self):
+        if self._taichi_solver is None:
+            from .simulation.taichi_solver import TaichiPBDSolver
+            self._taichi_solver = TaichiPBDSolver(self)
+        return self._taichi_solver
+    
+    def satisfy_edge_constraints(self, P, alpha, dt=None, lambdas=None, spring_idxs=None):
+        
+        if dt is None: dt = self.dt # Option to set custom time step
+        
+        complience = alpha / dt / dt # alpha / dt^2
+        if self.constraint_solver == "JACOBI":
+            if spring_idxs is None:
+                return self.kernels.project_distance_constraints_jacobi(P, self.edges, self.rest_lengths, self.inv_masses,
+                                                                        complience, relaxation=self.relaxation, lambdas=lambdas)
+            # Islands don't share springs, so the subset gives the same averaging
+            subset_lambdas = None if lambdas is None else lambdas[spring_idxs]
+            P = self.kernels.project_distance_constraints_jacobi(P, self.edges[spring_idxs], self.rest_lengths[spring_idxs], 
+                                                                 self.inv_masses, complience, relaxation=self.relaxation, 
+                                                                 lambdas=subset_lambdas)
+            if lambdas is not None: lambdas[spring_idxs] = subset_lambdas
+            return P
+        
+        if self.n_threads > 1 and self.backend == "NUMBA":
+            batch_orders = self.get_island_batches()
+            if spring_idxs is not None:
+                active = np.zeros(self.n_springs, dtype=bool)
+                active[spring_idxs] = True
+                batch_orders = [order[active[order]] for order in batch_orders]
+            return self.kernels.project_distance_constraints_batches(P, self.edges, self.rest_lengths, self.inv_masses,
+                                                                     complience, batch_orders, self._get_thread_pool(),
+                                                                     lambdas=lambdas)
+        
+        color_groups = self.get_edge_colors()
+        if spring_idxs is not None:
+            active = np.zeros(self.n_springs, dtype=bool)
+            active[spring_idxs] = True
+            color_groups = [group[active[group]] for group in color_groups]
+            color_groups = [group for group in color_groups if len(group)]
+            if len(color_groups) == 0: return P
+        
+        return self.kernels.project_distance_constraints_gs(P, self.edges, self.rest_lengths, self.inv_masses,
+                                                            complience, color_groups, lambdas=lambdas)
+    
+    def satisfy_collision_constraints(self, P, free=None):
+        """
+        Find the overlapping particles at locations P with the spatial hash
+        grid and push them apart, see simulation.collision. Only the given free
+        particles are moved, e.g. the ones of the awake islands.
+        """
+        if free is None: free = self.free_indices
+        if self._spring_pair_keys is None:
+            self._spring_pair_keys = np.unique(self.edges.min(axis=1) * self.n_masses + self.edges.max(axis=1))
+        
+        contacts = find_contacts(P, self.radii, excluded_keys=self._spring_pair_keys, groups=self.collision_groups)
+        self.contacts = contacts
+        movable = np.zeros_like(self.inv_masses)
+        movable[free] = self.inv_masses[free]
+        return project_contacts(P, self.contacts, self.radii, movable, relaxation=self.relaxation)
+    
+    def add_collider(self, collider):
+        """
+        Add a kinematic collider, e.g. CapsuleColliders or SDFCollider of 
+        simulation.colliders, that pushes the free particles out of its volume
+        in PBD and XPBD (every substep). The collider is moved by the caller,
+        and the Taichi backend falls back to the NumPy kernels if there's any
+        collider.
+        """
+        self.colliders.append(collider)
+        return collider
+    
+    def satisfy_collider_constraints(self, P, free=None):
+        """
+        Push the given free particles at locations P out of the kinematic 
+        colliders, see add_collider().
+        """
+        if free is None: free = self.free_indices
+        movable = np.zeros_like(self.inv_masses)
+        movable[free] = self.inv_masses[free]
+        for collider in self.colliders:
+            P = collider.project(P, self.radii, movable, candidates=free, relaxation=self.relaxation)
         return P
-       
+    
+    def get_constraint_residual(self, P, alpha, dt=None, lambdas=None, spring_idxs=None):
+        """
+        Get the maximum violation of the edge constraints at locations P. For 
+        XPBD, the residual of a constraint is C + (alpha / dt^2) * lambda, 
+        that is zero when the compliant constraint is satisfied. If spring_idxs
+        is given, only those constraints are checked.
+        """
+        if spring_idxs is None: spring_idxs = slice(None)
+        edges = self.edges[spring_idxs]
+        if len(edges) == 0: return 0.0
+        if dt is None: dt = self.dt
         
-    def simulate(self, dt=None, integration=None, alpha=0.0):
+        spring_vec = P[edges[:, 0]] - P[edges[:, 1]]
+        C = np.sqrt(np.sum(spring_vec * spring_vec, axis=-1)) - self.rest_lengths[spring_idxs]
+        if lambdas is not None: C = C + (alpha / dt / dt) * lambdas[spring_idxs]
+        return float(np.abs(C).max())
+        
+    def get_stable_dt(self):
+        """
+        Estimate the largest stable time step of the explicit integrators, 
+        see stability.estimate_stable_dt().
+        """
+        return estimate_stable_dt(self.particle_masses, self.edges, self.stiffnesses, 
+                                  self.dampings, self.spring_dscales, self.free_mask)
+    
+    def get_energy(self):
+        """
+        Get the total energy of the system, i.e. kinetic, elastic and 
+        gravitational energy, see stability.compute_energy().
+        """
+        return sum(compute_energy(self.positions, self.velocities, self.particle_masses, self.gravities, 
+                                  self.edges, self.stiffnesses, self.spring_dscales, self.rest_lengths))
+    
+    def simulate(self, dt=None, integration=None, alpha=0.0, mass_idxs=None):
         """
         Simulate the mass-spring system. Updates the mass locations in the 
         system.
@@ -245,7 +820,17 @@ class MassSpringSystem:
         integration : str, optional
             Type of integration to be used in the simulation. The default is None.
             If set to None, the default simulator will be used.
-            Available options are (case insensitive): {PBD, Verlet, Euler}
+            Available options are (case insensitive): {PBD, XPBD, PD, Implicit, Verlet, Euler}
+            
+        alpha : float, optional
+            Compliance of the edge constraints, used by PBD and XPBD. The 
+            default is 0.0, i.e. hard constraints.
+            
+        mass_idxs : np.ndarray, optional
+            If given, only the islands of these particles are simulated and 
+            the other particles keep their state, e.g. to simulate the levels
+            of a helper rig one after another. Only PBD, XPBD, Euler and Verlet
+            support it. The default is None, i.e. all islands are simulated.
             
         Returns
         -------
@@ -253,13 +838,63 @@ class MassSpringSystem:
         
         """
         if integration is None: integration = self.integration_mode
+        if dt is None: dt = self.dt
         
         assert type(integration) == str, f"Expected str type at integration parameter, got {type(integration)}."
         integration = integration.upper()
         
+        if mass_idxs is not None:
+            assert integration in self._SUBSET_MODES, f"Expected one of {self._SUBSET_MODES} to simulate a subset of the islands, got {integration}."
+            vertex_islands, _, n_islands = self.get_islands()
+            islands = vertex_islands[np.atleast_1d(mass_idxs)]
+            self._active_islands = np.zeros(n_islands, dtype=bool)
+            self._active_islands[islands[islands >= 0]] = True
+        
+        try:
+            if self.sleep_threshold is not None: self._update_sleep(dt)
+            if self.substep_controller is not None:
+                self.substep_controller.simulate(self, dt, integration, alpha=alpha)
+            else:
+                self._integrate(dt, integration, alpha)
+        finally:
+            self._active_islands = None
+        return
+    
+    def simulate_substeps(self, dt, integration, substeps, alpha=0.0):
+        """
+        Advance the system by dt in the given number of substeps. XPBD takes 
+        substeps times its own substeps, the other integrators are called 
+        with dt / substeps, where the mass dscales are applied as 
+        dscale^(1/substeps) so that the damping per call stays the same.
+        """
+        if substeps == 1:
+            self._integrate(dt, integration, alpha)
+            return
+        if integration == "XPBD":
+            self.simulate_xpbd(dt, alpha=alpha, substeps=substeps * self.substeps)
+            return
+        
+        mass_dscales = self.mass_dscales
+        self.mass_dscales = mass_dscales ** (1.0 / substeps)
+        try:
+            for _ in range(substeps):
+                self._integrate(dt / substeps, integration, alpha)
+        finally:
+            self.mass_dscales = mass_dscales
+    
+    def _integrate(self, dt, integration, alpha):
         if integration == "PBD":
                 self.simulate_pbd(dt, alpha=alpha)
+        
+        elif integration == "XPBD":
+                self.simulate_xpbd(dt, alpha=alpha)
                 
+        elif integration == "PD":
+                 self.simulate_pd(dt)
+                 
+        elif integration == "IMPLICIT":
+                 self.simulate_implicit(dt)
+                 
         elif integration == "VERLET":
                  self.simulate_verlet(dt)
         
@@ -270,8 +905,6 @@ class MassSpringSystem:
                 print(f"WARNING: Invalid integration scheme {integration} is given. Choosing default simulation...")
                 self.simulate_pbd(dt, alpha=alpha)
     
-        return
-        
     def simulate_pbd(self, dt=None, alpha=0.0):
         """
         Default simulator of mass spring system based on Position Based Dynamics
@@ -290,37 +923,187 @@ class MassSpringSystem:
         """
         # Setup variables
         if dt is None:  dt = self.dt
-        n_masses = len(self.masses)
-        
-        # Compute velocities
-        velocities = np.empty((n_masses, 3))
-        for i in range(n_masses):
-            w = self.masses[i].w
-            force = self.masses[i].get_total_spring_forces() 
-            velocity = self.masses[i].velocity + dt * w * force
-            
-            # Optionally, damp velocities
-            velocity = velocity * self.masses[i].dscale
-            velocities[i] = velocity
-        
-        # Store initially simulated locations in P
-        P = np.empty((n_masses, 3))
-        for i in range(n_masses):
-            P[i] = self.masses[i].center + dt * velocities[i]
-        
-        # Solve for constraints C (I omit collisions though, only distance is applied) 
-        #C  = self.generate_constraints(P)
-        #P = self.project_constraints(C, P) # Optionally you could iterate (algorithm line 9 in PBD paper)
+        if self._use_taichi():
+            self._get_taichi_solver().simulate(self, dt, alpha=alpha, use_lambdas=False)
+            return
+        
+        # Compute velocities, damp them and store initially simulated locations in P
+        free, springs = self._get_active_sets()
+        forces = self.get_spring_forces(springs)
+        P = self.positions.copy()
+        P[free] = self.kernels.predict_positions(self.positions[free], self.velocities[free], forces[free], 
+                                                 self.inv_masses[free], self.mass_dscales[free], dt)
+        
+        # Solve for constraints C, i.e. distances and optionally collisions
         if self.edge_constraint:
-            P = self.satisfy_edge_constraints(P, alpha=alpha)
+            P = self.satisfy_edge_constraints(P, alpha=alpha, spring_idxs=springs)
+        if self.self_collision:
+            P = self.satisfy_collision_constraints(P, free)
+        if self.colliders:
+            P = self.satisfy_collider_constraints(P, free)
         
         # Update final mass locations and velocities
-        for i in range(n_masses):
-            velocity = (P[i] - self.masses[i].center) / dt
-            self.masses[i].velocity = velocity
-            self.masses[i].center = P[i]
+        self.velocities[free] = (P[free] - self.positions[free]) / dt
+        self.positions = P
+            
+            
+    def simulate_xpbd(self, dt=None, alpha=0.0, substeps=None, iterations=None, tolerance=None):
+        """
+        Substepped Extended Position Based Dynamics. Every substep predicts the
+        particle locations as in simulate_pbd(), then iterates the edge 
+        constraint projections while accumulating the Lagrange multipliers, 
+        so that the compliance alpha doesn't depend on the number of substeps
+        or iterations. The mass dscale is applied per substep as 
+        dscale^(1/substeps), so that the damping per call stays the same.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Timestep of the whole call, it's split into substeps. When set to
+            None, the time step of the simulator settings will be used. 
+            The default is None.
+        alpha : float, optional
+            Compliance of the edge constraints. The default is 0.0.
+        substeps, iterations, tolerance : optional
+            Override the simulator settings, see __init__(). The default is None.
+
+        Returns
+        -------
+        residual : float
+            Maximum constraint residual at the end of the step. It's also 
+            saved in solver_info with the number of iterations performed.
+        """
+        if dt is None: dt = self.dt
+        if substeps is None: substeps = self.substeps
+        if iterations is None: iterations = self.iterations
+        if tolerance is None: tolerance = self.tolerance
+        
+        if self._use_taichi():
+            residual, n_iterations = self._get_taichi_solver().simulate(self, dt, alpha, substeps, iterations, tolerance)
+            self.solver_info = {"substeps" : substeps,
+                                "iterations" : n_iterations,
+                                "residual" : residual}
+            return residual
+        
+        h = dt / substeps
+        free, springs = self._get_active_sets()
+        dscales = self.mass_dscales[free] ** (1.0 / substeps)
+        n_iterations = 0
+        residual = 0.0
+        for _ in range(substeps):
+            # Predict locations
+            forces = self.get_spring_forces(springs)
+            P = self.positions.copy()
+            P[free] = self.kernels.predict_positions(self.positions[free], self.velocities[free], forces[free],
+                                                     self.inv_masses[free], dscales, h)
             
+            # Solve the constraints, multipliers are reset at every substep
+            if self.edge_constraint:
+                self.lambdas = np.zeros(self.n_springs, dtype=self.dtype)
+                for _ in range(iterations):
+                    P = self.satisfy_edge_constraints(P, alpha, dt=h, lambdas=self.lambdas, spring_idxs=springs)
+                    n_iterations += 1
+                    if tolerance is not None:
+                        residual = self.get_constraint_residual(P, alpha, dt=h, lambdas=self.lambdas, spring_idxs=springs)
+                        if residual < tolerance: break
+            if self.self_collision:
+                P = self.satisfy_collision_constraints(P, free)
+            if self.colliders:
+                P = self.satisfy_collider_constraints(P, free)
             
+            self.velocities[free] = (P[free] - self.positions[free]) / h
+            self.positions = P
+        
+        if self.edge_constraint:
+            residual = self.get_constraint_residual(self.positions, alpha, dt=h, lambdas=self.lambdas, spring_idxs=springs)
+        self.solver_info = {"substeps" : substeps,
+                            "iterations" : n_iterations,
+                            "residual" : residual}
+        return residual
+            
+    def simulate_pd(self, dt=None, iterations=None):
+        """
+        Mass-Spring simulation with Projective Dynamics. The global system 
+        matrix is factorized at the first call and reused until the topology,
+        masses, stiffnesses or the time step change, so every iteration is a
+        local spring projection plus a back substitution. It's meant for rigs
+        with constant topology. Spring damping is not used in this mode, use 
+        the mass dscale to damp the motion.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Timestep for the integration. When set to None, the time step of the simulator settings will
+            be used. The default is None.
+        iterations : int, optional
+            Number of local-global iterations. If None, the simulator 
+            setting is used. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if dt is None: dt = self.dt
+        if iterations is None: iterations = self.iterations
+        
+        if self._pd_solver is None or self._pd_solver.dt != dt:
+            self._pd_solver = ProjectiveDynamicsSolver(self.edges, self.stiffnesses * self.spring_dscales,
+                                                       self.particle_masses, self.free_mask, dt)
+        
+        # Inertial prediction with gravity as the external force
+        accelerations = self.gravities * self.free_mask[:, None]
+        y = self.positions + dt * self.velocities * self.mass_dscales[:, None] + dt * dt * accelerations
+        
+        P = self._pd_solver.solve(y.copy(), y, self.rest_lengths, iterations=iterations)
+        
+        # Fixed particles stay where they are (they can only be moved kinematically)
+        P[self._pd_solver.fixed] = self.positions[self._pd_solver.fixed]
+        self.velocities = (P - self.positions) / dt
+        self.positions = P
+    
+    def simulate_implicit(self, dt=None, tol=1e-8, maxiter=200):
+        """
+        Mass-Spring simulation with implicit (backward) Euler integration. 
+        Unlike the explicit integrators it stays stable for stiff springs and
+        large time steps. The linearized system is solved with a conjugate 
+        gradient that's warm started from the previous velocity change. Edge
+        constraints are not applied in this mode.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Timestep for the integration. When set to None, the time step of the simulator settings will
+            be used. The default is None.
+        tol : float, optional
+            Relative residual tolerance of the conjugate gradient. The default is 1e-8.
+        maxiter : int, optional
+            Maximum conjugate gradient iterations. The default is 200.
+
+        Returns
+        -------
+        None.
+
+        """
+        if dt is None: dt = self.dt
+        
+        free = self.free_mask
+        if self._implicit_dv is None or self._implicit_dv.shape != self.positions.shape:
+            self._implicit_dv = None
+            
+        dv, self.solver_info = implicit_euler_velocity_update(self.positions, self.velocities,
+                                                              self.particle_masses, self.gravities,
+                                                              self.edges, self.stiffnesses, self.dampings,
+                                                              self.spring_dscales, self.rest_lengths,
+                                                              dt, free, dv0=self._implicit_dv, 
+                                                              tol=tol, maxiter=maxiter)
+        self._implicit_dv = dv
+        
+        # Optionally, damp velocities
+        velocities = (self.velocities[free] + dv[free]) * self.mass_dscales[free, None]
+        self.velocities[free] = velocities
+        self.positions[free] += dt * velocities
+    
     def simulate_euler(self, dt=None):
         """
         Mass-Spring simulation with explicit Euler Integration (TODO: needs verification).
@@ -338,22 +1121,13 @@ class MassSpringSystem:
         """
         if dt is None:
             dt = self.dt
-            
-        n_masses = len(self.masses)
-        for i in range(n_masses):
-            # Constraint: If a mass is zero, don't exert any force (f=ma=0)
-            # that makes the mass fixed in space (world position still can be changed globally)
-            # Also this allows us to not divide by zero in the acceleration computation.
-            if self.masses[i].mass < 1e-12:
-                continue
-            
-            force = self.masses[i].get_total_spring_forces()
-            
-            acc = force / self.masses[i].mass
-            velocity = self.masses[i].velocity + acc * dt
-            #previous_position = self.masses[i].center.copy()            
-            #self.masses[i].prev_center = previous_position
-            self.masses[i].center += velocity * dt * self.masses[i].dscale
+        
+        free, springs = self._get_active_sets()
+        forces = self.get_spring_forces(springs)
+        
+        acc = forces[free] / self.particle_masses[free, None]
+        velocity = self.velocities[free] + acc * dt
+        self.positions[free] += velocity * dt * self.mass_dscales[free, None]
             
     
     def simulate_verlet(self, dt=None):
@@ -375,72 +1149,303 @@ class MassSpringSystem:
         if dt is None: dt = self.dt
         assert dt <= 1.0, f"Please provide a smaller time step, expected <= 1.0, got {dt}."
         
-        n_masses = len(self.masses)
-        for i in range(n_masses):
-            # Constraint: If a mass is zero, i.e. fixed mass, don't exert any force (f=ma=0).
-            if self.masses[i].mass < 1e-12:
-                continue
-            else:
-                force = self.masses[i].get_total_spring_forces()
-                
-                p_prev = self.masses[i].prev_center 
-                self.masses[i].prev_center  = self.masses[i].center
-                
-                p_new =  p_prev + dt * self.masses[i].velocity + force * dt * dt / self.masses[i].mass
-                velocity = (p_new - p_prev) / dt
-                # Optionlly dampen the velocity 
-                velocity = velocity * self.masses[i].dscale
-                
-                self.masses[i].velocity = velocity
-                self.masses[i].center = p_new
-                
-               
-            
+        free, springs = self._get_active_sets()
+        forces = self.get_spring_forces(springs)
+        
+        p_prev = self.prev_positions[free]
+        self.prev_positions[free] = self.positions[free]
+        
+        p_new =  p_prev + dt * self.velocities[free] + forces[free] * dt * dt / self.particle_masses[free, None]
+        velocity = (p_new - p_prev) / dt
+        # Optionlly dampen the velocity 
+        velocity = velocity * self.mass_dscales[free, None]
+        
+        self.velocities[free] = velocity
+        self.positions[free] = p_new
     
     def add_mass(self, mass_coordinate, mass=_DEFAULT_MASS, dscale=_DEFAULT_MASS_SCALE,
-                 gravity=False, verbose=VERBOSE):
-        mass = Particle(mass_coordinate, mass=mass, dscale=dscale, gravity=gravity)
+                 gravity=False, radius=0.05, verbose=VERBOSE):
+        """
+        Add a point particle to the system. 
+
+        Parameters
+        ----------
+        mass_coordinate : np.ndarray
+            3D coordinate of the particle.
+        mass : float, optional
+            Mass of the particle. The default is _DEFAULT_MASS.
+        dscale : float, optional
+            Scales the particle velocity at every step, use [0.0, 1.0] to slow
+            down the particle. The default is _DEFAULT_MASS_SCALE.
+        gravity : bool or np.ndarray or List, optional
+            Sets the gravitational acceleration of the particle.
+            It can be either provided as a 3d vector or can be set True
+            to set it [0.0, 0.0, -9.81]. The default is False.
+        radius : float, optional
+            Radius of the particle. The default is 0.05.
+
+        Returns
+        -------
+        int
+            Index of the added particle in the system.
+
+        """
+        MAX_ALLOWED_MASS = 999
+        assert mass < MAX_ALLOWED_MASS, f"Provided mass {mass} is greater than maximum allowed mass {MAX_ALLOWED_MASS}"
         
-        if type(mass) is Particle:
-            if verbose: print(f">> Added mass at {mass.center}")
-            self.masses.append(mass)
-            return len(self.masses) - 1  # Return the index of the appended mass
-        else:
-            print(f"Expected Particle class, got {type(mass)}")
+        if mass > 1e-15: w = 1 / mass 
+        else: 
+            w = 0.0
+            print(">> WARNING: Found zero mass, initializing its weight to zero.")
+        
+        coordinate = np.array(mass_coordinate, dtype=float).reshape(1, _SPACE_DIMS_)
+        self.positions = np.append(self.positions, coordinate, axis=0)
+        self.prev_positions = np.append(self.prev_positions, coordinate, axis=0)
+        self.velocities = np.append(self.velocities, np.zeros((1, _SPACE_DIMS_)), axis=0)
+        self.particle_masses = np.append(self.particle_masses, mass)
+        self.inv_masses = np.append(self.inv_masses, w)
+        self.mass_dscales = np.append(self.mass_dscales, dscale)
+        self.radii = np.append(self.radii, radius)
+        self.gravities = np.append(self.gravities, [_parse_gravity(gravity)], axis=0)
+        self.free_mask = np.append(self.free_mask, True)
+        self.free_indices = np.append(self.free_indices, self.n_masses - 1)
+        self.mass_ids = np.append(self.mass_ids, self._new_ids(1, "_mass_slots"))
+        if self._incidence is not None: self._incidence.append(set())
+        if self._free_slots is not None: self._free_slots = np.append(self._free_slots, len(self.free_indices) - 1)
+        self._cast_state()
+        self._invalidate_topology()
+        
+        if verbose: print(f">> Added mass at {self.positions[-1]}")
+        return self.n_masses - 1  # Return the index of the appended mass
+            
+    def add_masses(self, mass_coordinates, mass=_DEFAULT_MASS, dscale=_DEFAULT_MASS_SCALE,
+                   gravity=False, radius=0.05, verbose=VERBOSE):
+        """
+        Add many point particles at once, see add_mass(). 
+
+        Parameters
+        ----------
+        mass_coordinates : np.ndarray
+            Particle locations, has shape (n, 3).
+        mass, dscale, radius : float or np.ndarray, optional
+            Particle parameters, either a single value for all particles or
+            an array of shape (n, ).
+        gravity : bool or np.ndarray or List, optional
+            Gravitational acceleration shared by all particles, see add_mass().
+
+        Returns
+        -------
+        np.ndarray
+            Indices of the added particles in the system, has shape (n, ).
+        """
+        MAX_ALLOWED_MASS = 999
+        coordinates = np.array(mass_coordinates, dtype=float).reshape(-1, _SPACE_DIMS_)
+        n = len(coordinates)
+        masses = np.broadcast_to(np.asarray(mass, dtype=float), (n,))
+        assert np.all(masses < MAX_ALLOWED_MASS), f"Provided masses are greater than maximum allowed mass {MAX_ALLOWED_MASS}"
+        
+        zero_mass = masses <= 1e-15
+        if np.any(zero_mass): print(f">> WARNING: Found {np.sum(zero_mass)} zero masses, initializing their weights to zero.")
+        w = np.divide(1.0, masses, out=np.zeros(n), where=~zero_mass)
+        
+        first_idx = self.n_masses
+        self.positions = np.concatenate((self.positions, coordinates))
+        self.prev_positions = np.concatenate((self.prev_positions, coordinates))
+        self.velocities = np.concatenate((self.velocities, np.zeros((n, _SPACE_DIMS_))))
+        self.particle_masses = np.concatenate((self.particle_masses, masses))
+        self.inv_masses = np.concatenate((self.inv_masses, w))
+        self.mass_dscales = np.concatenate((self.mass_dscales, np.broadcast_to(dscale, (n,))))
+        self.radii = np.concatenate((self.radii, np.broadcast_to(radius, (n,))))
+        self.gravities = np.concatenate((self.gravities, np.tile(_parse_gravity(gravity), (n, 1))))
+        self.free_mask = np.concatenate((self.free_mask, np.ones(n, dtype=bool)))
+        n_free = len(self.free_indices)
+        self.free_indices = np.concatenate((self.free_indices, np.arange(first_idx, first_idx + n)))
+        self.mass_ids = np.concatenate((self.mass_ids, self._new_ids(n, "_mass_slots")))
+        if self._incidence is not None: self._incidence.extend(set() for _ in range(n))
+        if self._free_slots is not None: self._free_slots = np.concatenate((self._free_slots, np.arange(n_free, n_free + n)))
+        self._cast_state()
+        self._invalidate_topology()
+        
+        if verbose: print(f">> Added {n} masses")
+        return np.arange(first_idx, first_idx + n)
             
     def fix_mass(self, mass_idx, verbose=VERBOSE):
         # Constraint: If a mass is zero, don't exert any force (f=ma=0)
         # that makes the mass fixed in space (world position still can be changed globally)
         # Also this allows us to not divide by zero in the acceleration computation.
-        self.masses[mass_idx].mass = 0.0
-        self.masses[mass_idx].w = 0.0
-        self.fixed_indices.append(mass_idx)
-        if verbose: print(f">> Fixed mass at location {self.masses[mass_idx].center}")
+        self.particle_masses[mass_idx] = 0.0
+        self.inv_masses[mass_idx] = 0.0
+        if self.free_mask[mass_idx]:
+            self.free_mask[mass_idx] = False
+            self.free_indices = np.flatnonzero(self.free_mask)
+            self.fixed_indices = np.append(self.fixed_indices, mass_idx)
+            self._free_slots = None
+        self._invalidate_topology()
+        if verbose: print(f">> Fixed mass at location {self.positions[mass_idx]}")
+        return
+    
+    def fix_masses(self, mass_idxs, verbose=VERBOSE):
+        """
+        Fix many particles at once, see fix_mass().
+        """
+        mass_idxs = np.asarray(mass_idxs, dtype=int).ravel()
+        _, first = np.unique(mass_idxs, return_index=True)
+        mass_idxs = mass_idxs[np.sort(first)]
+        mass_idxs = mass_idxs[self.free_mask[mass_idxs]] # Skip the ones that are already fixed
+        
+        self.particle_masses[mass_idxs] = 0.0
+        self.inv_masses[mass_idxs] = 0.0
+        self.free_mask[mass_idxs] = False
+        self.free_indices = np.flatnonzero(self.free_mask)
+        self.fixed_indices = np.concatenate((self.fixed_indices, mass_idxs))
+        self._free_slots = None
+        self._invalidate_topology()
+        if verbose: print(f">> Fixed {len(mass_idxs)} masses")
         return
     
+    def set_parameters(self, mass_idxs=None, mass=None, mass_dscale=None,
+                       spring_idxs=None, stiffness=None, damping=None, spring_dscale=None):
+        """
+        Update the physical parameters of the given particles and springs in 
+        place, without changing the topology or the simulation state. The 
+        parameters can be a scalar or an array with a value per index. The 
+        cached Projective Dynamics factorization and the implicit warm start
+        are dropped, since they depend on the parameters.
+
+        Parameters
+        ----------
+        mass_idxs : np.ndarray, optional
+            Particles to update. If None, all particles. The default is None.
+        mass : float or np.ndarray, optional
+            Particle masses. Fixed particles keep zero mass. The default is None.
+        mass_dscale : float or np.ndarray, optional
+            Velocity damping scales of the particles. The default is None.
+        spring_idxs : np.ndarray, optional
+            Springs to update. If None, all springs. The default is None.
+        stiffness, damping, spring_dscale : float or np.ndarray, optional
+            Spring parameters. The default is None.
+
+        Returns
+        -------
+        None.
+        """
+        mass_idxs = np.arange(self.n_masses) if mass_idxs is None else np.asarray(mass_idxs, dtype=int).ravel()
+        spring_idxs = np.arange(self.n_springs) if spring_idxs is None else np.asarray(spring_idxs, dtype=int).ravel()
+        
+        if mass is not None:
+            mass = np.broadcast_to(np.asarray(mass, dtype=self.dtype), mass_idxs.shape)
+            free = self.free_mask[mass_idxs]
+            assert np.all(mass[free] > 1e-15), "Expected free masses to have positive mass."
+            self.particle_masses[mass_idxs[free]] = mass[free]
+            self.inv_masses[mass_idxs[free]] = 1.0 / mass[free]
+        if mass_dscale is not None: self.mass_dscales[mass_idxs] = mass_dscale
+        if stiffness is not None: self.stiffnesses[spring_idxs] = stiffness
+        if damping is not None: self.dampings[spring_idxs] = damping
+        if spring_dscale is not None: self.spring_dscales[spring_idxs] = spring_dscale
+        
+        self._pd_solver = None
+        self._implicit_dv = None
+    
     def get_free_mass_indices(self):
-        indices = np.arange(0, len(self.masses))
-        free_mass_indices = np.delete(indices, self.fixed_indices)
-        return np.array(free_mass_indices)
+        return self.free_indices.copy()
+    
+    def set_kinematic_positions(self, indices, positions):
+        """
+        Move the given fixed particles to new locations in bulk, e.g. to follow
+        an animated skeleton. Their previous locations are saved as in 
+        translate_mass().
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            Indices of fixed particles, has shape (m, ).
+        positions : np.ndarray
+            New particle locations, has shape (m, 3).
+
+        Returns
+        -------
+        None.
+        """
+        indices = np.asarray(indices, dtype=int)
+        assert not np.any(self.free_mask[indices]), "Expected kinematic particles to be fixed, use fix_mass() first."
+        
+        self.prev_positions[indices] = self.positions[indices]
+        self.positions[indices] = positions
+        self.wake(indices)
         
     def remove_mass(self, mass_idx):
-        # TODO: remove mass dictionary entry
-        print("WARNING: This function remove_mass() have not been implemented yet.")
-        pass
+        """
+        Remove a particle together with its springs. The last particle is 
+        moved to the freed row, so the index of that particle changes but 
+        Particle handles stay valid.
+
+        Parameters
+        ----------
+        mass_idx : int or Particle
+            Row of the particle, or its handle.
+
+        Returns
+        -------
+        None.
+        """
+        if isinstance(mass_idx, Particle): mass_idx = mass_idx.idx
+        mass_idx = int(mass_idx)
+        assert 0 <= mass_idx < self.n_masses, f"Provided mass index {mass_idx} is out of bounds."
+        
+        incidence, free_slots = self._get_incidence(), self._get_free_slots()
+        for spring_idx in sorted(incidence[mass_idx], reverse=True): # Removing from the end keeps the rest valid
+            self.remove_spring(spring_idx)
+        
+        last = self.n_masses - 1
+        removed_id, moved_id = self.mass_ids[mass_idx], self.mass_ids[last]
+        particle_arrays = self._PARTICLE_ARRAYS
+        if self._implicit_dv is not None and len(self._implicit_dv) == self.n_masses: 
+            particle_arrays += ("_implicit_dv",)
+        self._swap_remove(particle_arrays, mass_idx, self.n_masses)
+        
+        # Swap-remove the particle from free_indices
+        slot = free_slots[mass_idx]
+        if slot >= 0:
+            moved_free = self.free_indices[-1]
+            self.free_indices[slot] = moved_free
+            free_slots[moved_free] = slot
+            self.free_indices = self.free_indices[:-1]
+            free_slots[mass_idx] = -1
+        else:
+            self.fixed_indices = self.fixed_indices[self.fixed_indices != mass_idx]
+        
+        # Only the springs, the free or fixed index of the moved particle point to its new row
+        if mass_idx != last:
+            for spring_idx in incidence[last]:
+                row = self.edges[spring_idx]
+                row[row == last] = mass_idx
+            incidence[mass_idx] = incidence[last]
+            if free_slots[last] >= 0: self.free_indices[free_slots[last]] = mass_idx
+            else: self.fixed_indices[self.fixed_indices == last] = mass_idx
+            free_slots[mass_idx] = free_slots[last]
+        incidence.pop()
+        self._free_slots = free_slots[:-1]
+        
+        self._mass_slots[moved_id] = mass_idx
+        self._mass_slots[removed_id] = -1
+        self._invalidate_topology()
+        return
     
     def translate_mass(self, mass_idx, translate_vec):
         # TODO: why don't you write a typecheck function in sanity.py?
         assert type(mass_idx) is int, f"Expected mass_idx to be int, got {type(mass_idx)}"
-        assert mass_idx < len(self.masses), "Provided mass index is out of bounds."
+        assert mass_idx < self.n_masses, "Provided mass index is out of bounds."
         
-        self.masses[mass_idx].prev_center = self.masses[mass_idx].center
-        self.masses[mass_idx].center += translate_vec
+        self.prev_positions[mass_idx] = self.positions[mass_idx]
+        self.positions[mass_idx] += translate_vec
+        self.wake(mass_idx) # Fixed masses wake their islands at the next step
         return
     
     def update_mass_location(self, mass_idx, new_location):
         if type(mass_idx) is int:
-            assert mass_idx < len(self.masses)
-            self.masses[mass_idx].center = new_location
+            assert mass_idx < self.n_masses
+            self.positions[mass_idx] = new_location
+            self.wake(mass_idx)
         else:
             print(">> Please provide a valid mass index as type int.")
     
@@ -449,39 +1454,233 @@ class MassSpringSystem:
                        second_mass_idx : int, 
                        stiffness : float = _DEFAULT_STIFFNESS, 
                        damping : float = _DEFAULT_DAMPING,
-                       dscale : float = _DEFAULT_SPRING_SCALE):
+                       dscale : float = _DEFAULT_SPRING_SCALE,
+                       verbose : bool = VERBOSE):
         
         assert type(first_mass_idx) == int and type(second_mass_idx) == int, f"Expected type int, got {type(first_mass_idx)}."
         assert first_mass_idx != second_mass_idx, "Cannot connect particle to itself."
         
-        spring = Spring(self.masses[first_mass_idx], 
-                        self.masses[second_mass_idx], 
-                        stiffness=stiffness, damping=damping, dscale=dscale)
+        rest_length = LA.norm(self.positions[first_mass_idx] - self.positions[second_mass_idx])
+        if verbose:
+            if rest_length < 1e-20:
+                print(">> WARNING: Spring initialized at length zero.")
         
-        self.masses[first_mass_idx].add_spring(spring)
-        self.masses[second_mass_idx].add_spring(spring)
+        self.edges = np.append(self.edges, [[first_mass_idx, second_mass_idx]], axis=0)
+        self.stiffnesses = np.append(self.stiffnesses, stiffness)
+        self.dampings = np.append(self.dampings, damping)
+        self.spring_dscales = np.append(self.spring_dscales, dscale)
+        self.rest_lengths = np.append(self.rest_lengths, rest_length)
+        self.spring_ids = np.append(self.spring_ids, self._new_ids(1, "_spring_slots"))
+        if self._incidence is not None:
+            self._incidence[first_mass_idx].add(self.n_springs - 1)
+            self._incidence[second_mass_idx].add(self.n_springs - 1)
+        self._cast_state()
         
-        self.connections.append([first_mass_idx, second_mass_idx])
-        self.rest_lengths.append(spring.rest_length)
+        # Extend the coloring with the new spring
+        if self._edge_color_ids is not None:
+            colors = np.append(self._edge_color_ids, 0)
+            colors[-1] = color_new_edge(self.edges, colors, self.n_springs - 1, ~self.free_mask)
+            self._edge_color_ids = colors
+        self._invalidate_topology()
         return
     
-    def disconnect_masses(self, mass_first : Particle, mass_second : Particle):
-        pass
+    def connect_many(self, edges, stiffness=_DEFAULT_STIFFNESS, damping=_DEFAULT_DAMPING,
+                     dscale=_DEFAULT_SPRING_SCALE, verbose=VERBOSE):
+        """
+        Connect many pairs of masses at once, see connect_masses(). Springs 
+        are added as given, use simulation.graph.unique_edges() to remove 
+        the duplicates beforehand.
+
+        Parameters
+        ----------
+        edges : np.ndarray
+            Particle index pairs, has shape (n_springs, 2).
+        stiffness, damping, dscale : float or np.ndarray, optional
+            Spring parameters, either a single value for all springs or an 
+            array of shape (n_springs, ).
+
+        Returns
+        -------
+        None.
+        """
+        edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+        n = len(edges)
+        assert np.all(edges[:, 0] != edges[:, 1]), "Cannot connect particle to itself."
+        assert n == 0 or edges.max() < self.n_masses, "Provided mass index is out of bounds."
+        
+        rest_lengths = LA.norm(self.positions[edges[:, 0]] - self.positions[edges[:, 1]], axis=-1)
+        if verbose and np.any(rest_lengths < 1e-20):
+            print(f">> WARNING: {np.sum(rest_lengths < 1e-20)} springs initialized at length zero.")
+        
+        self.edges = np.concatenate((self.edges, edges))
+        self.stiffnesses = np.concatenate((self.stiffnesses, np.broadcast_to(stiffness, (n,))))
+        self.dampings = np.concatenate((self.dampings, np.broadcast_to(damping, (n,))))
+        self.spring_dscales = np.concatenate((self.spring_dscales, np.broadcast_to(dscale, (n,))))
+        self.rest_lengths = np.concatenate((self.rest_lengths, rest_lengths))
+        self.spring_ids = np.concatenate((self.spring_ids, self._new_ids(n, "_spring_slots")))
+        if self._incidence is not None:
+            for spring_idx, (i, j) in enumerate(edges.tolist(), start=self.n_springs - n):
+                self._incidence[i].add(spring_idx)
+                self._incidence[j].add(spring_idx)
+        self._cast_state()
+        self._invalidate_topology(recolor=True)
+        return
+    
+    def _get_incidence(self):
+        # Spring rows of every particle as a list of sets, so that a removal
+        # only touches the springs of the removed and the moved particles
+        if self._incidence is None:
+            self._incidence = [set() for _ in range(self.n_masses)]
+            for spring_idx, (i, j) in enumerate(self.edges.tolist()):
+                self._incidence[i].add(spring_idx)
+                self._incidence[j].add(spring_idx)
+        return self._incidence
     
-    def get_mass_locations(self):
-        # TODO: could we store it dynamically rather than gathering them every time?
-        mass_locations = np.zeros((len(self.masses),_SPACE_DIMS_))
-        for i, mass_particle in enumerate(self.masses):
-            mass_locations[i] = mass_particle.center
-        return mass_locations
+    def _get_free_slots(self):
+        if self._free_slots is None:
+            self._free_slots = np.full(self.n_masses, -1, dtype=int)
+            self._free_slots[self.free_indices] = np.arange(len(self.free_indices))
+        return self._free_slots
+    
+    def _swap_remove(self, array_names, idx, n_rows):
+        # Move the last row to idx and drop the last row, no other row moves
+        last = n_rows - 1
+        for name in array_names:
+            array = getattr(self, name)
+            array[idx] = array[last]
+            setattr(self, name, array[:last])
+    
+    def remove_spring(self, spring_idx):
+        """
+        Remove a spring, e.g. to tear cloth. The last spring is moved to the
+        freed row, so the index of that spring changes but Spring handles stay
+        valid. The edge coloring is updated in place.
+
+        Parameters
+        ----------
+        spring_idx : int or Spring
+            Row of the spring in the edge arrays, or its handle.
+
+        Returns
+        -------
+        None.
+        """
+        if isinstance(spring_idx, Spring): spring_idx = spring_idx.idx
+        spring_idx = int(spring_idx)
+        assert 0 <= spring_idx < self.n_springs, f"Provided spring index {spring_idx} is out of bounds."
+        
+        last = self.n_springs - 1
+        if self._incidence is not None:
+            for mass_idx in self.edges[spring_idx]: self._incidence[mass_idx].discard(spring_idx)
+            if spring_idx != last:
+                for mass_idx in self.edges[last]:
+                    self._incidence[mass_idx].discard(last)
+                    self._incidence[mass_idx].add(spring_idx)
+        
+        removed_id, moved_id = self.spring_ids[spring_idx], self.spring_ids[last]
+        spring_arrays = self._SPRING_ARRAYS
+        if self._edge_color_ids is not None: spring_arrays += ("_edge_color_ids",)
+        if len(self.lambdas) == self.n_springs: spring_arrays += ("lambdas",)
+        self._swap_remove(spring_arrays, spring_idx, self.n_springs)
+        
+        self._spring_slots[moved_id] = spring_idx
+        self._spring_slots[removed_id] = -1
+        self._invalidate_topology()
+        return
+    
+    def disconnect_masses(self, mass_first, mass_second):
+        """
+        Remove the springs between two particles.
+
+        Parameters
+        ----------
+        mass_first, mass_second : int or Particle
+            Particle indices or handles.
+
+        Returns
+        -------
+        n_removed : int
+            Number of removed springs.
+        """
+        if isinstance(mass_first, Particle): mass_first = mass_first.idx
+        if isinstance(mass_second, Particle): mass_second = mass_second.idx
+        
+        i, j = self.edges[:, 0], self.edges[:, 1]
+        between = np.flatnonzero(((i == mass_first) & (j == mass_second)) | 
+                                 ((i == mass_second) & (j == mass_first)))
+        for spring_idx in between[::-1]: # Removing from the end keeps the remaining indices valid
+            self.remove_spring(spring_idx)
+        return len(between)
+    
+    def get_mass_locations(self, copy=True):
+        """
+        Get the particle locations of shape (n_masses, 3). If copy is False, 
+        the returned array is the storage of the system that's updated in place
+        by some operations, and replaced by others, so do not hold on to it. 
+        """
+        if copy: return self.positions.copy()
+        return self.positions
+    
+    def snapshot(self, path=None):
+        """
+        Save the simulation state, i.e. the particle positions, previous 
+        positions, velocities and the XPBD multipliers, into a single flat
+        buffer of the system dtype. The topology and the parameters are not
+        saved, so the state can only be restored to a system with the same
+        particles and springs.
+
+        Parameters
+        ----------
+        path : str, optional
+            If given, the buffer is also saved as an .npy file, that restore()
+            maps into memory instead of reading. The default is None.
+
+        Returns
+        -------
+        state : np.ndarray
+            The snapshot buffer.
+        """
+        header = np.array([self.n_masses, self.n_springs, len(self.lambdas)], dtype=np.int64).view(self.dtype)
+        state = np.concatenate([header] + [getattr(self, name).astype(self.dtype, copy=False).ravel() for name in self._STATE_ARRAYS])
+        if path is not None: np.save(path, state)
+        return state
+    
+    def restore(self, state, copy=True):
+        """
+        Restore the simulation state from a snapshot() buffer or its .npy 
+        file. The state arrays become views of a single copy of the buffer, 
+        or of the buffer itself if copy is False, in which case it must not be 
+        used again. Read-only buffers, e.g. the memory mapped file, and buffers
+        of another dtype are always copied. The islands are woken up, and the 
+        warm start of the implicit solver is dropped.
+        """
+        if isinstance(state, str): state = np.load(state, mmap_mode="r")
+        state = np.asarray(state)
+        header_size = self._SNAPSHOT_HEADER * 8 // state.itemsize
+        n_masses, n_springs, n_lambdas = np.ascontiguousarray(state[:header_size]).view(np.int64)
+        assert (n_masses, n_springs) == (self.n_masses, self.n_springs), f"Expected a snapshot of {self.n_masses} masses and {self.n_springs} springs, got {n_masses} and {n_springs}."
+        expected_size = header_size + 3 * _SPACE_DIMS_ * n_masses + n_lambdas
+        assert len(state) == expected_size, f"Expected a snapshot of size {expected_size}, got {len(state)}."
+        
+        state = state[header_size:]
+        if copy or not state.flags.writeable: state = np.array(state, dtype=self.dtype)
+        else: state = np.asarray(state, dtype=self.dtype)
+        
+        shapes = [(n_masses, _SPACE_DIMS_)] * 3 + [(n_lambdas,)]
+        offset = 0
+        for name, shape in zip(self._STATE_ARRAYS, shapes):
+            size = int(np.prod(shape))
+            setattr(self, name, state[offset:offset + size].reshape(shape))
+            offset += size
+        
+        self._implicit_dv = None
+        self._kinematic_snapshot = None
+        self.wake()
     
     def get_spring_meshes(self):
         # TODO: is this function even used? we should remove it.
         meshes = []
-        for line in self.connections:
-            mass_first = self.masses[line[0]]
-            mass_second = self.masses[line[1]]
-            
-            connection_mesh =  pv.Line(mass_first.center, mass_second.center)
+        for line in self.edges:
+            connection_mesh =  pv.Line(self.positions[line[0]], self.positions[line[1]])
             meshes.append(connection_mesh)
-        return meshes
\ No newline at end of file
+        return meshes
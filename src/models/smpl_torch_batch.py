@@ -14,27 +14,31 @@ from torch.nn import Module
 import os
 from time import time
 
+from ..utils.precision import torch_dtype
+
 class SMPLModel(Module):
-  def __init__(self, device, model_path):
-    
+  def __init__(self, device, model_path, dtype=None):
+    # dtype is torch.float32 or torch.float64 (or the numpy equivalents), 
+    # if None the default of utils.precision is used.
     super(SMPLModel, self).__init__()
+    self.dtype = torch_dtype(dtype)
     with open(model_path, 'rb') as f:
       params = pickle.load(f)
     self.J_regressor = torch.from_numpy(
       np.array(params['J_regressor'].todense())
-    ).type(torch.float64)
+    ).type(self.dtype)
     if 'joint_regressor' in params.keys():
       self.joint_regressor = torch.from_numpy(
         np.array(params['joint_regressor'].T.todense())
-      ).type(torch.float64)
+      ).type(self.dtype)
     else:
       self.joint_regressor = torch.from_numpy(
         np.array(params['J_regressor'].todense())
-      ).type(torch.float64)
-    self.weights = torch.from_numpy(params['weights']).type(torch.float64)
-    self.posedirs = torch.from_numpy(params['posedirs']).type(torch.float64)
-    self.v_template = torch.from_numpy(params['v_template']).type(torch.float64)
-    self.shapedirs = torch.from_numpy(params['shapedirs']).type(torch.float64)
+      ).type(self.dtype)
+    self.weights = torch.from_numpy(params['weights']).type(self.dtype)
+    self.posedirs = torch.from_numpy(params['posedirs']).type(self.dtype)
+    self.v_template = torch.from_numpy(params['v_template']).type(self.dtype)
+    self.shapedirs = torch.from_numpy(params['shapedirs']).type(self.dtype)
     self.kintree_table = params['kintree_table']
     self.faces = params['f']
     self.device = device if device is not None else torch.device('cpu')
@@ -63,13 +67,13 @@ class SMPLModel(Module):
     theta_dim = theta.shape[0]
     r_hat = r / theta
     cos = torch.cos(theta)
-    z_stick = torch.zeros(theta_dim, dtype=torch.float64).to(r.device)
+    z_stick = torch.zeros(theta_dim, dtype=r.dtype).to(r.device)
     m = torch.stack(
       (z_stick, -r_hat[:, 0, 2], r_hat[:, 0, 1], r_hat[:, 0, 2], z_stick,
        -r_hat[:, 0, 0], -r_hat[:, 0, 1], r_hat[:, 0, 0], z_stick), dim=1)
     m = torch.reshape(m, (-1, 3, 3))
-    i_cube = (torch.eye(3, dtype=torch.float64).unsqueeze(dim=0) \
-             + torch.zeros((theta_dim, 3, 3), dtype=torch.float64)).to(r.device)
+    i_cube = (torch.eye(3, dtype=r.dtype).unsqueeze(dim=0) \
+             + torch.zeros((theta_dim, 3, 3), dtype=r.dtype)).to(r.device)
     A = r_hat.permute(0, 2, 1)
     dot = torch.matmul(A, r_hat)
     R = cos * i_cube + (1 - cos) * dot + torch.sin(theta) * m
@@ -90,7 +94,7 @@ class SMPLModel(Module):
 
     """
     ones = torch.tensor(
-      [[[0.0, 0.0, 0.0, 1.0]]], dtype=torch.float64
+      [[[0.0, 0.0, 0.0, 1.0]]], dtype=x.dtype
     ).expand(x.shape[0],-1,-1).to(x.device)
     ret = torch.cat((x, ones), dim=1)
     return ret
@@ -110,7 +114,7 @@ class SMPLModel(Module):
 
     """
     zeros43 = torch.zeros(
-      (x.shape[0], x.shape[1], 4, 3), dtype=torch.float64).to(x.device)
+      (x.shape[0], x.shape[1], 4, 3), dtype=x.dtype).to(x.device)
     ret = torch.cat((zeros43, x), dim=3)
     return ret
 
@@ -148,6 +152,7 @@ class SMPLModel(Module):
 
     """
     batch_num = betas.shape[0]
+    betas, pose, trans = betas.type(self.dtype), pose.type(self.dtype), trans.type(self.dtype)
     id_to_col = {self.kintree_table[1, i]: i
                  for i in range(self.kintree_table.shape[1])}
     parent = {
@@ -162,8 +167,8 @@ class SMPLModel(Module):
       v_posed = v_shaped
     else:
       R_cube = R_cube_big[:, 1:, :, :]
-      I_cube = (torch.eye(3, dtype=torch.float64).unsqueeze(dim=0) + \
-        torch.zeros((batch_num, R_cube.shape[1], 3, 3), dtype=torch.float64)).to(self.device)
+      I_cube = (torch.eye(3, dtype=self.dtype).unsqueeze(dim=0) + \
+        torch.zeros((batch_num, R_cube.shape[1], 3, 3), dtype=self.dtype)).to(self.device)
       lrotmin = (R_cube - I_cube).reshape(batch_num, -1, 1).squeeze(dim=2)
       v_posed = v_shaped + torch.tensordot(lrotmin, self.posedirs, dims=([1], [2]))
 
@@ -190,7 +195,7 @@ class SMPLModel(Module):
         torch.matmul(
           stacked,
           torch.reshape(
-            torch.cat((J, torch.zeros((batch_num, 24, 1), dtype=torch.float64).to(self.device)), dim=2),
+            torch.cat((J, torch.zeros((batch_num, 24, 1), dtype=self.dtype).to(self.device)), dim=2),
             (batch_num, 24, 4, 1)
           )
         )
@@ -198,7 +203,7 @@ class SMPLModel(Module):
     # Restart from here
     T = torch.tensordot(results, self.weights, dims=([1], [1])).permute(0, 3, 1, 2)
     rest_shape_h = torch.cat(
-      (v_posed, torch.ones((batch_num, v_posed.shape[1], 1), dtype=torch.float64).to(self.device)), dim=2
+      (v_posed, torch.ones((batch_num, v_posed.shape[1], 1), dtype=self.dtype).to(self.device)), dim=2
     )
     v = torch.matmul(T, torch.reshape(rest_shape_h, (batch_num, -1, 4, 1)))
     v = torch.reshape(v, (batch_num, -1, 4))[:, :, :3]
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 09:12:40 2026
+
+Array kernels and solvers used by the MassSpringSystem in mass_spring.py.
+
+@author: bartu
+"""
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:24:16 2026
+
+Kinematic colliders for the position based integrators. The colliders are
+moved by the animation, not by the simulation, so they push the particles
+out of their volume but they're never pushed back.
+
+The rigid bones of a skeleton are capsules, i.e. line segments with a
+radius. The capsules are stored in a bounding volume hierarchy that's built
+once from the rest pose and refit at every frame, so a particle is only
+tested against the capsules whose boxes it overlaps. The tree is traversed
+for all the particles together, a level at a time.
+
+Static or rigidly moving meshes are signed distance fields on a voxel grid,
+that are computed once with libigl and cached to disk. The distances and
+gradients are then looked up with trilinear interpolation, so the collision
+cost doesn't depend on the number of triangles of the mesh.
+
+@author: bartu
+"""
+import os
+import hashlib
+import numpy as np
+
+from .kernels import scatter_add
+
+class CapsuleBVH:
+    def __init__(self, box_mins, box_maxs):
+        """
+        Build a binary bounding volume hierarchy over the given boxes, by
+        splitting the box centers at the median of their widest axis. The
+        tree is kept when the boxes move, see refit().
+
+        Parameters
+        ----------
+        box_mins, box_maxs : np.ndarray
+            Corners of the primitive boxes, have shape (n_prims, 3).
+        """
+        n_prims = len(box_mins)
+        assert n_prims > 0, "Expected at least a single primitive to build the hierarchy."
+        centers = 0.5 * (box_mins + box_maxs)
+
+        # Nodes are stored in flat arrays, children are -1 for the leaves and
+        # prims is -1 for the inner nodes.
+        left, right, prims, depths = [], [], [], []
+        def build(prim_idxs, depth):
+            node = len(left)
+            left.append(-1); right.append(-1); prims.append(-1); depths.append(depth)
+            if len(prim_idxs) == 1:
+                prims[node] = prim_idxs[0]
+                return node
+
+            points = centers[prim_idxs]
+            axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+            order = prim_idxs[np.argsort(points[:, axis], kind="stable")]
+            half = len(order) // 2
+            left[node] = build(order[:half], depth + 1)
+            right[node] = build(order[half:], depth + 1)
+            return node
+        build(np.arange(n_prims), 0)
+
+        self.left = np.array(left, dtype=int)
+        self.right = np.array(right, dtype=int)
+        self.prims = np.array(prims, dtype=int)
+        self.leaves = np.flatnonzero(self.prims >= 0)
+
+        # Inner nodes grouped by depth, the deepest first, for the refit
+        depths = np.array(depths, dtype=int)
+        inner = np.flatnonzero(self.prims < 0)
+        self._refit_levels = [inner[depths[inner] == d] for d in range(depths.max() - 1, -1, -1)]
+        self._refit_levels = [level for level in self._refit_levels if len(level)]
+
+        self.node_mins = np.empty((len(left), 3), dtype=box_mins.dtype)
+        self.node_maxs = np.empty((len(left), 3), dtype=box_maxs.dtype)
+        self.refit(box_mins, box_maxs)
+
+    @property
+    def depth(self):
+        return len(self._refit_levels) + 1
+
+    def refit(self, box_mins, box_maxs):
+        """
+        Update the node boxes bottom up for the moved primitive boxes,
+        without changing the tree.
+        """
+        self.node_mins[self.leaves] = box_mins[self.prims[self.leaves]]
+        self.node_maxs[self.leaves] = box_maxs[self.prims[self.leaves]]
+        for level in self._refit_levels:
+            self.node_mins[level] = np.minimum(self.node_mins[self.left[level]], self.node_mins[self.right[level]])
+            self.node_maxs[level] = np.maximum(self.node_maxs[self.left[level]], self.node_maxs[self.right[level]])
+
+    def query(self, query_mins, query_maxs):
+        """
+        Find the primitives whose boxes overlap the query boxes.
+
+        Parameters
+        ----------
+        query_mins, query_maxs : np.ndarray
+            Corners of the query boxes, have shape (n_queries, 3).
+
+        Returns
+        -------
+        query_idxs, prim_idxs : np.ndarray
+            Overlapping query and primitive index pairs, have shape (n_pairs, ).
+        """
+        queries = np.arange(len(query_mins))
+        nodes = np.zeros(len(query_mins), dtype=int)
+        found_queries, found_prims = [], []
+        while len(queries):
+            overlap = np.all((query_mins[queries] <= self.node_maxs[nodes]) &
+                             (query_maxs[queries] >= self.node_mins[nodes]), axis=-1)
+            queries, nodes = queries[overlap], nodes[overlap]
+
+            is_leaf = self.prims[nodes] >= 0
+            found_queries.append(queries[is_leaf])
+            found_prims.append(self.prims[nodes[is_leaf]])
+
+            queries, nodes = queries[~is_leaf], nodes[~is_leaf]
+            queries = np.concatenate((queries, queries))
+            nodes = np.concatenate((self.left[nodes], self.right[nodes]))
+        return np.concatenate(found_queries), np.concatenate(found_prims)
+
+def closest_points_on_segments(points, starts, ends, tol=1e-12):
+    """
+    Get the closest points on the segments to the given points, all arrays
+    have shape (n, 3).
+    """
+    segment = ends - starts
+    length_sq = np.sum(segment * segment, axis=-1)
+    t = np.divide(np.sum((points - starts) * segment, axis=-1), length_sq,
+                  out=np.zeros_like(length_sq), where=length_sq > tol)
+    return starts + np.clip(t, 0.0, 1.0)[:, None] * segment
+
+class CapsuleColliders:
+    def __init__(self, starts, ends, radii):
+        """
+        Kinematic capsule colliders, e.g. the rigid bones of a skeleton. Add
+        them to the colliders of a MassSpringSystem, and update() them at
+        every frame before simulating.
+
+        Parameters
+        ----------
+        starts, ends : np.ndarray
+            Endpoints of the capsule segments, have shape (n_capsules, 3).
+        radii : float or np.ndarray
+            Capsule radius, either shared or of shape (n_capsules, ).
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        self.radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(starts),)).copy()
+        assert np.all(self.radii >= 0.0), "Expected capsule radii to be non-negative."
+
+        self.starts, self.ends = None, None
+        self.bvh = None
+        self.contacts = np.empty((0, 2), dtype=int) # (particle, capsule) pairs of the last projection
+        self.update(starts, ends)
+
+    @classmethod
+    def from_bone_locations(cls, bone_locations, radii, bone_idxs=None):
+        """
+        Create capsules for the bones, given the bone locations with 2 joints
+        per bone as returned by Skeleton.pose_bones(), i.e. of shape
+        (2*n_bones, 3). If bone_idxs is given, only those bones are capsules.
+        """
+        bone_locations = np.asarray(bone_locations).reshape(-1, 2, 3)
+        if bone_idxs is not None: bone_locations = bone_locations[np.asarray(bone_idxs, dtype=int)]
+        return cls(bone_locations[:, 0], bone_locations[:, 1], radii)
+
+    @property
+    def n_capsules(self):
+        return len(self.radii)
+
+    def update(self, starts, ends):
+        """
+        Move the capsules to their new endpoints and refit the hierarchy.
+        """
+        self.starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        self.ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        assert len(self.starts) == self.n_capsules and len(self.ends) == self.n_capsules, f"Expected {self.n_capsules} capsules, got {len(self.starts)} starts and {len(self.ends)} ends."
+        if self.n_capsules == 0: return
+
+        box_mins = np.minimum(self.starts, self.ends) - self.radii[:, None]
+        box_maxs = np.maximum(self.starts, self.ends) + self.radii[:, None]
+        if self.bvh is None: self.bvh = CapsuleBVH(box_mins, box_maxs)
+        else:                self.bvh.refit(box_mins, box_maxs)
+
+    def update_from_bone_locations(self, bone_locations, bone_idxs=None):
+        """
+        Move the capsules to the posed bones, see from_bone_locations().
+        """
+        bone_locations = np.asarray(bone_locations).reshape(-1, 2, 3)
+        if bone_idxs is not None: bone_locations = bone_locations[np.asarray(bone_idxs, dtype=int)]
+        self.update(bone_locations[:, 0], bone_locations[:, 1])
+
+    def find_contacts(self, positions, point_radii, candidates=None):
+        """
+        Find the particles that overlap a capsule.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            Particle locations, has shape (n_masses, 3).
+        point_radii : np.ndarray
+            Particle radii, has shape (n_masses, ).
+        candidates : np.ndarray, optional
+            Indices of the particles that are tested. If None, all particles
+            are tested. The default is None.
+
+        Returns
+        -------
+        pairs : np.ndarray
+            Overlapping (particle, capsule) pairs, has shape (n_pairs, 2).
+        """
+        if candidates is None: candidates = np.arange(len(positions))
+        if self.n_capsules == 0 or len(candidates) == 0: return np.empty((0, 2), dtype=int)
+
+        points, r = positions[candidates], point_radii[candidates, None]
+        query_idxs, capsule_idxs = self.bvh.query(points - r, points + r)
+        particle_idxs = candidates[query_idxs]
+
+        # Narrow phase
+        closest = closest_points_on_segments(positions[particle_idxs], self.starts[capsule_idxs], self.ends[capsule_idxs])
+        diff = positions[particle_idxs] - closest
+        overlap = np.sum(diff * diff, axis=-1) < (point_radii[particle_idxs] + self.radii[capsule_idxs]) ** 2
+        return np.stack([particle_idxs[overlap], capsule_idxs[overlap]], axis=-1)
+
+    def project(self, P, point_radii, inv_masses, candidates=None, relaxation=1.0, tol=1e-12):
+        """
+        Push the particles at locations P out of the capsules, along the
+        normal from the closest point on the capsule segment. A particle in
+        many contacts gets the average of its corrections. Particles with zero
+        inverse mass are not moved.
+
+        Returns
+        -------
+        P : np.ndarray
+            The projected particle locations, updated in place.
+        """
+        self.contacts = self.find_contacts(P, point_radii, candidates)
+        if len(self.contacts) == 0: return P
+
+        i, c = self.contacts[:, 0], self.contacts[:, 1]
+        diff = P[i] - closest_points_on_segments(P[i], self.starts[c], self.ends[c])
+        distance = np.sqrt(np.sum(diff * diff, axis=-1))
+        penetration = point_radii[i] + self.radii[c] - distance
+
+        valid = (penetration > 0.0) & (inv_masses[i] > 0.0) & (distance > tol) # Particles on the segment have no normal
+        scale = np.divide(penetration, distance, out=np.zeros_like(distance), where=valid)
+        deltas = np.zeros_like(P)
+        scatter_add(deltas, i, (scale[:, None] * diff).astype(P.dtype, copy=False))
+
+        n_contacts = np.bincount(i[valid], minlength=len(P))
+        P += deltas * (relaxation / np.maximum(n_contacts, 1))[:, None]
+        return P
+
+def trilinear_interpolate(grid, origin, spacing, points):
+    """
+    Interpolate the values of a voxel grid at the given points.
+
+    Parameters
+    ----------
+    grid : np.ndarray
+        Values at the grid points, has shape (nx, ny, nz) or (nx, ny, nz, k).
+    origin : np.ndarray
+        Location of the grid point (0, 0, 0), has shape (3, ).
+    spacing : float
+        Distance between the neighboring grid points.
+    points : np.ndarray
+        Query locations, has shape (n_points, 3).
+
+    Returns
+    -------
+    values : np.ndarray
+        Interpolated values, has shape (n_points, ) or (n_points, k).
+    inside : np.ndarray
+        Boolean mask of the points inside the grid, the values of the other
+        points are taken from the closest boundary cell.
+    """
+    shape = np.array(grid.shape[:3])
+    coords = (points - origin) / spacing
+    inside = np.all((coords >= 0.0) & (coords <= shape - 1), axis=-1)
+
+    cells = np.clip(np.floor(coords).astype(int), 0, shape - 2)
+    t = np.clip(coords - cells, 0.0, 1.0)
+    i, j, k = cells[:, 0], cells[:, 1], cells[:, 2]
+    if grid.ndim == 4: t = t[:, :, None]
+    tx, ty, tz = t[:, 0], t[:, 1], t[:, 2]
+
+    c00 = grid[i, j, k] * (1 - tx) + grid[i + 1, j, k] * tx
+    c10 = grid[i, j + 1, k] * (1 - tx) + grid[i + 1, j + 1, k] * tx
+    c01 = grid[i, j, k + 1] * (1 - tx) + grid[i + 1, j, k + 1] * tx
+    c11 = grid[i, j + 1, k + 1] * (1 - tx) + grid[i + 1, j + 1, k + 1] * tx
+    c0 = c00 * (1 - ty) + c10 * ty
+    c1 = c01 * (1 - ty) + c11 * ty
+    return c0 * (1 - tz) + c1 * tz, inside
+
+def _sdf_cache_key(V, F, resolution, padding):
+    # Content hash of the mesh and the grid settings
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(V, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(F, dtype=np.int64).tobytes())
+    digest.update(f"{resolution}_{padding}".encode())
+    return digest.hexdigest()
+
+def compute_sdf_grid(V, F, resolution=64, padding=0.1):
+    """
+    Sample the signed distance of a closed triangle mesh on a voxel grid
+    around its bounding box, with libigl. Distances are negative inside.
+
+    Parameters
+    ----------
+    V, F : np.ndarray
+        Mesh vertices of shape (n_vertices, 3) and triangles of shape (n_faces, 3).
+    resolution : int, optional
+        Number of grid points along the longest side of the box. The default is 64.
+    padding : float, optional
+        Margin around the bounding box, relative to its longest side. The
+        default is 0.1.
+
+    Returns
+    -------
+    sdf : np.ndarray
+        Signed distances at the grid points, has shape (nx, ny, nz).
+    origin : np.ndarray
+        Location of the first grid point, has shape (3, ).
+    spacing : float
+        Distance between the neighboring grid points.
+    """
+    import igl # Only needed to build the grid, cached grids are loaded without it
+
+    V = np.asarray(V, dtype=np.float64)
+    F = np.asarray(F, dtype=np.int64)
+    box_min, box_max = V.min(axis=0), V.max(axis=0)
+    margin = padding * float(np.max(box_max - box_min))
+    origin = box_min - margin
+    spacing = float(np.max(box_max - box_min) + 2 * margin) / (resolution - 1)
+
+    shape = np.ceil((box_max + margin - origin) / spacing).astype(int) + 1
+    axes = [origin[d] + spacing * np.arange(shape[d]) for d in range(3)]
+    points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+    sdf = igl.signed_distance(points, V, F)[0]
+    return sdf.reshape(shape), origin, spacing
+
+class SDFCollider:
+    def __init__(self, sdf, origin, spacing, gradients=None):
+        """
+        Kinematic collider of a signed distance field on a voxel grid, see
+        from_mesh(). The collider can be moved rigidly with set_transform().
+
+        Parameters
+        ----------
+        sdf : np.ndarray
+            Signed distances at the grid points, has shape (nx, ny, nz).
+        origin : np.ndarray
+            Location of the first grid point, has shape (3, ).
+        spacing : float
+            Distance between the neighboring grid points.
+        gradients : np.ndarray, optional
+            Distance gradients at the grid points, has shape (nx, ny, nz, 3).
+            If None, they're computed with central differences. The default
+            is None.
+        """
+        self.sdf = np.asarray(sdf, dtype=float)
+        assert self.sdf.ndim == 3 and min(self.sdf.shape) >= 2, f"Expected a grid with at least 2 points per axis, got shape {self.sdf.shape}."
+        self.origin = np.asarray(origin, dtype=float)
+        self.spacing = float(spacing)
+        if gradients is None: gradients = np.stack(np.gradient(self.sdf, self.spacing), axis=-1)
+        self.gradients = np.asarray(gradients, dtype=float)
+
+        self.rotation = np.eye(3)
+        self.translation = np.zeros(3)
+        self.contacts = np.empty((0,), dtype=int) # Particles in contact at the last projection
+
+    @classmethod
+    def from_mesh(cls, V, F, resolution=64, padding=0.1, cache_dir=None):
+        """
+        Create the collider of a closed triangle mesh, see compute_sdf_grid().
+        If cache_dir is given, the grid is saved there, under the hash of the
+        mesh and the grid settings, and loaded back at the next call.
+        """
+        path = None
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, f"sdf_{_sdf_cache_key(V, F, resolution, padding)}.npz")
+            if os.path.exists(path): return cls.load(path)
+
+        collider = cls(*compute_sdf_grid(V, F, resolution, padding))
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            collider.save(path)
+        return collider
+
+    def save(self, path):
+        np.savez(path, sdf=self.sdf, gradients=self.gradients, origin=self.origin, spacing=self.spacing)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["sdf"], data["origin"], float(data["spacing"]), data["gradients"])
+
+    def set_transform(self, rotation=None, translation=None):
+        """
+        Move the collider rigidly, such that a point x of the grid is at
+        rotation @ x + translation.
+        """
+        self.rotation = np.eye(3) if rotation is None else np.asarray(rotation, dtype=float)
+        self.translation = np.zeros(3) if translation is None else np.asarray(translation, dtype=float)
+
+    def sample(self, points):
+        """
+        Get the signed distances and their gradients at the given points, in
+        the world space. The points outside the grid get infinite distance.
+
+        Returns
+        -------
+        distances : np.ndarray
+            Has shape (n_points, ).
+        gradients : np.ndarray
+            Has shape (n_points, 3).
+        """
+        local = (points - self.translation) @ self.rotation
+        distances, inside = trilinear_interpolate(self.sdf, self.origin, self.spacing, local)
+        gradients, _ = trilinear_interpolate(self.gradients, self.origin, self.spacing, local)
+        distances[~inside] = np.inf
+        return distances, gradients @ self.rotation.T
+
+    def project(self, P, point_radii, inv_masses, candidates=None, relaxation=1.0, tol=1e-12):
+        """
+        Push the particles at locations P out of the collider, along the
+        distance gradient. Particles with zero inverse mass are not moved.
+
+        Returns
+        -------
+        P : np.ndarray
+            The projected particle locations, updated in place.
+        """
+        if candidates is None: candidates = np.arange(len(P))
+        candidates = candidates[inv_masses[candidates] > 0.0]
+        distances, gradients = self.sample(P[candidates])
+        penetration = point_radii[candidates] - distances
+
+        norms = np.sqrt(np.sum(gradients * gradients, axis=-1))
+        valid = (penetration > 0.0) & (norms > tol) # Flat regions of the grid have no normal
+        self.contacts = candidates[valid]
+        scale = relaxation * penetration[valid] / norms[valid]
+        P[self.contacts] += (scale[:, None] * gradients[valid]).astype(P.dtype, copy=False)
+        return P
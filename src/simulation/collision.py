@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:52 2026
+
+Particle self-collision for the position based integrators. Particles are
+spheres with their radius, the contacts are found with a uniform spatial
+hash grid, so that only the particles in neighboring cells are tested
+instead of all pairs, and resolved as non-penetration constraints.
+
+The grid is rebuilt from the predicted locations at every (sub)step, all in
+vectorized form: particles are sorted by the hash key of their cell, and
+the candidates of every neighbor cell are the ranges of equal keys.
+
+@author: bartu
+"""
+import numpy as np
+
+from .kernels import scatter_add
+
+_HASH_PRIMES = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+_GROUP_PRIME = np.int64(2654435761)
+_NEIGHBOR_OFFSETS = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij"), axis=-1).reshape(-1, 3)
+
+def _hash_cells(cells, groups=None):
+    # Spatial hash of integer cell coordinates of shape (n, 3), and of the
+    # collision groups if given, so that the groups have separate grids. 
+    # Different cells can share a key, such candidates are rejected by the 
+    # narrow phase.
+    keys = cells * _HASH_PRIMES
+    keys = keys[:, 0] ^ keys[:, 1] ^ keys[:, 2]
+    if groups is not None: keys ^= groups * _GROUP_PRIME
+    return keys
+
+def find_contacts(positions, radii, cell_size=None, candidates=None, excluded_keys=None, groups=None):
+    """
+    Find the overlapping particle pairs with a spatial hash grid.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Particle locations, has shape (n_masses, 3).
+    radii : np.ndarray
+        Particle radii, has shape (n_masses, ).
+    cell_size : float, optional
+        Edge length of the grid cells. It should be at least twice the
+        largest radius, so that contacts are only in the neighboring cells.
+        If None, it's set to twice the largest radius. The default is None.
+    candidates : np.ndarray, optional
+        Indices of the particles that are tested, e.g. the movable ones. If
+        None, all particles are tested. The default is None.
+    excluded_keys : np.ndarray, optional
+        Sorted pair keys i * n_masses + j (i < j) of the pairs to ignore, e.g.
+        the particles connected by springs. The default is None.
+    groups : np.ndarray, optional
+        Collision group per particle, has shape (n_masses, ). If given, only
+        the particles of the same group collide, and the group is part of the
+        cell key, so the other groups are never candidates. The default is None.
+
+    Returns
+    -------
+    pairs : np.ndarray
+        Unique overlapping pairs (i, j) with i < j, has shape (n_pairs, 2).
+    """
+    n_masses = len(positions)
+    if candidates is None: candidates = np.arange(n_masses)
+    if len(candidates) < 2: return np.empty((0, 2), dtype=int)
+    if cell_size is None: cell_size = 2.0 * float(radii[candidates].max())
+    if cell_size <= 0.0: return np.empty((0, 2), dtype=int)
+
+    # Sort the particles by the keys of their cells
+    cells = np.floor(positions[candidates] / cell_size).astype(np.int64)
+    candidate_groups = None if groups is None else np.asarray(groups, dtype=np.int64)[candidates]
+    keys = _hash_cells(cells, candidate_groups)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys, sorted_particles = keys[order], candidates[order]
+
+    # Ranges of the particles in the 27 neighbor cells of every particle
+    neighbor_groups = None if groups is None else np.repeat(candidate_groups, len(_NEIGHBOR_OFFSETS))
+    neighbor_keys = _hash_cells((cells[:, None, :] + _NEIGHBOR_OFFSETS[None]).reshape(-1, 3), neighbor_groups)
+    starts = np.searchsorted(sorted_keys, neighbor_keys, side="left")
+    ends = np.searchsorted(sorted_keys, neighbor_keys, side="right")
+    counts = ends - starts
+
+    # Expand the ranges to candidate pairs, pairs found in many cells due to 
+    # hash collisions are merged at the end
+    first = np.repeat(np.repeat(candidates, len(_NEIGHBOR_OFFSETS)), counts)
+    range_starts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    second = sorted_particles[np.arange(counts.sum()) + range_starts]
+    keep = first < second
+    if groups is not None: keep &= groups[first] == groups[second] # Hash collisions across the groups
+    first, second = first[keep], second[keep]
+
+    # Narrow phase
+    diff = positions[first] - positions[second]
+    overlap = np.sum(diff * diff, axis=-1) < (radii[first] + radii[second]) ** 2
+    first, second = first[overlap], second[overlap]
+
+    pair_keys = np.unique(first * n_masses + second)
+    if excluded_keys is not None and len(excluded_keys):
+        pair_keys = pair_keys[~np.isin(pair_keys, excluded_keys, assume_unique=True)]
+    return np.stack([pair_keys // n_masses, pair_keys % n_masses], axis=-1)
+
+def project_contacts(P, pairs, radii, inv_masses, relaxation=1.0, tol=1e-12):
+    """
+    Push the overlapping particles apart along their center line, weighted
+    by their inverse masses. A particle in many contacts gets the average of
+    its corrections, as in kernels.project_distance_constraints_jacobi().
+
+    Parameters
+    ----------
+    P : np.ndarray
+        Predicted particle locations of shape (n_masses, 3), updated in place.
+    pairs : np.ndarray
+        Contact pairs, see find_contacts().
+    radii, inv_masses : np.ndarray
+        Per-particle arrays of shape (n_masses, ). Particles with zero inverse
+        mass are not moved.
+
+    Returns
+    -------
+    P : np.ndarray
+        The projected particle locations.
+    """
+    if len(pairs) == 0: return P
+
+    i, j = pairs[:, 0], pairs[:, 1]
+    w1, w2 = inv_masses[i], inv_masses[j]
+    diff = P[i] - P[j]
+    distance = np.sqrt(np.sum(diff * diff, axis=-1))
+    penetration = radii[i] + radii[j] - distance
+
+    w_sum = w1 + w2
+    valid = (penetration > 0.0) & (w_sum > 0.0) & (distance > tol) # Coincident particles have no normal
+    scale = np.divide(penetration, w_sum * distance, out=np.zeros_like(distance), where=valid)
+    correction = (scale[:, None] * diff).astype(P.dtype, copy=False)
+
+    deltas = np.zeros_like(P)
+    scatter_add(deltas, i, w1[:, None] * correction)
+    scatter_add(deltas, j, -w2[:, None] * correction)
+
+    n_contacts = np.bincount(pairs[valid].ravel(), minlength=len(P))
+    P += deltas * (relaxation / np.maximum(n_contacts, 1))[:, None]
+    return P
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:41:27 2026
+
+Differentiable PyTorch version of the PBD helper rig, the bone transformation
+inference and Linear Blend Skinning, to fit the physical parameters of the
+helpers to ground truth meshes with gradient descent.
+
+DifferentiableHelperRig mirrors HelperBonesHandler.update_bones() for PBD
+integration: every helper is a free particle attached to its anchor with a
+single spring, so the step is written per helper without the spring arrays
+of the MassSpringSystem. The parameters are optimized in log space to keep
+them positive. fit_helper_parameters() runs the rig over an animation with
+truncated backpropagation through time, i.e. the gradients flow through a
+window of frames, then the state is detached and the next window continues
+from it.
+
+@author: bartu
+"""
+import numpy as np
+import torch
+from torch.nn import Module, Parameter
+
+from ..utils import linalg_utils
+from ..utils.cost import MSE_torch
+from ..utils.sanity_check import _assert_normalized_weights
+from ..utils.precision import torch_dtype
+
+_PARAMETER_NAMES = ("mass", "stiffness", "damping", "mass_dscale", "spring_dscale")
+
+def _safe_norm(vecs, tol=1e-12):
+    # Vector norms along the last axis, with finite gradients at zero
+    return torch.sqrt(torch.clamp(torch.sum(vecs * vecs, dim=-1), min=tol * tol))
+
+def get_RST_torch(src_segments, target_segments, tol=1e-12):
+    """
+    Batched version of kinematics.rst_map.get_RST(), the (R)otation, (S)cale
+    and (T)ranslation matrices that map the source segments to the target
+    segments, both of shape (n_bones, 2, 3). The scale is taken per axis
+    after the rotation as in utils.linalg_utils.get_3d_scale().
+
+    Returns
+    -------
+    M : torch.Tensor
+        Transformation matrices of shape (n_bones, 4, 4).
+    """
+    offset = src_segments[:, 0]
+    u = src_segments[:, 1] - offset
+    v = target_segments[:, 1] - target_segments[:, 0]
+    t = target_segments[:, 0] - offset
+
+    # Rotation that aligns the normalized vectors, see utils.linalg_utils.get_aligning_rotation()
+    u_hat = u / _safe_norm(u, tol)[:, None]
+    v_hat = v / _safe_norm(v, tol)[:, None]
+    cos = torch.sum(u_hat * v_hat, dim=-1)
+    axis = torch.linalg.cross(u_hat, v_hat, dim=-1)
+    zeros = torch.zeros_like(cos)
+    skew = torch.stack([torch.stack([zeros, -axis[:, 2], axis[:, 1]], dim=-1),
+                        torch.stack([axis[:, 2], zeros, -axis[:, 0]], dim=-1),
+                        torch.stack([-axis[:, 1], axis[:, 0], zeros], dim=-1)], dim=-2)
+    eye = torch.eye(3, dtype=u.dtype, device=u.device)
+    R = ((axis[:, :, None] * axis[:, None, :]) / (1.0 + cos)[:, None, None]
+         + cos[:, None, None] * eye + skew)
+
+    # Scale of the rotated source to the target, axes without length keep scale 1
+    u_rotated = torch.einsum("nij,nj->ni", R, u)
+    has_length = torch.abs(u_rotated) > tol
+    scale = torch.where(has_length, v / torch.where(has_length, u_rotated, torch.ones_like(u_rotated)), torch.ones_like(v))
+
+    # M(x) = S R (x - offset) + offset + t
+    A = scale[:, :, None] * R
+    M = torch.zeros((len(u), 4, 4), dtype=u.dtype, device=u.device)
+    M[:, :3, :3] = A
+    M[:, :3, 3] = offset + t - torch.einsum("nij,nj->ni", A, offset)
+    M[:, 3, 3] = 1.0
+    return M
+
+def get_absolute_transformations_torch(rest_locations, posed_locations, algorithm="RST"):
+    """
+    Batched version of kinematics.inverse_kinematics.get_absolute_transformations()
+    with return_mat=True, for the "RST" and "T" algorithms. The locations
+    have 2 joints per bone, i.e. shape (2 * n_bones, 3).
+
+    Returns
+    -------
+    M : torch.Tensor
+        Transformation matrices of shape (n_bones, 4, 4).
+    """
+    rest_segments = rest_locations.reshape(-1, 2, 3)
+    posed_segments = posed_locations.reshape(-1, 2, 3)
+    if algorithm == "RST":
+        return get_RST_torch(rest_segments, posed_segments)
+    if algorithm == "T":
+        M = torch.eye(4, dtype=posed_locations.dtype, device=posed_locations.device).repeat(len(posed_segments), 1, 1)
+        M[:, :3, 3] = posed_segments[:, 1] - rest_segments[:, 1]
+        return M
+    raise ValueError(f"Unexpected algorithm type: {algorithm}.")
+
+def LBS_from_mat_torch(V, W, M):
+    """
+    Linear Blend Skinning of the vertices V of shape (n_verts, 3) with the
+    weights W of shape (n_verts, n_bones) and the 4x4 bone transformations M of
+    shape (n_bones, 4, 4), see skinning.LBS_from_mat(). The weights are used
+    as given.
+    """
+    weighted_transforms = torch.einsum("vb,bij->vij", W, M)
+    return torch.einsum("vij,vj->vi", weighted_transforms[:, :3, :3], V) + weighted_transforms[:, :3, 3]
+
+def skin_helpers(V_rigid, prev_V, helper_W, prev_locations, locations, helper_idxs, algorithm="T", jiggle_scale=1.0):
+    """
+    Add the jiggling of the helper bones to the rigidly deformed vertices, as
+    in demo/dfaust_comparison_demo.py. "T" moves the vertices with the motion
+    of the helper tips since the previous frame, "RST" adds the skinning of
+    the previous vertices with the helper transformations since the previous
+    frame.
+
+    Parameters
+    ----------
+    V_rigid, prev_V : torch.Tensor
+        Rigidly deformed vertices of the current and previous frames, have
+        shape (n_verts, 3).
+    helper_W : torch.Tensor
+        Helper bone weights, has shape (n_verts, n_helpers).
+    prev_locations, locations : torch.Tensor
+        Simulated bone locations of the previous and current frames, have
+        shape (2 * n_bones, 3).
+    helper_idxs : torch.Tensor
+        Bone indices of the helpers.
+    algorithm : str, optional
+        "T" or "RST". The default is "T".
+    jiggle_scale : float, optional
+        Scale of the added jiggling. The default is 1.0.
+
+    Returns
+    -------
+    V_dyn : torch.Tensor
+        Has shape (n_verts, 3).
+    """
+    if algorithm == "RST":
+        rows = torch.stack([2 * helper_idxs, 2 * helper_idxs + 1], dim=-1).ravel()
+        M = get_absolute_transformations_torch(prev_locations[rows], locations[rows], algorithm="RST")
+        return V_rigid + LBS_from_mat_torch(prev_V, helper_W, M) * jiggle_scale
+
+    delta = locations[2 * helper_idxs + 1] - prev_locations[2 * helper_idxs + 1]
+    return V_rigid + (helper_W @ delta) * jiggle_scale
+
+class DifferentiableHelperRig(Module):
+    def __init__(self, handler, trainable=("mass", "stiffness", "damping"), dtype=torch.float64):
+        """
+        Differentiable copy of a HelperBonesHandler with PBD integration. The
+        topology, the settings and the initial parameters and state are taken
+        from the handler, and the trainable parameters are torch Parameters
+        with a value per helper, stored as their logarithm.
+
+        Sleeping, substep controllers and collisions aren't supported.
+
+        Parameters
+        ----------
+        handler : HelperBonesHandler
+            Rig to mirror, it isn't changed. Use handler.set_parameters(**rig.get_parameters())
+            to bring the fitted parameters back.
+        trainable : tuple, optional
+            Names of the parameters to fit, see HelperBonesHandler.set_parameters().
+            The default is ("mass", "stiffness", "damping").
+        dtype : torch.dtype, optional
+            Floating point type. The default is torch.float64.
+        """
+        super(DifferentiableHelperRig, self).__init__()
+        simulator = handler.simulator
+        assert simulator.integration_mode.upper() == "PBD", f"Expected PBD integration, got {simulator.integration_mode}."
+        assert simulator.sleep_threshold is None and simulator.substep_controller is None, "Expected no sleeping or substep controller."
+        assert not simulator.self_collision and not simulator.colliders, "Expected no collisions."
+        for name in trainable: assert name in _PARAMETER_NAMES, f"Expected parameters from {_PARAMETER_NAMES}, got {name}."
+
+        self.dtype = torch_dtype(dtype)
+        self.handler = handler
+        self.dt = simulator.dt
+        self.compliance = handler.compliance
+        self.compliance_ours = handler.compliance_ours
+        self.FIXED_SCALE = handler.FIXED_SCALE
+        self.edge_constraint = simulator.edge_constraint
+        self.relaxation = simulator.relaxation if simulator.constraint_solver == "JACOBI" else 1.0
+
+        as_tensor = lambda values : torch.as_tensor(np.asarray(values, dtype=float), dtype=self.dtype)
+        as_index = lambda idxs : torch.as_tensor(np.asarray(idxs, dtype=np.int64))
+        self.helper_idxs = as_index(handler.helper_idxs)
+        self.rest_lengths = as_tensor(simulator.rest_lengths[handler.spring_idxs])
+        self.helper_lengths = as_tensor(handler.helper_lengths)
+        self.gravities = as_tensor(simulator.gravities[handler.free_idxs])
+        self._start_rows = as_index(handler._helper_start_rows)
+        self._end_rows = as_index(handler._helper_end_rows)
+        self._passes = [(as_index(pass_helpers), as_index(anchor_rows),
+                         [(as_index(helpers), [(as_index(parent_rows), as_index(child_rows), as_tensor(child_offsets))
+                                               for parent_rows, child_rows, child_offsets in fixups])
+                          for helpers, fixups in levels])
+                        for pass_helpers, anchor_rows, levels in handler._passes]
+
+        parameters = handler.get_parameters()
+        self.trainable = tuple(trainable)
+        for name in _PARAMETER_NAMES:
+            values = as_tensor(parameters[name])
+            if name in self.trainable: setattr(self, "log_" + name, Parameter(torch.log(values)))
+            else: self.register_buffer(name, values)
+        self.reset()
+
+    def get_parameter(self, name):
+        """
+        Get the parameter values of the helpers as a tensor of shape (n_helpers, ).
+        """
+        if name in self.trainable: return torch.exp(getattr(self, "log_" + name))
+        return getattr(self, name)
+
+    def get_parameters(self):
+        """
+        Get the parameters as a dictionary of numpy arrays, that can be passed
+        to HelperBonesHandler.set_parameters().
+        """
+        return {name : self.get_parameter(name).detach().cpu().numpy().copy() for name in _PARAMETER_NAMES}
+
+    def reset(self):
+        """
+        Reset the state to the current state of the handler.
+        """
+        simulator = self.handler.simulator
+        as_tensor = lambda values : torch.as_tensor(np.asarray(values, dtype=float), dtype=self.dtype)
+        self.tips = as_tensor(simulator.positions[self.handler.free_idxs])
+        self.velocities = as_tensor(simulator.velocities[self.handler.free_idxs])
+        self.anchors = as_tensor(simulator.positions[self.handler.fixed_idxs])
+        prev = self.handler.prev_sim_locations
+        self.prev_locations = None if prev is None else as_tensor(prev)
+
+    def detach(self):
+        """
+        Cut the gradients of the state, e.g. at the end of a window of frames
+        in truncated backpropagation through time.
+        """
+        self.tips = self.tips.detach()
+        self.velocities = self.velocities.detach()
+        self.anchors = self.anchors.detach()
+        if self.prev_locations is not None: self.prev_locations = self.prev_locations.detach()
+
+    def _simulate(self, helpers, dt):
+        # PBD step of the given helpers, see MassSpringSystem.simulate_pbd()
+        mass, k = self.get_parameter("mass")[helpers], self.get_parameter("stiffness")[helpers]
+        damping, spring_dscale = self.get_parameter("damping")[helpers], self.get_parameter("spring_dscale")[helpers]
+        tips, velocities, anchors = self.tips[helpers], self.velocities[helpers], self.anchors[helpers]
+
+        # Spring force on the free particle, the anchors have no velocity
+        spring_vecs = anchors - tips
+        distance = _safe_norm(spring_vecs)
+        directions = spring_vecs / distance[:, None]
+        spring_amount = (distance - self.rest_lengths[helpers]) * k * spring_dscale
+        damping_amount = -damping * torch.sum(velocities * directions, dim=-1)
+        forces = (spring_amount + damping_amount)[:, None] * directions + mass[:, None] * self.gravities[helpers]
+
+        velocities = (velocities + dt * forces / mass[:, None]) * self.get_parameter("mass_dscale")[helpers][:, None]
+        P = tips + dt * velocities
+
+        if self.edge_constraint:
+            # Distance constraints to the anchors with compliance alpha / dt^2,
+            # where dt is the time step of the simulator as in satisfy_edge_constraints()
+            w = 1.0 / mass
+            alpha_tilde = self.compliance / self.dt / self.dt
+            spring_vecs = P - anchors
+            spring_len = _safe_norm(spring_vecs)
+            d_lambda = -(spring_len - self.rest_lengths[helpers]) / (w + alpha_tilde)
+            P = P + self.relaxation * (d_lambda * w / spring_len)[:, None] * spring_vecs
+
+        self.velocities = self.velocities.index_copy(0, helpers, (P - tips) / dt)
+        self.tips = self.tips.index_copy(0, helpers, P)
+
+    def forward(self, rigidly_posed_locations, dt=None):
+        """
+        Simulate a frame, see HelperBonesHandler.update_bones().
+
+        Parameters
+        ----------
+        rigidly_posed_locations : np.ndarray or torch.Tensor
+            Bone locations of shape (2 * n_bones, 3) at the current frame.
+        dt : float, optional
+            Time step. If None, the time step of the simulator. The default is None.
+
+        Returns
+        -------
+        simulated_locations : torch.Tensor
+            Has shape (2 * n_bones, 3).
+        """
+        if dt is None: dt = self.dt
+        simulated_locations = torch.as_tensor(rigidly_posed_locations, dtype=self.dtype)
+        if self.prev_locations is None: self.prev_locations = simulated_locations
+
+        for pass_helpers, anchor_rows, levels in self._passes:
+            translate_vecs = simulated_locations[anchor_rows] - self.prev_locations[anchor_rows]
+            self.anchors = self.anchors.index_add(0, pass_helpers, translate_vecs)
+            self._simulate(pass_helpers, dt)
+
+            for helpers, fixups in levels:
+                tips = self.tips[helpers]
+                if self.FIXED_SCALE:
+                    directions = simulated_locations[self._start_rows[helpers]] - tips
+                    d_norm = _safe_norm(directions, 1e-20)
+                    target_lengths = self.helper_lengths[helpers] * np.exp(self.compliance_ours)
+                    tips = tips + directions * ((d_norm - target_lengths) / d_norm)[:, None]
+                    self.tips = self.tips.index_copy(0, helpers, tips)
+                simulated_locations = simulated_locations.index_copy(0, self._end_rows[helpers], tips)
+
+                for parent_rows, child_rows, child_offsets in fixups:
+                    child_bone_starts = simulated_locations[parent_rows] - child_offsets
+                    translation_amounts = child_bone_starts - simulated_locations[child_rows]
+                    simulated_locations = simulated_locations.index_copy(0, child_rows, child_bone_starts)
+                    simulated_locations = simulated_locations.index_add(0, child_rows + 1, translation_amounts)
+
+        self.prev_locations = simulated_locations
+        return simulated_locations
+
+def fit_helper_parameters(rig, rigid_locations, V_rigid, V_gt, helper_W,
+                          n_epochs=20, window=10, lr=0.05, algorithm="T",
+                          rest_locations=None, jiggle_scale=1.0, normalize_weights=False,
+                          verbose=True):
+    """
+    Fit the trainable parameters of the rig to the ground truth vertices with
+    Adam and truncated backpropagation through time. Every epoch restarts
+    the animation from the state of the handler, and the parameters are
+    updated at the end of every window of frames.
+
+    Parameters
+    ----------
+    rig : DifferentiableHelperRig
+        Rig to fit, its parameters are updated in place.
+    rigid_locations : np.ndarray
+        Rigidly posed bone locations of the frames, has shape (n_frames, 2 * n_bones, 3).
+    V_rigid, V_gt : np.ndarray
+        Rigidly deformed and ground truth vertices, have shape (n_frames, n_verts, 3).
+    helper_W : np.ndarray
+        Helper bone weights, has shape (n_verts, n_helpers).
+    n_epochs : int, optional
+        Passes over the animation. The default is 20.
+    window : int, optional
+        Frames of a truncated backpropagation window. The default is 10.
+    lr : float, optional
+        Learning rate of the log parameters. The default is 0.05.
+    algorithm : str, optional
+        Helper skinning, "T" or "RST", see skin_helpers(). The default is "T".
+    rest_locations : np.ndarray, optional
+        Bone locations before the first frame, that are the previous locations
+        of the first frame in skinning. If None, the rigid locations of the
+        first frame. The default is None.
+    jiggle_scale : float, optional
+        Scale of the jiggling, see skin_helpers(). The default is 1.0.
+    normalize_weights : bool, optional
+        If True, the helper weights of "RST" skinning are normalized as in
+        skinning.LBS_from_mat(). "T" skinning uses the weights as given. The
+        default is False.
+
+    Returns
+    -------
+    losses : list
+        Mean loss over the frames of every epoch.
+    """
+    as_tensor = lambda values : torch.as_tensor(np.asarray(values, dtype=float), dtype=rig.dtype)
+    if normalize_weights and algorithm == "RST":
+        helper_W = np.asarray(helper_W, dtype=float)
+        try: _assert_normalized_weights(helper_W)
+        except AssertionError: helper_W = linalg_utils.normalize_weights(helper_W)
+    rigid_locations, V_rigid, V_gt, helper_W = [as_tensor(x) for x in (rigid_locations, V_rigid, V_gt, helper_W)]
+    rest_locations = rigid_locations[0] if rest_locations is None else as_tensor(rest_locations)
+    n_frames = len(rigid_locations)
+
+    optimizer = torch.optim.Adam(rig.parameters(), lr=lr)
+    losses = []
+    for epoch in range(n_epochs):
+        rig.reset()
+        prev_locations, prev_V = rest_locations, V_rigid[0]
+        epoch_loss = 0.0
+        for window_start in range(0, n_frames, window):
+            loss = 0.0
+            for frame in range(window_start, min(window_start + window, n_frames)):
+                locations = rig(rigid_locations[frame])
+                V_dyn = skin_helpers(V_rigid[frame], prev_V, helper_W, prev_locations, locations,
+                                     rig.helper_idxs, algorithm=algorithm, jiggle_scale=jiggle_scale)
+                loss = loss + MSE_torch(V_gt[frame], V_dyn)
+                prev_locations, prev_V = locations, V_rigid[frame]
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+            rig.detach()
+            prev_locations = prev_locations.detach()
+            epoch_loss += float(loss.detach())
+
+        losses.append(epoch_loss / n_frames)
+        if verbose: print(f">> Epoch {epoch}: loss {losses[-1]:.6e}")
+    return losses
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:04:19 2026
+
+Ensemble of independent mass-spring systems that share the same topology
+but have different physical parameters, e.g. for parameter sweeps. 
+
+The K copies are stored as the disjoint union of K systems in a single 
+MassSpringSystem, so every integrator advances all the copies in one 
+vectorized step. The state arrays are exposed with shape (K, n_masses, 3).
+
+@author: bartu
+"""
+import copy
+import numpy as np
+
+from ..mass_spring import MassSpringSystem
+
+def _per_copy(values, template_values, n_copies):
+    # Expand the given parameter to shape (n_copies, n_elements). None keeps 
+    # the template values, a scalar or (n_copies, ) array sets a value per copy,
+    # and (n_copies, n_elements) sets every element of every copy.
+    n_elements = len(template_values)
+    if values is None:
+        return np.tile(template_values, (n_copies, 1))
+    
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 0:
+        return np.full((n_copies, n_elements), float(values))
+    if values.ndim == 1:
+        assert len(values) == n_copies, f"Expected per copy parameters to have length {n_copies}, got {len(values)}."
+        return np.repeat(values[:, None], n_elements, axis=1)
+    
+    assert values.shape == (n_copies, n_elements), f"Expected parameters to have shape ({n_copies}, {n_elements}), got {values.shape}."
+    return values.copy()
+
+class EnsembleMassSpringSystem:
+    def __init__(self, system, n_copies, 
+                 mass=None, stiffness=None, damping=None, 
+                 mass_dscale=None, spring_dscale=None):
+        """
+        Create K copies of a mass-spring system. Parameters can be given as a
+        scalar, as an array of shape (n_copies, ) for a value per copy, or as
+        shape (n_copies, n_masses) / (n_copies, n_springs) for a value per
+        particle / spring of every copy. If not provided, the values of the 
+        template system are used.
+
+        Parameters
+        ----------
+        system : MassSpringSystem
+            Template system that defines the topology, the initial state, the
+            fixed masses and the simulator settings.
+        n_copies : int
+            Number of copies K.
+        mass, mass_dscale : float or np.ndarray, optional
+            Particle parameters. Fixed masses stay fixed in every copy.
+        stiffness, damping, spring_dscale : float or np.ndarray, optional
+            Spring parameters.
+        """
+        assert n_copies >= 1, f"Expected at least a single copy, got {n_copies}."
+        K, n = n_copies, system.n_masses
+        self.n_copies = K
+        self.template = system
+        
+        union = MassSpringSystem(system.dt, mode=system.integration_mode, 
+                                 edge_constraint=system.edge_constraint,
+                                 constraint_solver=system.constraint_solver,
+                                 relaxation=system.relaxation,
+                                 substeps=system.substeps, 
+                                 iterations=system.iterations,
+                                 tolerance=system.tolerance,
+                                 backend=system.backend,
+                                 sleep_threshold=system.sleep_threshold,
+                                 sleep_frames=system.sleep_frames,
+                                 n_threads=system.n_threads,
+                                 substep_controller=copy.deepcopy(system.substep_controller),
+                                 dtype=system.dtype,
+                                 self_collision=system.self_collision)
+        
+        free = system.free_mask
+        masses = _per_copy(mass, system.particle_masses, K) * free
+        assert np.all(masses[:, free] > 1e-15), "Expected free masses to have positive mass."
+        
+        union.positions = np.tile(system.positions, (K, 1))
+        union.prev_positions = np.tile(system.prev_positions, (K, 1))
+        union.velocities = np.tile(system.velocities, (K, 1))
+        union.particle_masses = masses.ravel()
+        union.inv_masses = np.divide(1.0, union.particle_masses, out=np.zeros(K*n), where=np.tile(free, K))
+        union.mass_dscales = _per_copy(mass_dscale, system.mass_dscales, K).ravel()
+        union.radii = np.tile(system.radii, K)
+        union.gravities = np.tile(system.gravities, (K, 1))
+        
+        offsets = np.arange(K) * n
+        union.edges = (system.edges[None] + offsets[:, None, None]).reshape(-1, 2)
+        union.stiffnesses = _per_copy(stiffness, system.stiffnesses, K).ravel()
+        union.dampings = _per_copy(damping, system.dampings, K).ravel()
+        union.spring_dscales = _per_copy(spring_dscale, system.spring_dscales, K).ravel()
+        union.rest_lengths = np.tile(system.rest_lengths, K)
+        union.free_mask = np.tile(free, K)
+        union.free_indices = np.flatnonzero(union.free_mask)
+        union.fixed_indices = (system.fixed_indices[None] + offsets[:, None]).ravel()
+        
+        union._reset_ids()
+        union._cast_state()
+        union.collision_groups = np.repeat(np.arange(K), n) # Copies don't collide with each other
+        union.colliders = system.colliders # Kinematic colliders are shared by the copies
+        
+        # Copies are disjoint, so the template coloring holds for all of them
+        system.get_edge_colors()
+        union._edge_color_ids = np.tile(system._edge_color_ids, K)
+        self.system = union
+        
+    @property
+    def n_masses(self):
+        return self.template.n_masses
+    
+    @property
+    def n_springs(self):
+        return self.template.n_springs
+    
+    @property
+    def positions(self):
+        return self.system.positions.reshape(self.n_copies, self.n_masses, -1)
+    
+    @property
+    def velocities(self):
+        return self.system.velocities.reshape(self.n_copies, self.n_masses, -1)
+    
+    @property
+    def solver_info(self):
+        return self.system.solver_info
+    
+    def get_parameters(self, name):
+        """
+        Get a parameter array of the copies with shape (n_copies, n_elements), 
+        name is one of the MassSpringSystem arrays, e.g. "stiffnesses". 
+        The returned array is a view, so it can be edited in place.
+        """
+        return getattr(self.system, name).reshape(self.n_copies, -1)
+    
+    def set_parameters(self, mass_idxs=None, mass=None, mass_dscale=None,
+                       spring_idxs=None, stiffness=None, damping=None, spring_dscale=None):
+        """
+        Update the parameters of the given particles and springs of the 
+        template system in every copy, see MassSpringSystem.set_parameters().
+        Parameters can be given as a scalar, as an array of shape (n_copies, )
+        for a value per copy, or as shape (n_copies, len(idxs)) for a value 
+        per index of every copy.
+        """
+        K = self.n_copies
+        mass_idxs = np.arange(self.n_masses) if mass_idxs is None else np.asarray(mass_idxs, dtype=int).ravel()
+        spring_idxs = np.arange(self.n_springs) if spring_idxs is None else np.asarray(spring_idxs, dtype=int).ravel()
+        
+        def expand(values, idxs):
+            return None if values is None else _per_copy(values, idxs, K).ravel()
+        
+        union_mass_idxs = (np.arange(K)[:, None] * self.n_masses + mass_idxs[None]).ravel()
+        union_spring_idxs = (np.arange(K)[:, None] * self.n_springs + spring_idxs[None]).ravel()
+        self.system.set_parameters(mass_idxs=union_mass_idxs, 
+                                   mass=expand(mass, mass_idxs), 
+                                   mass_dscale=expand(mass_dscale, mass_idxs),
+                                   spring_idxs=union_spring_idxs, 
+                                   stiffness=expand(stiffness, spring_idxs), 
+                                   damping=expand(damping, spring_idxs), 
+                                   spring_dscale=expand(spring_dscale, spring_idxs))
+    
+    def simulate(self, dt=None, integration=None, alpha=0.0, mass_idxs=None):
+        """
+        Advance all the copies with a single step, see MassSpringSystem.simulate().
+        If mass_idxs of the template system are given, only their islands are
+        simulated in every copy.
+        """
+        if mass_idxs is not None:
+            offsets = np.arange(self.n_copies)[:, None] * self.n_masses
+            mass_idxs = (offsets + np.asarray(mass_idxs, dtype=int)[None]).ravel()
+        self.system.simulate(dt, integration=integration, alpha=alpha, mass_idxs=mass_idxs)
+        
+    def translate_masses(self, mass_idxs, translate_vecs):
+        """
+        Translate the given masses in every copy.
+
+        Parameters
+        ----------
+        mass_idxs : np.ndarray
+            Particle indices of the template system, has shape (m, ).
+        translate_vecs : np.ndarray
+            Translations of shape (m, 3) that are applied to all copies, or 
+            shape (n_copies, m, 3) for a translation per copy.
+        """
+        mass_idxs = np.asarray(mass_idxs, dtype=int)
+        positions = self.positions
+        prev_positions = self.system.prev_positions.reshape(self.n_copies, self.n_masses, -1)
+        
+        prev_positions[:, mass_idxs] = positions[:, mass_idxs]
+        positions[:, mass_idxs] += translate_vecs
+        
+    def get_mass_locations(self, copy=True):
+        """
+        Get the particle locations of all copies, has shape (n_copies, n_masses, 3).
+        """
+        if copy: return self.positions.copy()
+        return self.positions
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:02:51 2026
+
+Graph routines on the spring connectivity of a mass-spring system. These are
+computed once per topology change and cached by the MassSpringSystem.
+
+@author: bartu
+"""
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+def color_edges(edges, static_vertices=None):
+    """
+    Partition the edges into independent sets, such that no two edges with
+    the same color share a vertex. Constraints of the same color can then be
+    projected together without changing the Gauss-Seidel result.
+    
+    Uses greedy coloring, see greedy_edge_colors().
+
+    Parameters
+    ----------
+    edges : np.ndarray
+        Spring endpoint indices, has shape (n_edges, 2).
+    static_vertices : np.ndarray, optional
+        Boolean mask of shape (n_vertices, ) for the vertices that are never 
+        moved by the projections (i.e. zero inverse mass). Edges sharing only
+        a static vertex don't conflict. The default is None.
+
+    Returns
+    -------
+    color_groups : list
+        List of integer arrays, every array holds the edge indices of a color.
+    """
+    return group_by_color(greedy_edge_colors(edges, static_vertices))
+
+def greedy_edge_colors(edges, static_vertices=None):
+    """
+    Get the color of every edge, see color_edges(). Every edge gets the lowest 
+    color that is not taken by its endpoints, so the number of colors is at 
+    most 2*max_degree-1.
+
+    Returns
+    -------
+    colors : np.ndarray
+        Integer color per edge, has shape (n_edges, ).
+    """
+    n_edges = len(edges)
+    if n_edges == 0: return np.empty((0,), dtype=int)
+    
+    n_vertices = int(edges.max()) + 1
+    if static_vertices is None: static_vertices = np.zeros(n_vertices, dtype=bool)
+    
+    used_colors = [0] * n_vertices # Bitmask of the colors taken at every vertex
+    colors = np.empty(n_edges, dtype=int)
+    for e, (i, j) in enumerate(edges.tolist()):
+        taken = 0
+        if not static_vertices[i]: taken |= used_colors[i]
+        if not static_vertices[j]: taken |= used_colors[j]
+        
+        c = (~taken & (taken + 1)).bit_length() - 1 # Lowest free color
+        colors[e] = c
+        used_colors[i] |= 1 << c
+        used_colors[j] |= 1 << c
+    return colors
+
+def color_new_edge(edges, colors, e, static_vertices):
+    """
+    Get the lowest color for the edge e that's not taken by the other edges
+    at its movable endpoints, to extend an existing coloring without 
+    recoloring all the edges.
+    """
+    i, j = edges[e]
+    incident = np.zeros(len(edges), dtype=bool)
+    if not static_vertices[i]: incident |= np.any(edges == i, axis=1)
+    if not static_vertices[j]: incident |= np.any(edges == j, axis=1)
+    incident[e] = False
+    
+    taken = np.zeros(len(colors) + 1, dtype=bool)
+    taken[colors[incident]] = True
+    return int(np.argmin(taken))
+
+def group_by_color(colors):
+    """
+    Get the edge indices of every color, in increasing edge order.
+    """
+    if len(colors) == 0: return []
+    
+    order = np.argsort(colors, kind="stable")
+    splits = np.cumsum(np.bincount(colors))[:-1]
+    return [group for group in np.split(order, splits) if len(group)]
+
+def unique_edges(edges):
+    """
+    Remove the self loops and the duplicate edges, where (i, j) and (j, i) 
+    are the same edge. The first occurrence of every edge is kept, in the 
+    original order and orientation.
+
+    Parameters
+    ----------
+    edges : np.ndarray
+        Vertex index pairs, has shape (n_edges, 2).
+
+    Returns
+    -------
+    edges : np.ndarray
+        Unique edges, has shape (n_unique, 2).
+    """
+    edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    if len(edges) == 0: return edges
+    
+    _, first = np.unique(np.sort(edges, axis=1), axis=0, return_index=True)
+    return edges[np.sort(first)]
+
+def mesh_edges(F, tetrahedral=False):
+    """
+    Extract the unique edges of a mesh. For polygonal faces, every face is
+    a closed loop of edges. For tetrahedra, all 6 vertex pairs are edges.
+    Faces with 2 vertices are taken as single edges, e.g. for spring nets.
+
+    Parameters
+    ----------
+    F : np.ndarray
+        Face (or tetrahedron) vertex indices, has shape (n_faces, k).
+    tetrahedral : bool, optional
+        Set True if F holds tetrahedra of shape (n_tets, 4). The default is False.
+
+    Returns
+    -------
+    edges : np.ndarray
+        Unique edges in the order they appear in F, has shape (n_edges, 2).
+    """
+    F = np.asarray(F, dtype=int)
+    if tetrahedral:
+        assert F.shape[1] == 4, f"Expected tetrahedra to have 4 vertices, got {F.shape[1]}."
+        pairs = np.array([[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]])
+        return unique_edges(F[:, pairs])
+    
+    return unique_edges(np.stack([F, np.roll(F, -1, axis=1)], axis=-1))
+
+def shear_edges(F):
+    """
+    Get the diagonals of polygonal faces (e.g. quads), i.e. the vertex pairs of
+    a face that are not connected by the face boundary. Triangles don't have 
+    any diagonals.
+    
+    Returns
+    -------
+    edges : np.ndarray
+        Unique diagonal edges, has shape (n_edges, 2).
+    """
+    F = np.asarray(F, dtype=int)
+    k = F.shape[1]
+    pairs = np.array([[a, b] for a in range(k) for b in range(a + 2, k) if (b - a) != k - 1], dtype=int)
+    if len(pairs) == 0: return np.empty((0, 2), dtype=int)
+    return unique_edges(F[:, pairs])
+
+def bending_edges(F):
+    """
+    Get the bending edges of a triangle mesh, that connect the two vertices
+    opposite to every interior edge, i.e. across the adjacent triangles.
+    
+    Returns
+    -------
+    edges : np.ndarray
+        Unique bending edges, has shape (n_edges, 2).
+    """
+    F = np.asarray(F, dtype=int)
+    assert F.shape[1] == 3, f"Expected a triangle mesh to compute bending edges, got faces with {F.shape[1]} vertices."
+    
+    # Every half edge with its opposite vertex in the triangle
+    half_edges = np.sort(np.stack([F, np.roll(F, -1, axis=1)], axis=-1).reshape(-1, 2), axis=1)
+    opposite = np.roll(F, 1, axis=1).ravel()
+    
+    # Half edges of the same edge are next to each other after sorting
+    order = np.lexsort((half_edges[:, 1], half_edges[:, 0]))
+    half_edges, opposite = half_edges[order], opposite[order]
+    shared = np.all(half_edges[1:] == half_edges[:-1], axis=1)
+    return unique_edges(np.stack([opposite[:-1][shared], opposite[1:][shared]], axis=-1))
+
+def particle_islands(n_vertices, edges, free_mask):
+    """
+    Find the islands of a mass-spring system, i.e. the connected components of
+    the free particles where only the springs between free particles connect
+    them. Fixed particles don't belong to any island, since they don't carry
+    any motion from one island to another.
+
+    Parameters
+    ----------
+    n_vertices : int
+        Number of particles.
+    edges : np.ndarray
+        Spring endpoint indices, has shape (n_edges, 2).
+    free_mask : np.ndarray
+        Boolean mask of the free particles, has shape (n_vertices, ).
+
+    Returns
+    -------
+    vertex_islands : np.ndarray
+        Island id per particle, -1 for the fixed particles. Has shape (n_vertices, ).
+    edge_islands : np.ndarray
+        Island id per spring, that is the island of its free endpoints or -1 
+        if both endpoints are fixed. Has shape (n_edges, ).
+    n_islands : int
+        Number of islands.
+    """
+    free_mask = np.asarray(free_mask, dtype=bool)
+    edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+    
+    inner = edges[free_mask[edges[:, 0]] & free_mask[edges[:, 1]]]
+    adjacency = sparse.coo_matrix((np.ones(len(inner)), (inner[:, 0], inner[:, 1])), shape=(n_vertices, n_vertices))
+    _, labels = connected_components(adjacency, directed=False)
+    
+    # Relabel so that only the free particles get consecutive ids
+    free_labels, vertex_islands = np.unique(labels[free_mask], return_inverse=True)
+    labels = np.full(n_vertices, -1, dtype=int)
+    labels[free_mask] = vertex_islands
+    
+    edge_islands = labels[edges].max(axis=1) if len(edges) else np.empty((0,), dtype=int)
+    return labels, edge_islands, len(free_labels)
+
+def balanced_batches(weights, n_batches):
+    """
+    Pack the islands into batches of similar total weight (e.g. number of
+    springs), so that batches solved in parallel finish at similar times.
+    Uses the greedy longest processing time rule, where the heaviest island
+    goes to the lightest batch first.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        Cost of every island, has shape (n_islands, ).
+    n_batches : int
+        Maximum number of batches.
+
+    Returns
+    -------
+    batch_ids : np.ndarray
+        Batch id per island, has shape (n_islands, ).
+    n_batches : int
+        Number of batches, that is at most the number of islands.
+    """
+    weights = np.asarray(weights, dtype=float)
+    n_batches = max(1, min(n_batches, len(weights)))
+    
+    loads = np.zeros(n_batches)
+    batch_ids = np.zeros(len(weights), dtype=int)
+    for island in np.argsort(-weights, kind="stable"):
+        batch = int(np.argmin(loads))
+        batch_ids[island] = batch
+        loads[batch] += weights[island]
+    return batch_ids, n_batches
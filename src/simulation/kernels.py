@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 09:15:02 2026
+
+Vectorized kernels of the mass-spring simulation. Every function here works
+on the flat arrays of a MassSpringSystem, i.e. (n_masses, 3) particle arrays
+and (n_springs, 2) edge index arrays, without looping over Python objects.
+
+@author: bartu
+"""
+import numpy as np
+
+_MAX_ALLOWED_FORCE = 1e10
+
+def scatter_add(buffer, idxs, values):
+    """
+    Accumulate values[i] on buffer[idxs[i]], repeated indices are summed.
+    
+    np.add.at() does the same but it's unbuffered and slow, bincount is much
+    faster for the (n, 3) buffers we have here.
+
+    Parameters
+    ----------
+    buffer : np.ndarray
+        Per-particle buffer of shape (n, d) that is updated in place.
+    idxs : np.ndarray
+        Integer row indices of shape (m, ).
+    values : np.ndarray
+        Values of shape (m, d) to be added at the given rows.
+
+    Returns
+    -------
+    buffer : np.ndarray
+        The same buffer that is passed as input.
+    """
+    n = len(buffer)
+    for d in range(buffer.shape[1]):
+        buffer[:, d] += np.bincount(idxs, weights=values[:, d], minlength=n)
+    return buffer
+
+def compute_edge_forces(positions, velocities, edges, 
+                        stiffnesses, dampings, spring_dscales, rest_lengths, 
+                        tol=1e-12):
+    """
+    Compute the elastic and damping forces of every spring in a single pass.
+    
+    Spring force follows Hooke's law, scaled by the spring dscale, and the 
+    damping force opposes the speed of the endpoints along the spring direction.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Particle locations, has shape (n_masses, 3).
+    velocities : np.ndarray
+        Particle velocities, has shape (n_masses, 3).
+    edges : np.ndarray
+        Spring endpoint indices, has shape (n_springs, 2).
+    stiffnesses, dampings, spring_dscales, rest_lengths : np.ndarray
+        Per-spring parameters, each has shape (n_springs, ).
+    tol : float, optional
+        Lower bound of the spring length to avoid division by zero for
+        zero-length (point) springs. The default is 1e-12.
+
+    Returns
+    -------
+    f_first : np.ndarray
+        Force on the first particle of each spring, has shape (n_springs, 3).
+    f_second : np.ndarray
+        Force on the second particle of each spring, has shape (n_springs, 3).
+    """
+    i, j = edges[:, 0], edges[:, 1]
+    spring_vec = positions[j] - positions[i]
+    distance = np.sqrt(np.sum(spring_vec * spring_vec, axis=-1))
+    spring_force_amount = (distance - rest_lengths) * stiffnesses * spring_dscales
+    
+    # Find the spring direction and normalize it (it's a zero vector for point springs at rest)
+    normalized_dir = spring_vec / np.maximum(distance, tol)[:, None]
+    
+    # Find speed of contraction/expansion for damping force
+    s = np.sum((velocities[i] + velocities[j]) * normalized_dir, axis=-1)
+    damping_force_amount = -dampings * s
+    
+    f_first = (spring_force_amount + damping_force_amount)[:, None] * normalized_dir
+    f_second = (-spring_force_amount + damping_force_amount)[:, None] * normalized_dir
+    
+    assert not np.any(np.abs(f_first) > _MAX_ALLOWED_FORCE), "WARNING: System got unstable with spring forces, stopping execution..."
+    assert not np.any(np.abs(f_second) > _MAX_ALLOWED_FORCE), "WARNING: System got unstable with spring forces, stopping execution..."
+    return f_first, f_second
+
+def compute_spring_forces(positions, velocities, particle_masses, gravities,
+                          edges, stiffnesses, dampings, spring_dscales, rest_lengths,
+                          out=None):
+    """
+    Compute the total force acting on every particle, that is the sum of
+    the spring forces it's attached to plus the gravitational force. 
+    Zero-mass (fixed) particles get zero force by f = ma.
+
+    Parameters
+    ----------
+    positions, velocities : np.ndarray
+        Particle state, both have shape (n_masses, 3).
+    particle_masses : np.ndarray
+        Particle masses, has shape (n_masses, ).
+    gravities : np.ndarray
+        Gravitational acceleration per particle, has shape (n_masses, 3).
+    edges, stiffnesses, dampings, spring_dscales, rest_lengths : np.ndarray
+        Spring arrays, see compute_edge_forces().
+    out : np.ndarray, optional
+        Force buffer of shape (n_masses, 3) to write the result into. If None,
+        a new array is allocated. The default is None.
+
+    Returns
+    -------
+    forces : np.ndarray
+        Total force per particle, has shape (n_masses, 3).
+    """
+    if out is None: out = np.empty_like(positions)
+    
+    np.multiply(particle_masses[:, None], gravities, out=out) # F = mg where g is graviational acceleration
+    if len(edges):
+        f_first, f_second = compute_edge_forces(positions, velocities, edges,
+                                                stiffnesses, dampings, spring_dscales, rest_lengths)
+        scatter_add(out, edges[:, 0], f_first)
+        scatter_add(out, edges[:, 1], f_second)
+        
+    out[particle_masses < 1e-20] = 0.0 # If mass is zero, force is zero by f = ma
+    return out
+
+def _distance_constraint_deltas(P, edges, rest_lengths, inv_masses, alpha_tilde, 
+                                lambdas=None, tol=1e-20):
+    # Solve a single XPBD distance constraint for every given edge, 
+    # assuming they're independent. Returns the position deltas for both 
+    # endpoints and the change of the Lagrange multipliers.
+    i, j = edges[:, 0], edges[:, 1]
+    w1, w2 = inv_masses[i], inv_masses[j]
+    
+    spring_vec = P[i] - P[j]
+    spring_len = np.sqrt(np.sum(spring_vec * spring_vec, axis=-1))
+    valid = spring_len >= tol                       # Avoid division by zero
+    
+    C = spring_len - rest_lengths
+    grad_C = spring_vec / np.where(valid, spring_len, 1.0)[:, None] # Gradients are 1 for distance constratins
+    
+    grad_sum = w1 + w2
+    denominator = grad_sum + alpha_tilde
+    if lambdas is None: numerator = -C
+    else:               numerator = -C - alpha_tilde * lambdas
+    
+    d_lambda = np.divide(numerator, denominator, out=np.zeros_like(C), where=valid & (denominator > 0.0))
+    
+    delta_x1 = (d_lambda * w1)[:, None] * grad_C
+    delta_x2 = -(d_lambda * w2)[:, None] * grad_C
+    return delta_x1, delta_x2, d_lambda
+
+def project_distance_constraints_gs(P, edges, rest_lengths, inv_masses, alpha_tilde, 
+                                    color_groups, lambdas=None):
+    """
+    Project distance constraints with Gauss-Seidel iterations over the edge 
+    colors. Edges in the same color don't share a movable vertex, so each color
+    is projected as a single vectorized batch.
+
+    Parameters
+    ----------
+    P : np.ndarray
+        Predicted particle locations of shape (n_masses, 3), updated in place.
+    edges : np.ndarray
+        Spring endpoint indices, has shape (n_springs, 2).
+    rest_lengths : np.ndarray
+        Has shape (n_springs, ).
+    inv_masses : np.ndarray
+        Inverse particle masses, has shape (n_masses, ). 
+    alpha_tilde : float or np.ndarray
+        Compliance divided by dt^2, either a scalar or per spring.
+    color_groups : list
+        Edge indices for every color, see graph.color_edges().
+    lambdas : np.ndarray, optional
+        Lagrange multipliers of shape (n_springs, ) that are accumulated in
+        place (XPBD). If None, every projection starts from zero multipliers.
+        The default is None.
+
+    Returns
+    -------
+    P : np.ndarray
+        The projected particle locations.
+    """
+    alpha_tilde = np.broadcast_to(alpha_tilde, rest_lengths.shape)
+    for group in color_groups:
+        group_edges = edges[group]
+        group_lambdas = None if lambdas is None else lambdas[group]
+        delta_x1, delta_x2, d_lambda = _distance_constraint_deltas(P, group_edges, rest_lengths[group],
+                                                                   inv_masses, alpha_tilde[group], 
+                                                                   group_lambdas)
+        # No duplicate movable vertices within a color, static ones get zero deltas.
+        P[group_edges[:, 0]] += delta_x1
+        P[group_edges[:, 1]] += delta_x2
+        if lambdas is not None: lambdas[group] += d_lambda
+    return P
+
+def project_distance_constraints_jacobi(P, edges, rest_lengths, inv_masses, alpha_tilde, 
+                                        relaxation=1.0, lambdas=None):
+    """
+    Project all distance constraints in parallel (Jacobi iteration). The 
+    deltas of a particle are averaged over the number of constraints it 
+    takes part in, and scaled with the relaxation factor, to avoid the
+    overshooting of plain Jacobi updates. The multiplier of a constraint is
+    scaled the same way, with the inverse mass weighted average of the
+    scales of its endpoints, so that it matches the applied correction.
+
+    Parameters
+    ----------
+    P, edges, rest_lengths, inv_masses, alpha_tilde, lambdas : 
+        See project_distance_constraints_gs().
+    relaxation : float, optional
+        Relaxation factor, typically in range (0.0, 2.0). The default is 1.0.
+
+    Returns
+    -------
+    P : np.ndarray
+        The projected particle locations.
+    """
+    if len(edges) == 0: return P
+    
+    delta_x1, delta_x2, d_lambda = _distance_constraint_deltas(P, edges, rest_lengths, inv_masses,
+                                                               alpha_tilde, lambdas)
+    deltas = np.zeros_like(P)
+    scatter_add(deltas, edges[:, 0], delta_x1)
+    scatter_add(deltas, edges[:, 1], delta_x2)
+    
+    scales = relaxation / np.maximum(np.bincount(edges.ravel(), minlength=len(P)), 1)
+    P += deltas * scales[:, None]
+    if lambdas is not None:
+        w1, w2 = inv_masses[edges[:, 0]], inv_masses[edges[:, 1]]
+        w_sum = w1 + w2
+        lambda_scales = np.divide(w1 * scales[edges[:, 0]] + w2 * scales[edges[:, 1]], w_sum,
+                                  out=np.full_like(d_lambda, relaxation), where=w_sum > 0.0)
+        lambdas += d_lambda * lambda_scales
+    return P
+
+def predict_positions(positions, velocities, forces, inv_masses, mass_dscales, dt):
+    """
+    Explicit PBD prediction, i.e. integrate the velocities with the forces,
+    damp them with the mass dscales and step the positions.
+
+    Parameters
+    ----------
+    positions, velocities, forces : np.ndarray
+        Particle arrays of shape (n_masses, 3).
+    inv_masses, mass_dscales : np.ndarray
+        Per-particle arrays of shape (n_masses, ).
+    dt : float
+        Time step.
+
+    Returns
+    -------
+    P : np.ndarray
+        Predicted particle locations, has shape (n_masses, 3).
+    """
+    velocities = velocities + dt * inv_masses[:, None] * forces
+    velocities = velocities * mass_dscales[:, None]
+    return positions + dt * velocities
+
+def preserve_bone_length(positions, bone_start, idx, target_length, tol=1e-20):
+    """
+    Move the particle idx along the bone direction such that its distance to
+    bone_start becomes target_length. Updates positions in place.
+
+    Returns
+    -------
+    adjust_vec : np.ndarray
+        Translation applied to the particle, has shape (3, ).
+    endpoint : np.ndarray
+        New location of the particle, has shape (3, ).
+    """
+    direction = bone_start - positions[idx]
+    d_norm = np.linalg.norm(direction)
+    scale = d_norm - target_length
+    
+    if d_norm > tol:
+        adjust_vec = (direction / d_norm) * scale # Normalize direction and scale it
+    else:
+        print(">> WARNING: Found zero-length norm")
+        adjust_vec = direction * scale # zero vector
+        
+    positions[idx] += adjust_vec
+    return adjust_vec, positions[idx]
+
+def preserve_bone_lengths(positions, bone_starts, idxs, target_lengths, tol=1e-20):
+    """
+    Batched version of preserve_bone_length(), where bone_starts has shape 
+    (n, 3), and idxs and target_lengths have shape (n, ). The particles idxs
+    must be unique.
+
+    Returns
+    -------
+    adjust_vecs : np.ndarray
+        Translations applied to the particles, has shape (n, 3).
+    endpoints : np.ndarray
+        New locations of the particles, has shape (n, 3).
+    """
+    direction = bone_starts - positions[idxs]
+    d_norm = np.sqrt(np.sum(direction * direction, axis=-1))
+    scale = d_norm - target_lengths
+    
+    valid = d_norm > tol
+    if not np.all(valid): print(">> WARNING: Found zero-length norm")
+    adjust_vecs = np.where(valid[:, None], direction / np.where(valid, d_norm, 1.0)[:, None], direction) * scale[:, None]
+    
+    positions[idxs] += adjust_vecs
+    return adjust_vecs, positions[idxs]
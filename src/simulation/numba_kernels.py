@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:12:47 2026
+
+Numba compiled versions of the kernels in kernels.py. They have the same
+signatures, so a MassSpringSystem can switch between the two modules.
+
+Compiled loops make the Gauss-Seidel constraint sweep cheap without
+batching it over the edge colors, and avoid the temporary arrays of the
+vectorized force evaluation. Numba is optional, check NUMBA_AVAILABLE
+before using this module.
+
+@author: bartu
+"""
+import numpy as np
+
+from .kernels import _MAX_ALLOWED_FORCE, project_distance_constraints_jacobi # Jacobi is a single vectorized pass already
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+def _jit(func):
+    # Compiled loops release the GIL, so disjoint islands can be solved in threads
+    if NUMBA_AVAILABLE:
+        return numba.njit(cache=True, nogil=True)(func)
+    return func
+
+# =============================================================================
+# Compiled loops
+# =============================================================================
+@_jit
+def _accumulate_spring_forces(positions, velocities, particle_masses, gravities,
+                              edges, stiffnesses, dampings, spring_dscales, rest_lengths,
+                              out, tol):
+    n_masses, n_dims = positions.shape
+    for p in range(n_masses):
+        for d in range(n_dims):
+            out[p, d] = particle_masses[p] * gravities[p, d]
+
+    max_force = 0.0
+    normalized_dir = np.empty(n_dims)
+    for e in range(len(edges)):
+        i, j = edges[e, 0], edges[e, 1]
+        distance = 0.0
+        for d in range(n_dims):
+            normalized_dir[d] = positions[j, d] - positions[i, d]
+            distance += normalized_dir[d] * normalized_dir[d]
+        distance = np.sqrt(distance)
+
+        spring_force_amount = (distance - rest_lengths[e]) * stiffnesses[e] * spring_dscales[e]
+        s = 0.0
+        for d in range(n_dims):
+            normalized_dir[d] /= max(distance, tol)
+            s += (velocities[i, d] + velocities[j, d]) * normalized_dir[d]
+        damping_force_amount = -dampings[e] * s
+
+        for d in range(n_dims):
+            f_first = (spring_force_amount + damping_force_amount) * normalized_dir[d]
+            f_second = (-spring_force_amount + damping_force_amount) * normalized_dir[d]
+            out[i, d] += f_first
+            out[j, d] += f_second
+            max_force = max(max_force, abs(f_first), abs(f_second))
+
+    for p in range(n_masses):
+        if particle_masses[p] < 1e-20:
+            for d in range(n_dims):
+                out[p, d] = 0.0
+    return max_force
+
+@_jit
+def _predict_positions(positions, velocities, forces, inv_masses, mass_dscales, dt, out):
+    n_masses, n_dims = positions.shape
+    for p in range(n_masses):
+        for d in range(n_dims):
+            velocity = (velocities[p, d] + dt * inv_masses[p] * forces[p, d]) * mass_dscales[p]
+            out[p, d] = positions[p, d] + dt * velocity
+    return out
+
+@_jit
+def _project_distance_constraints_sequential(P, edges, rest_lengths, inv_masses, alpha_tilde,
+                                             order, lambdas, use_lambdas, tol):
+    n_dims = P.shape[1]
+    grad_C = np.empty(n_dims)
+    for e in order:
+        i, j = edges[e, 0], edges[e, 1]
+        w1, w2 = inv_masses[i], inv_masses[j]
+
+        spring_len = 0.0
+        for d in range(n_dims):
+            grad_C[d] = P[i, d] - P[j, d]
+            spring_len += grad_C[d] * grad_C[d]
+        spring_len = np.sqrt(spring_len)
+
+        denominator = w1 + w2 + alpha_tilde[e]
+        if spring_len < tol or denominator <= 0.0:
+            continue
+
+        C = spring_len - rest_lengths[e]
+        numerator = -C
+        if use_lambdas: numerator -= alpha_tilde[e] * lambdas[e]
+        d_lambda = numerator / denominator
+
+        for d in range(n_dims):
+            grad_C[d] /= spring_len
+            P[i, d] += d_lambda * w1 * grad_C[d]
+            P[j, d] -= d_lambda * w2 * grad_C[d]
+        if use_lambdas: lambdas[e] += d_lambda
+    return P
+
+@_jit
+def _preserve_bone_length(positions, bone_start, idx, target_length, tol):
+    n_dims = positions.shape[1]
+    direction = np.empty(n_dims)
+    d_norm = 0.0
+    for d in range(n_dims):
+        direction[d] = bone_start[d] - positions[idx, d]
+        d_norm += direction[d] * direction[d]
+    d_norm = np.sqrt(d_norm)
+    scale = d_norm - target_length
+
+    if d_norm > tol:
+        direction /= d_norm
+    adjust_vec = direction * scale # zero vector if there's no direction
+    for d in range(n_dims):
+        positions[idx, d] += adjust_vec[d]
+    return adjust_vec, d_norm > tol
+
+@_jit
+def _preserve_bone_lengths(positions, bone_starts, idxs, target_lengths, tol):
+    adjust_vecs = np.empty((len(idxs), positions.shape[1]))
+    all_valid = True
+    for i in range(len(idxs)):
+        adjust_vec, valid = _preserve_bone_length(positions, bone_starts[i], idxs[i], target_lengths[i], tol)
+        adjust_vecs[i] = adjust_vec
+        all_valid = all_valid and valid
+    return adjust_vecs, all_valid
+
+# =============================================================================
+# Wrappers with the same signatures as in kernels.py
+# =============================================================================
+def compute_spring_forces(positions, velocities, particle_masses, gravities,
+                          edges, stiffnesses, dampings, spring_dscales, rest_lengths,
+                          out=None):
+    """
+    Compiled version of kernels.compute_spring_forces().
+    """
+    if out is None: out = np.empty_like(positions)
+
+    max_force = _accumulate_spring_forces(positions, velocities, particle_masses, gravities,
+                                          edges, stiffnesses, dampings, spring_dscales, rest_lengths,
+                                          out, 1e-12)
+    assert not max_force > _MAX_ALLOWED_FORCE, "WARNING: System got unstable with spring forces, stopping execution..."
+    return out
+
+def predict_positions(positions, velocities, forces, inv_masses, mass_dscales, dt):
+    """
+    Compiled version of kernels.predict_positions().
+    """
+    return _predict_positions(positions, velocities, forces, inv_masses, mass_dscales,
+                              float(dt), np.empty_like(positions))
+
+def project_distance_constraints_gs(P, edges, rest_lengths, inv_masses, alpha_tilde,
+                                    color_groups, lambdas=None):
+    """
+    Compiled version of kernels.project_distance_constraints_gs(). The edges
+    are projected one by one in the order of their colors, that gives the
+    same result as projecting each color as a batch.
+    """
+    if len(edges) == 0: return P
+
+    alpha_tilde = np.ascontiguousarray(np.broadcast_to(alpha_tilde, rest_lengths.shape), dtype=float)
+    order = np.concatenate(color_groups)
+    use_lambdas = lambdas is not None
+    if not use_lambdas: lambdas = np.empty(0)
+
+    return _project_distance_constraints_sequential(P, edges, rest_lengths, inv_masses, alpha_tilde,
+                                                    order, lambdas, use_lambdas, 1e-20)
+
+def project_distance_constraints_batches(P, edges, rest_lengths, inv_masses, alpha_tilde,
+                                         batch_orders, executor, lambdas=None):
+    """
+    Gauss-Seidel projection of independent batches of islands in parallel.
+    Every batch holds the edges of some islands in color order, islands don't
+    share movable particles, so the result is the same as the sequential 
+    project_distance_constraints_gs().
+
+    Parameters
+    ----------
+    P, edges, rest_lengths, inv_masses, alpha_tilde, lambdas : 
+        See kernels.project_distance_constraints_gs().
+    batch_orders : list
+        Edge indices of every batch, in the order they're projected.
+    executor : concurrent.futures.Executor
+        Thread pool that runs the batches.
+
+    Returns
+    -------
+    P : np.ndarray
+        The projected particle locations.
+    """
+    if len(edges) == 0: return P
+
+    alpha_tilde = np.ascontiguousarray(np.broadcast_to(alpha_tilde, rest_lengths.shape), dtype=float)
+    use_lambdas = lambdas is not None
+    if not use_lambdas: lambdas = np.empty(0)
+
+    futures = [executor.submit(_project_distance_constraints_sequential, P, edges, rest_lengths, inv_masses,
+                               alpha_tilde, order, lambdas, use_lambdas, 1e-20) for order in batch_orders]
+    for future in futures: future.result()
+    return P
+
+def preserve_bone_length(positions, bone_start, idx, target_length, tol=1e-20):
+    """
+    Compiled version of kernels.preserve_bone_length().
+    """
+    adjust_vec, valid = _preserve_bone_length(positions, np.asarray(bone_start, dtype=float),
+                                              int(idx), float(target_length), tol)
+    if not valid: print(">> WARNING: Found zero-length norm")
+    return adjust_vec, positions[idx]
+
+def preserve_bone_lengths(positions, bone_starts, idxs, target_lengths, tol=1e-20):
+    """
+    Compiled version of kernels.preserve_bone_lengths().
+    """
+    idxs = np.asarray(idxs, dtype=np.int64)
+    adjust_vecs, valid = _preserve_bone_lengths(positions, np.asarray(bone_starts, dtype=float), idxs,
+                                                np.asarray(target_lengths, dtype=float), tol)
+    if not valid: print(">> WARNING: Found zero-length norm")
+    return adjust_vecs, positions[idxs]
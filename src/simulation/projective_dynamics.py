@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:10:26 2026
+
+Projective Dynamics solver for mass-spring systems, based on
+Liu et al., "Fast Simulation of Mass-Spring Systems" (2013) and 
+Bouaziz et al., "Projective Dynamics" (2014).
+
+Every iteration projects the springs to their rest lengths (local step), 
+then solves the global system 
+    (M / h^2 + L) x = M / h^2 y + b(d)
+where L is the stiffness weighted spring Laplacian. The global matrix only
+depends on the topology, masses, stiffnesses and time step, so it's 
+factorized once and reused for the whole animation. 
+
+@author: bartu
+"""
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from .kernels import scatter_add
+
+class ProjectiveDynamicsSolver:
+    def __init__(self, edges, stiffnesses, particle_masses, free_mask, dt):
+        """
+        Build and factorize the global system matrix for the free particles.
+        Fixed particles are treated as boundary conditions.
+
+        Parameters
+        ----------
+        edges : np.ndarray
+            Spring endpoint indices, has shape (n_springs, 2).
+        stiffnesses : np.ndarray
+            Spring stiffnesses, already scaled by the spring dscale, has shape (n_springs, ).
+        particle_masses : np.ndarray
+            Has shape (n_masses, ).
+        free_mask : np.ndarray
+            Boolean mask of the particles that are simulated, has shape (n_masses, ).
+        dt : float
+            Time step the matrix is factorized for.
+        """
+        n_masses = len(particle_masses)
+        self.dt = dt
+        self.edges = edges
+        self.stiffnesses = stiffnesses
+        self.free = np.nonzero(free_mask)[0]
+        self.fixed = np.nonzero(~free_mask)[0]
+        self.inertia = particle_masses / (dt * dt)  # M / h^2
+        
+        i, j = edges[:, 0], edges[:, 1]
+        L = sparse.csr_matrix((np.concatenate([stiffnesses, stiffnesses, -stiffnesses, -stiffnesses]),
+                               (np.concatenate([i, j, i, j]), np.concatenate([i, j, j, i]))), 
+                              shape=(n_masses, n_masses))
+        A = sparse.diags(self.inertia) + L
+        
+        self.L_free_fixed = L[self.free][:, self.fixed]
+        self.factor = None
+        if len(self.free):
+            self.factor = splu(A[self.free][:, self.free].tocsc())
+        
+    def solve(self, x, y, rest_lengths, iterations=1, tol=1e-12):
+        """
+        Run Projective Dynamics iterations.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Initial guess of shape (n_masses, 3), the fixed rows must hold the
+            (kinematically updated) fixed particle locations. Updated in place.
+        y : np.ndarray
+            Inertial prediction x + h v + h^2 M^-1 f_ext, has shape (n_masses, 3).
+        rest_lengths : np.ndarray
+            Has shape (n_springs, ).
+        iterations : int, optional
+            Number of local-global iterations. The default is 1.
+
+        Returns
+        -------
+        x : np.ndarray
+            Solved particle locations.
+        """
+        if self.factor is None: return x
+        
+        i, j = self.edges[:, 0], self.edges[:, 1]
+        inertial_rhs = self.inertia[self.free, None] * y[self.free]
+        boundary_rhs = self.L_free_fixed @ x[self.fixed]
+        for _ in range(iterations):
+            # Local step: project every spring to its rest length
+            spring_vec = x[i] - x[j]
+            spring_len = np.sqrt(np.sum(spring_vec * spring_vec, axis=-1))
+            d = spring_vec * (rest_lengths / np.maximum(spring_len, tol))[:, None]
+            
+            # Global step: b = sum_e k_e A_e^T d_e
+            b = np.zeros_like(x)
+            scatter_add(b, i, self.stiffnesses[:, None] * d)
+            scatter_add(b, j, -self.stiffnesses[:, None] * d)
+            
+            x[self.free] = self.factor.solve(inertial_rhs + b[self.free] - boundary_rhs)
+        return x
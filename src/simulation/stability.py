@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+Stable time step estimates for the explicit integrators, and an adaptive
+substep controller that picks the number of substeps per frame from them.
+
+The spring forces are integrated with semi-implicit (symplectic) Euler in
+PBD and XPBD, that is stable for a damped oscillator x'' = -w^2 x - g x' when
+    w^2 h^2 + 2 g h < 4,
+i.e. h < 4 / (g + sqrt(g^2 + 4 w^2)). The largest frequency w and damping
+rate g of the system are bounded per particle with Gershgorin's theorem, so
+the estimate is conservative.
+
+@author: bartu
+"""
+import numpy as np
+
+EXPLICIT_MODES = ("PBD", "XPBD", "VERLET", "EULER") # PD and implicit Euler are unconditionally stable
+
+def estimate_stable_dt(particle_masses, edges, stiffnesses, dampings, spring_dscales, free_mask=None):
+    """
+    Estimate the largest stable time step of the explicit spring force
+    integration, see the module docstring.
+
+    Parameters
+    ----------
+    particle_masses : np.ndarray
+        Has shape (n_masses, ).
+    edges, stiffnesses, dampings, spring_dscales : np.ndarray
+        Spring arrays, see kernels.compute_edge_forces().
+    free_mask : np.ndarray, optional
+        Boolean mask of the simulated particles, has shape (n_masses, ). If
+        None, every particle with positive mass is taken. The default is None.
+
+    Returns
+    -------
+    dt : float
+        Stable time step, np.inf if no free particle is attached to a spring.
+    """
+    if free_mask is None: free_mask = particle_masses > 1e-20
+    if len(edges) == 0 or not np.any(free_mask): return np.inf
+
+    n_masses = len(particle_masses)
+    k = np.abs(stiffnesses * spring_dscales)
+    k_sum = np.bincount(edges.ravel(), weights=np.repeat(k, 2), minlength=n_masses)
+    kd_sum = np.bincount(edges.ravel(), weights=np.repeat(np.abs(dampings), 2), minlength=n_masses)
+
+    # Row sums of M^-1 K and M^-1 D bound their largest eigenvalues
+    masses = particle_masses[free_mask]
+    omega2 = 2.0 * k_sum[free_mask] / masses
+    gamma = 2.0 * kd_sum[free_mask] / masses
+
+    denominator = gamma + np.sqrt(gamma * gamma + 4.0 * omega2)
+    if not np.any(denominator > 0.0): return np.inf
+    return float(4.0 / denominator.max())
+
+def compute_energy(positions, velocities, particle_masses, gravities,
+                   edges, stiffnesses, spring_dscales, rest_lengths):
+    """
+    Compute the energy of the mass-spring system.
+
+    Returns
+    -------
+    kinetic : float
+        Sum of 0.5 m |v|^2.
+    elastic : float
+        Sum of 0.5 k (l - l0)^2 of the springs.
+    gravitational : float
+        Sum of -m g.x, where g is the gravitational acceleration per particle.
+    """
+    kinetic = 0.5 * np.sum(particle_masses * np.sum(velocities * velocities, axis=-1))
+    gravitational = -np.sum(particle_masses * np.sum(gravities * positions, axis=-1))
+
+    spring_vec = positions[edges[:, 1]] - positions[edges[:, 0]]
+    stretch = np.sqrt(np.sum(spring_vec * spring_vec, axis=-1)) - rest_lengths
+    elastic = 0.5 * np.sum(stiffnesses * spring_dscales * stretch * stretch)
+    return float(kinetic), float(elastic), float(gravitational)
+
+class SubstepController:
+    def __init__(self, safety=0.9, max_substeps=64, energy_tolerance=None, relax_frames=10):
+        """
+        Pick the number of substeps of every frame from the stable time step
+        estimate, so that stiff systems stay stable and soft systems don't
+        take more substeps than they need. Set it as the substep_controller
+        of a MassSpringSystem.
+
+        Parameters
+        ----------
+        safety : float, optional
+            Fraction of the estimated stable time step that is used. The
+            default is 0.9.
+        max_substeps : int, optional
+            Upper limit of substeps per frame. The default is 64.
+        energy_tolerance : float, optional
+            If set, the frame is repeated with twice the substeps whenever the
+            total energy grows more than energy_tolerance times the kinetic plus
+            elastic energy, which is a sign of instability. Note that moving
+            fixed particles also adds energy. The extra substeps are kept, and
+            they're halved back after relax_frames frames without energy
+            growth. The default is None, i.e. the energy isn't monitored.
+        relax_frames : int, optional
+            See energy_tolerance. The default is 10.
+        """
+        assert 0.0 < safety, f"Expected positive safety factor, got {safety}."
+        assert max_substeps >= 1, f"Expected at least a single substep, got {max_substeps}."
+        self.safety = safety
+        self.max_substeps = max_substeps
+        self.energy_tolerance = energy_tolerance
+        self.relax_frames = relax_frames
+
+        self.refinement = 1     # Substep multiplier from the energy monitor
+        self._good_frames = 0
+        self.last_substeps = 1  # Substeps taken at the last frame
+
+    def get_substeps(self, system, dt, integration):
+        """
+        Get the minimal number of substeps for a frame of length dt,
+        including the refinement of the energy monitor.
+        """
+        if integration not in EXPLICIT_MODES: return 1
+
+        stable_dt = self.safety * estimate_stable_dt(system.particle_masses, system.edges, system.stiffnesses,
+                                                     system.dampings, system.spring_dscales, system.free_mask)
+        n_substeps = int(np.ceil(dt / stable_dt)) if np.isfinite(stable_dt) else 1
+        if integration == "XPBD": n_substeps = int(np.ceil(n_substeps / system.substeps)) # XPBD substeps on its own
+        return int(np.clip(n_substeps * self.refinement, 1, self.max_substeps))
+
+    def _energy(self, system):
+        kinetic, elastic, gravitational = compute_energy(system.positions, system.velocities, system.particle_masses,
+                                                         system.gravities, system.edges, system.stiffnesses,
+                                                         system.spring_dscales, system.rest_lengths)
+        return kinetic + elastic + gravitational, kinetic + elastic
+
+    def simulate(self, system, dt, integration, alpha=0.0):
+        """
+        Advance the system by a frame of length dt with the adaptive number
+        of substeps, see MassSpringSystem.simulate_substeps().
+        """
+        n_substeps = self.get_substeps(system, dt, integration)
+        if self.energy_tolerance is None or integration not in EXPLICIT_MODES:
+            system.simulate_substeps(dt, integration, n_substeps, alpha=alpha)
+            self.last_substeps = n_substeps
+            return
+
+        state = [(name, getattr(system, name).copy()) for name in ("positions", "prev_positions", "velocities", "lambdas")]
+        energy, scale = self._energy(system)
+        while True:
+            system.simulate_substeps(dt, integration, n_substeps, alpha=alpha)
+            new_energy, new_scale = self._energy(system)
+            grew = new_energy - energy > self.energy_tolerance * max(scale, new_scale, 1e-12)
+            if not grew or n_substeps >= self.max_substeps: break
+
+            # Repeat the frame with finer substeps
+            for name, values in state: setattr(system, name, values.copy())
+            n_substeps = min(2 * n_substeps, self.max_substeps)
+            self.refinement *= 2
+            self._good_frames = 0
+
+        self.last_substeps = n_substeps
+        self._good_frames = 0 if grew else self._good_frames + 1
+        if self._good_frames >= self.relax_frames and self.refinement > 1:
+            self.refinement //= 2
+            self._good_frames = 0
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:26:05 2026
+
+Taichi implementation of the PBD / XPBD mass-spring simulation that runs
+multithreaded on the CPU (x64). It mirrors MassSpringSystem.simulate_xpbd(),
+where PBD is the single substep, single iteration case.
+
+The particle state is copied to ti.fields at every call and copied back at
+the end, so the NumPy arrays of the MassSpringSystem stay the source of truth
+and kinematic edits such as translate_mass() keep working. Taichi is optional,
+so this module is only imported when the Taichi backend is selected.
+
+@author: bartu
+"""
+import numpy as np
+import taichi as ti
+from taichi.lang import impl as _ti_impl
+
+from .kernels import _MAX_ALLOWED_FORCE
+
+def init_taichi(**kwargs):
+    """
+    Initialize Taichi on the multithreaded CPU backend, unless it's already
+    initialized e.g. by a demo that also runs other Taichi kernels.
+    """
+    if _ti_impl.get_runtime().prog is None:
+        ti.init(arch=ti.x64, default_fp=ti.f64, **kwargs)
+
+@ti.data_oriented
+class TaichiPBDSolver:
+    def __init__(self, system):
+        """
+        Allocate the Taichi fields for the given system. The fields depend on
+        the number of particles and springs, and on the edge coloring, so the
+        solver has to be rebuilt when the topology changes.
+
+        Parameters
+        ----------
+        system : MassSpringSystem
+            System to simulate.
+        """
+        init_taichi()
+        n, E = system.n_masses, system.n_springs
+
+        self.n_masses, self.n_springs = n, E
+        self.positions = ti.Vector.field(3, dtype=ti.f64, shape=n)
+        self.predicted = ti.Vector.field(3, dtype=ti.f64, shape=n)
+        self.velocities = ti.Vector.field(3, dtype=ti.f64, shape=n)
+        self.forces = ti.Vector.field(3, dtype=ti.f64, shape=n)
+        self.deltas = ti.Vector.field(3, dtype=ti.f64, shape=n)     # Jacobi corrections
+        self.gravities = ti.Vector.field(3, dtype=ti.f64, shape=n)
+        self.particle_masses = ti.field(dtype=ti.f64, shape=n)
+        self.inv_masses = ti.field(dtype=ti.f64, shape=n)
+        self.dscales = ti.field(dtype=ti.f64, shape=n)
+        self.n_constraints = ti.field(dtype=ti.f64, shape=n)
+
+        # Fields can't have zero size, springs get a single padding entry
+        E_alloc = max(E, 1)
+        self.edges = ti.Vector.field(2, dtype=ti.i32, shape=E_alloc)
+        self.edge_order = ti.field(dtype=ti.i32, shape=E_alloc)     # Edge indices sorted by color
+        self.stiffnesses = ti.field(dtype=ti.f64, shape=E_alloc)
+        self.dampings = ti.field(dtype=ti.f64, shape=E_alloc)
+        self.spring_dscales = ti.field(dtype=ti.f64, shape=E_alloc)
+        self.rest_lengths = ti.field(dtype=ti.f64, shape=E_alloc)
+        self.lambdas = ti.field(dtype=ti.f64, shape=E_alloc)
+        self.max_value = ti.field(dtype=ti.f64, shape=())
+
+        if E > 0:
+            self.edges.from_numpy(system.edges.astype(np.int32))
+            color_groups = system.get_edge_colors()
+            self.edge_order.from_numpy(np.concatenate(color_groups).astype(np.int32))
+            self.color_offsets = np.cumsum([0] + [len(group) for group in color_groups])
+            self.n_constraints.from_numpy(np.bincount(system.edges.ravel(), minlength=n).astype(float))
+        else:
+            self.color_offsets = np.zeros(1, dtype=int)
+
+    # =========================================================================
+    # Kernels
+    # =========================================================================
+    @ti.kernel
+    def _compute_forces(self, n_springs: ti.i32):
+        for p in self.forces:
+            self.forces[p] = self.particle_masses[p] * self.gravities[p] # F = mg
+
+        self.max_value[None] = 0.0
+        for e in range(n_springs):
+            i, j = self.edges[e][0], self.edges[e][1]
+            spring_vec = self.positions[j] - self.positions[i]
+            distance = spring_vec.norm()
+            spring_force_amount = (distance - self.rest_lengths[e]) * self.stiffnesses[e] * self.spring_dscales[e]
+
+            normalized_dir = spring_vec / ti.max(distance, 1e-12)
+            s = (self.velocities[i] + self.velocities[j]).dot(normalized_dir)
+            damping_force_amount = -self.dampings[e] * s
+
+            f_first = (spring_force_amount + damping_force_amount) * normalized_dir
+            f_second = (-spring_force_amount + damping_force_amount) * normalized_dir
+            self.forces[i] += f_first
+            self.forces[j] += f_second
+            ti.atomic_max(self.max_value[None], ti.max(ti.abs(f_first).max(), ti.abs(f_second).max()))
+
+        for p in self.forces:
+            if self.particle_masses[p] < 1e-20: # If mass is zero, force is zero by f = ma
+                self.forces[p] = ti.Vector([0.0, 0.0, 0.0], dt=ti.f64)
+
+    @ti.kernel
+    def _predict(self, h: ti.f64, dscale_power: ti.f64):
+        for p in self.positions:
+            velocity = (self.velocities[p] + h * self.inv_masses[p] * self.forces[p]) * ti.pow(self.dscales[p], dscale_power)
+            self.predicted[p] = self.positions[p] + h * velocity
+
+    @ti.func
+    def _constraint_delta(self, e, alpha_tilde, use_lambdas):
+        # XPBD distance constraint of a single edge, see kernels._distance_constraint_deltas()
+        i, j = self.edges[e][0], self.edges[e][1]
+        w1, w2 = self.inv_masses[i], self.inv_masses[j]
+        spring_vec = self.predicted[i] - self.predicted[j]
+        spring_len = spring_vec.norm()
+
+        d_lambda = ti.f64(0.0)
+        grad_C = ti.Vector([0.0, 0.0, 0.0], dt=ti.f64)
+        denominator = w1 + w2 + alpha_tilde
+        if spring_len >= 1e-20 and denominator > 0.0:
+            grad_C = spring_vec / spring_len
+            numerator = -(spring_len - self.rest_lengths[e])
+            if use_lambdas: numerator -= alpha_tilde * self.lambdas[e]
+            d_lambda = numerator / denominator
+        return d_lambda * w1 * grad_C, -d_lambda * w2 * grad_C, d_lambda
+
+    @ti.kernel
+    def _project_colors(self, start: ti.i32, end: ti.i32, alpha_tilde: ti.f64, use_lambdas: ti.i32):
+        # Edges of a color don't share movable particles, so they're projected in parallel
+        for k in range(start, end):
+            e = self.edge_order[k]
+            delta_x1, delta_x2, d_lambda = self._constraint_delta(e, alpha_tilde, use_lambdas)
+            self.predicted[self.edges[e][0]] += delta_x1
+            self.predicted[self.edges[e][1]] += delta_x2
+            if use_lambdas: self.lambdas[e] += d_lambda
+
+    @ti.kernel
+    def _project_jacobi(self, n_springs: ti.i32, alpha_tilde: ti.f64, relaxation: ti.f64, use_lambdas: ti.i32):
+        for p in self.deltas:
+            self.deltas[p] = ti.Vector([0.0, 0.0, 0.0], dt=ti.f64)
+        for e in range(n_springs):
+            delta_x1, delta_x2, d_lambda = self._constraint_delta(e, alpha_tilde, use_lambdas)
+            self.deltas[self.edges[e][0]] += delta_x1
+            self.deltas[self.edges[e][1]] += delta_x2
+            if use_lambdas:
+                # Averaged as the corrections of the endpoints, see kernels.project_distance_constraints_jacobi()
+                i, j = self.edges[e][0], self.edges[e][1]
+                w1, w2 = self.inv_masses[i], self.inv_masses[j]
+                scale = relaxation
+                if w1 + w2 > 0.0:
+                    scale = relaxation * (w1 / ti.max(self.n_constraints[i], 1.0) + w2 / ti.max(self.n_constraints[j], 1.0)) / (w1 + w2)
+                self.lambdas[e] += d_lambda * scale
+        for p in self.predicted:
+            self.predicted[p] += self.deltas[p] * (relaxation / ti.max(self.n_constraints[p], 1.0))
+
+    @ti.kernel
+    def _compute_residual(self, n_springs: ti.i32, alpha_tilde: ti.f64, use_lambdas: ti.i32):
+        self.max_value[None] = 0.0
+        for e in range(n_springs):
+            spring_vec = self.predicted[self.edges[e][0]] - self.predicted[self.edges[e][1]]
+            C = spring_vec.norm() - self.rest_lengths[e]
+            if use_lambdas: C += alpha_tilde * self.lambdas[e]
+            ti.atomic_max(self.max_value[None], ti.abs(C))
+
+    @ti.kernel
+    def _update_state(self, h: ti.f64):
+        for p in self.positions:
+            self.velocities[p] = (self.predicted[p] - self.positions[p]) / h
+            self.positions[p] = self.predicted[p]
+
+    @ti.kernel
+    def _reset_lambdas(self):
+        for e in self.lambdas:
+            self.lambdas[e] = 0.0
+
+    # =========================================================================
+    # Python side
+    # =========================================================================
+    def _upload(self, system):
+        # Fields are f64, float32 systems are converted at upload and download
+        f64 = lambda values : np.ascontiguousarray(values, dtype=np.float64)
+        self.positions.from_numpy(f64(system.positions))
+        self.velocities.from_numpy(f64(system.velocities))
+        self.gravities.from_numpy(f64(system.gravities))
+        self.particle_masses.from_numpy(f64(system.particle_masses))
+        self.inv_masses.from_numpy(f64(system.inv_masses))
+        self.dscales.from_numpy(f64(system.mass_dscales))
+        if self.n_springs > 0:
+            self.stiffnesses.from_numpy(f64(system.stiffnesses))
+            self.dampings.from_numpy(f64(system.dampings))
+            self.spring_dscales.from_numpy(f64(system.spring_dscales))
+            self.rest_lengths.from_numpy(f64(system.rest_lengths))
+
+    def _project(self, system, alpha_tilde, use_lambdas):
+        if system.constraint_solver == "JACOBI":
+            self._project_jacobi(self.n_springs, alpha_tilde, system.relaxation, use_lambdas)
+            return
+        for start, end in zip(self.color_offsets[:-1], self.color_offsets[1:]):
+            self._project_colors(int(start), int(end), alpha_tilde, use_lambdas)
+
+    def _residual(self, alpha_tilde, use_lambdas):
+        if self.n_springs == 0: return 0.0
+        self._compute_residual(self.n_springs, alpha_tilde, use_lambdas)
+        return float(self.max_value[None])
+
+    def simulate(self, system, dt, alpha=0.0, substeps=1, iterations=1, tolerance=None, use_lambdas=True):
+        """
+        Advance the system by dt, see MassSpringSystem.simulate_xpbd() for the
+        parameters. The system arrays are updated at the end of the call.
+        If use_lambdas is False, the constraints are projected without the
+        XPBD multipliers as in MassSpringSystem.simulate_pbd().
+
+        Returns
+        -------
+        residual : float
+            Maximum constraint residual at the end of the step, it's zero if
+            the system doesn't have edge constraints.
+        n_iterations : int
+            Total number of constraint iterations performed.
+        """
+        assert system.n_masses == self.n_masses and system.n_springs == self.n_springs, "Expected the Taichi solver to be rebuilt after topology changes."
+        self._upload(system)
+
+        h = dt / substeps
+        alpha_tilde = alpha / h / h
+        n_iterations = 0
+        for _ in range(substeps):
+            self._compute_forces(self.n_springs)
+            assert not self.max_value[None] > _MAX_ALLOWED_FORCE, "WARNING: System got unstable with spring forces, stopping execution..."
+            self._predict(h, 1.0 / substeps)
+
+            if system.edge_constraint and self.n_springs > 0:
+                self._reset_lambdas() # Multipliers are reset at every substep
+                for _ in range(iterations):
+                    self._project(system, alpha_tilde, use_lambdas)
+                    n_iterations += 1
+                    if tolerance is not None and self._residual(alpha_tilde, use_lambdas) < tolerance:
+                        break
+            self._update_state(h)
+
+        residual = 0.0
+        if system.edge_constraint:
+            residual = self._residual(alpha_tilde, use_lambdas)
+            if use_lambdas and self.n_springs > 0: system.lambdas = self.lambdas.to_numpy()[:self.n_springs].astype(system.dtype)
+
+        system.positions = self.positions.to_numpy().astype(system.dtype, copy=False)
+        system.velocities = self.velocities.to_numpy().astype(system.dtype, copy=False)
+        return residual, n_iterations
@@ -10,6 +10,7 @@ import numpy as np
 
 from .utils.linalg_utils import compose_rigid_transform_matrix
 from .global_vars import VERBOSE
+from .utils.precision import resolve_dtype
 # =============================================================================
 # Bone Class
 # =============================================================================
@@ -123,12 +124,16 @@ class Bone():
 #  Skeleton Class       
 # =============================================================================
 class Skeleton():
-    def __init__(self, root_vec=[0., 0., 1.]):
+    def __init__(self, root_vec=[0., 0., 1.], dtype=None):
         """
             @param root_vec: list, torch or numpy.ndarray. It's a 3D coordinate vector 
             of root node laction. It will be used to create invisible root bone, 
             that is starting from the origin and ends at the provided root_vec.
+            @param dtype: Floating point type of the posed bone locations and 
+            transformations, float32 or float64. Forward kinematics is computed
+            in float64. If None, the default of utils.precision is used.
         """
+        self.dtype = resolve_dtype(dtype)
         self.rest_bones = []
         self.kintree = []
         
@@ -244,7 +249,7 @@ class Skeleton():
         for b in range(n_bones):
             fk_helper(b)
         
-        absolute_rot, absolute_trans = vQ, vT
+        absolute_rot, absolute_trans = vQ.astype(self.dtype, copy=False), vT.astype(self.dtype, copy=False)
         return absolute_rot, absolute_trans
      
     def compute_bone_locations(self, abs_rot_quat, abs_trans):
@@ -283,7 +288,7 @@ class Skeleton():
             
             final_bone_locations[2*i] = s_translated
             final_bone_locations[2*i + 1] = e_translated
-        return final_bone_locations
+        return final_bone_locations.astype(self.dtype, copy=False)
         
         
     def pose_bones(self, theta, trans=None, get_transforms=False, degrees=False): 
@@ -394,23 +399,49 @@ class Skeleton():
         return new_bone.idx
     
     def remove_bone(self, bone_idx):
+        """
+        Remove a bone from the skeleton, its children are attached to its 
+        parent. The last bone is moved to the freed index, so no other bone
+        index shifts. Note that per-bone arrays (e.g. pose parameters) need 
+        the same swap, see the returned index.
+
+        Parameters
+        ----------
+        bone_idx : int
+            Index of the bone to be removed.
+
+        Returns
+        -------
+        moved_idx : int or None
+            Previous index of the bone that's moved to bone_idx, None if the
+            removed bone was the last one or it couldn't be removed.
+        """
         bone_to_be_removed = self.rest_bones[bone_idx]
         parent = bone_to_be_removed.parent
         
-        if parent:
-            for child in bone_to_be_removed.children:
-                child.parent = parent    
-        else:
-            if len(bone_to_be_removed.children) == 1:
-                child.parent = None
-            print(">> WARNING: Cannot remove root bone with multiple children.")
-            return
+        if parent is None:
+            print(">> WARNING: Cannot remove root bone.")
+            return None
+        
+        # Attach the children to the parent
+        parent.children.remove(bone_to_be_removed)
+        for child in bone_to_be_removed.children:
+            child.set_parent(parent)
+            parent.add_child(child)
+            child.correct_rel_trans()
+        bone_to_be_removed.children = []
+        bone_to_be_removed.parent = None
            
-        # Remove the bone from the skeleton bones list
-        bone_to_be_removed.children = None    # It's unnecessary probably.
-        self.rest_bones.remove(bone_to_be_removed)
+        # Swap the last bone into the removed bone's place 
+        moved_idx = None
+        last_bone = self.rest_bones.pop()
+        if last_bone is not bone_to_be_removed:
+            moved_idx = last_bone.idx
+            last_bone.idx = bone_idx
+            self.rest_bones[bone_idx] = last_bone
+        
         self.kintree = self.get_kintree()     # Update kintree
-        return
+        return moved_idx
         
     def get_bone(self, bone_idx):
         assert bone_idx < len(self.rest_bones), f">> Invalid bone index {bone_idx}. Please select an index less than {len(self.rest_bones)}"
@@ -13,6 +13,7 @@ from scipy.spatial.transform import Rotation
 
 from .utils.sanity_check import _assert_normalized_weights
 from .utils.linalg_utils import get_transform_mats_from_quat_rots, min_distance, normalize_weights
+from .utils.precision import resolve_dtype
 
 # ---------------------------------------------------------------------------------
 # Helper routine to obtain posed mesh vertices
@@ -91,7 +92,7 @@ def bind_weights(mesh_verts, skel_verts, method="Envelope", envelope=10.0):
     return weights
 
 
-def LBS_from_quat(V, W, abs_rot, abs_trans, use_normalized_weights=True):
+def LBS_from_quat(V, W, abs_rot, abs_trans, use_normalized_weights=True, dtype=None):
     assert W.shape[0] == V.shape[0], f"Expected weights and verts to have same length at dimension 0, i.e. weights has shape (n_verts, n_bones)\
                                                  and verts has shape (n_verts, 3), got shape {W.shape} and {V.shape}."
     
@@ -104,9 +105,15 @@ def LBS_from_quat(V, W, abs_rot, abs_trans, use_normalized_weights=True):
     assert abs_trans.shape == (n_bones, 3), f"Expected absolute translations to have shape ({n_bones}, 3), got {abs_trans.shape}."
         
     Ms = get_transform_mats_from_quat_rots(abs_trans, abs_rot)
-    return LBS_from_mat(V, W, Ms)
+    return LBS_from_mat(V, W, Ms, dtype=dtype)
     
-def LBS_from_mat(V, W, M, use_normalized_weights=True):
+def LBS_from_mat(V, W, M, use_normalized_weights=True, dtype=None):
+    """
+    Linear Blend Skinning with 4x4 bone transformation matrices M of shape
+    (n_bones, 4, 4). The vertices, weights and matrices are converted to dtype
+    (float32 or float64, see utils.precision) before posing, so the result has 
+    that dtype. If None, the default dtype is used.
+    """
     assert W.shape[0] == V.shape[0], f"Expected weights and verts to have same length at dimension 0, i.e. weights has shape (n_verts, n_bones)\
                                                  and verts has shape (n_verts, 3), got shape {W.shape} and {V.shape}."
     assert W.shape[1] == M.shape[0], f"Expected weights matrix columns dimension 1, to match with transformation matrix dimension 0. Got shapes {W.shape} and {M.shape}."
@@ -114,8 +121,11 @@ def LBS_from_mat(V, W, M, use_normalized_weights=True):
         try: _assert_normalized_weights(W)
         except: W = normalize_weights(W)
     
+    dtype = resolve_dtype(dtype)
+    V, W, M = np.asarray(V, dtype=dtype), np.asarray(W, dtype=dtype), np.asarray(M, dtype=dtype)
+    
     n_verts, n_bones = W.shape
-    V_homo = np.append(V, np.ones((n_verts,1)), axis=-1)
+    V_homo = np.append(V, np.ones((n_verts,1), dtype=dtype), axis=-1)
 
     # Pose vertices via matrix multiplications 
     V_homo = np.expand_dims(V_homo, axis=-1) # shape (n_verts, 4, 1) for broadcasting 
@@ -19,6 +19,12 @@ def MSE_np(ground_truth, predictions):
     return total_diff / n_samples
 
 
+def MSE_torch(ground_truth, predictions):
+    # Same as MSE_np() for torch tensors, differentiable w.r.t. predictions
+    assert ground_truth.shape == predictions.shape, f"Provided arrays must have the same shape. Got {ground_truth.shape} and {predictions.shape}"
+    diff = ground_truth - predictions
+    return torch.sum(diff ** 2) / ground_truth.shape[0]
+
 def my_cost(ground_truth, predictions):
     
     
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:37 2026
+
+Floating point precision policy of the simulation, skinning and kinematics
+arrays. The default dtype is FLOAT_DTYPE in global_vars.py, that can be 
+changed at runtime with set_default_dtype(), or overridden by passing a dtype
+to the MassSpringSystem, Skeleton, LBS_from_mat() or SMPLModel.
+
+Running the per-frame pipeline in float32 halves the memory traffic, that 
+is the bottleneck of LBS over large meshes and long baked sequences. Use 
+compare_precision() to check the deviation from float64 before switching.
+
+@author: bartu
+"""
+import numpy as np
+
+from ..global_vars import FLOAT_DTYPE, VERBOSE
+
+_SUPPORTED_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+_default_dtype = np.dtype(FLOAT_DTYPE)
+
+def set_default_dtype(dtype):
+    """
+    Set the default dtype of the arrays that are created afterwards, either
+    np.float32 or np.float64 (or their names).
+    """
+    global _default_dtype
+    dtype = np.dtype(dtype)
+    assert dtype in _SUPPORTED_DTYPES, f"Expected dtype to be float32 or float64, got {dtype}."
+    _default_dtype = dtype
+
+def get_default_dtype():
+    return _default_dtype
+
+def resolve_dtype(dtype=None):
+    """
+    Get the given dtype as np.dtype, or the default dtype if it's None.
+    """
+    if dtype is None: return _default_dtype
+    dtype = np.dtype(dtype)
+    assert dtype in _SUPPORTED_DTYPES, f"Expected dtype to be float32 or float64, got {dtype}."
+    return dtype
+
+def cast(array, dtype=None):
+    """
+    Convert the array to the given dtype (default dtype if None), without 
+    copying if it already has that dtype.
+    """
+    return np.asarray(array, dtype=resolve_dtype(dtype))
+
+def torch_dtype(dtype=None):
+    """
+    Get the torch dtype of the given dtype (default dtype if None).
+    """
+    import torch # Only the SMPL model and the differentiable helpers need torch
+    if isinstance(dtype, torch.dtype): return dtype
+    return torch.float32 if resolve_dtype(dtype) == np.float32 else torch.float64
+
+def max_deviation(result, reference):
+    """
+    Get the maximum Euclidean distance between corresponding vertices (last 
+    axis) of two arrays, e.g. posed meshes in float32 and float64.
+    """
+    diff = np.asarray(result, dtype=np.float64) - np.asarray(reference, dtype=np.float64)
+    if diff.size == 0: return 0.0
+    return float(np.sqrt(np.max(np.sum(diff * diff, axis=-1))))
+
+def compare_precision(func, *args, dtype=np.float32, verbose=VERBOSE, **kwargs):
+    """
+    Run func with the given dtype and with float64, and report the maximum
+    vertex deviation. func has to accept a dtype keyword argument, e.g. 
+    skinning.LBS_from_mat().
+
+    Returns
+    -------
+    result : np.ndarray
+        Output of func with the given dtype.
+    deviation : float
+        Maximum vertex deviation from the float64 output, see max_deviation().
+    """
+    result = func(*args, dtype=dtype, **kwargs)
+    reference = func(*args, dtype=np.float64, **kwargs)
+    deviation = max_deviation(result, reference)
+    if verbose: print(f">> INFO: Maximum vertex deviation of {np.dtype(dtype).name} from float64 is {deviation:.3e}.")
+    return result, deviation
@@ -12,15 +12,17 @@ _DEBUG_ = True
 _TOLERANCE_ = 1e-8
 
 
-def _assert_normalized_weights(weights):
+def _assert_normalized_weights(weights, tol=None):
+    # Tolerance of the weight sums grows with the rounding error of the dtype
+    if tol is None: tol = max(1e-12, 100 * np.finfo(np.result_type(weights, np.float32)).eps)
     if weights.shape[1] > weights.shape[0]:
         print("WARNING: There seems to be more bones than the vertex count.\
               Weights expected to have shape (n_verts, n_bones), got {weights.shape}")
               
     weights_sum = np.sum(weights, axis=1) # For each vertex sum weights of all bones
     assert len(weights_sum) == len(weights), f"Expected to sum over all vertices, got shape mismatch with weights {weights.shape} and weights sum {weights_sum.shape}."
-    assert not np.any((weights_sum < 1.0-1e-12) & (weights_sum >  1e-12)), "Expected weights for a vertex to sum up 1.0 or 0.0, found weights sum < 1.0."
-    assert not np.any((weights_sum > 1.0+1e-12) & (weights_sum >  1e-12)), "Expected weights for a vertex to sum up 1.0 or 0.0, found weights sum > 1.0."
+    assert not np.any((weights_sum < 1.0-tol) & (weights_sum >  tol)), "Expected weights for a vertex to sum up 1.0 or 0.0, found weights sum < 1.0."
+    assert not np.any((weights_sum > 1.0+tol) & (weights_sum >  tol)), "Expected weights for a vertex to sum up 1.0 or 0.0, found weights sum > 1.0."
     assert not np.any(weights_sum < 0.0), f"Found negative weights sum."
 
 def _check_or_convert_numpy(arr):
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:48:21 2026
+
+Check the stable time step estimate and the adaptive substep controller: a
+stiff lattice that explodes at 24 fps stays stable with the controller, a
+soft rig takes a single substep, and the energy monitor refines the substeps
+when the stability estimate is too optimistic.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.stability import SubstepController, estimate_stable_dt
+
+def create_lattice(n, stiffness, damping, mode="PBD", controller=None):
+    x, z = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, -1, n), indexing="ij")
+    V = np.stack([x.ravel(), np.zeros(n*n), z.ravel()], axis=-1)
+    idx = np.arange(n*n).reshape(n, n)
+    F = np.stack([idx[:-1, :-1].ravel(), idx[1:, :-1].ravel(), idx[1:, 1:].ravel(), idx[:-1, 1:].ravel()], axis=-1)
+    return MassSpringSystem.from_mesh(V, F, 1./24, mass=1.0, stiffness=stiffness, damping=damping, dscale=0.95,
+                                      gravity=True, fixed_idxs=[0, (n-1)*n], mode=mode, 
+                                      substep_controller=controller, verbose=False)
+
+def is_stable(system, n_steps=96):
+    try:
+        for _ in range(n_steps): system.simulate()
+    except AssertionError:
+        return False
+    return bool(np.all(np.isfinite(system.positions)))
+
+if __name__ == "__main__":
+    print(">> Testing adaptive substeps...")
+    
+    # Undamped spring with a fixed end: w^2 = k/m, bounded by 2k/m
+    dt = estimate_stable_dt(np.array([0.0, 1.0]), np.array([[0, 1]]), np.array([100.0]), 
+                            np.array([0.0]), np.array([1.0]), np.array([False, True]))
+    assert np.isclose(dt, 2.0 / np.sqrt(200.0)), f"Expected stable step 2/sqrt(2k/m), got {dt}."
+    damped_dt = estimate_stable_dt(np.array([0.0, 1.0]), np.array([[0, 1]]), np.array([100.0]), 
+                                   np.array([5.0]), np.array([1.0]), np.array([False, True]))
+    assert damped_dt < dt, "Expected damping to reduce the stable step."
+    
+    for mode in ["PBD", "XPBD", "EULER"]:
+        assert not is_stable(create_lattice(6, 2000., 30.0, mode)), f"Expected the stiff {mode} lattice to explode at 24 fps."
+        controller = SubstepController()
+        system = create_lattice(6, 2000., 30.0, mode, controller)
+        assert is_stable(system), f"Expected the controller to keep the stiff {mode} lattice stable."
+        assert controller.last_substeps > 1, "Expected the stiff lattice to take substeps."
+    
+    # Soft systems don't waste substeps
+    controller = SubstepController()
+    system = create_lattice(6, 20., 1.0, "PBD", controller)
+    assert is_stable(system) and controller.last_substeps == 1, f"Expected a single substep, got {controller.last_substeps}."
+    
+    # Energy monitor catches a too optimistic estimate
+    controller = SubstepController(safety=8.0, energy_tolerance=0.5, max_substeps=128)
+    system = create_lattice(6, 2000., 30.0, "PBD", controller)
+    assert is_stable(system), "Expected the energy monitor to keep the lattice stable."
+    assert controller.refinement > 1, "Expected the energy monitor to refine the substeps."
+    
+    print(">> Tests ran successfully.")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 14:11:08 2026
+
+Check the baked helper animations: the bake matches simulating the rig frame
+by frame, it leaves the handler unchanged, skinning the baked transformations
+gives the posed mesh, and the cache is hit for the same inputs and missed
+when the parameters, the collisions or the animation change.
+
+@author: bartu
+"""
+import os
+import time
+import tempfile
+import numpy as np
+
+import __init__
+from src import skinning
+from src.bake import BakedHelperAnimation, get_bake_key
+from src.kinematics import inverse_kinematics
+from src.skeleton import Skeleton, add_helper_bones
+from src.helper_handler import HelperBonesHandler
+from src.simulation.colliders import SDFCollider
+from src.simulation.stability import SubstepController
+
+def create_rig():
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    arm = skeleton.insert_bone([1., 0., 1.], 0)
+    forearm = skeleton.insert_bone([2., 0., 1.], arm)
+    helper_idxs = add_helper_bones(skeleton, [[1.5, 0.5, 1.], [2.5, 0.5, 1.]], [arm, forearm],
+                                   startpoints=[[1., 0., 1.], [2., 0., 1.]])
+    return skeleton, helper_idxs
+
+def create_animation(skeleton, n_frames):
+    thetas = np.zeros((n_frames, len(skeleton.rest_bones), 3))
+    thetas[:, 1, 2] = 0.5 * np.sin(np.arange(n_frames) / 4)
+    thetas[:, 2, 1] = 0.3 * np.sin(np.arange(n_frames) / 3)
+    return thetas
+
+if __name__ == "__main__":
+    print(">> Testing baked helper animations...")
+    rng = np.random.default_rng(2)
+    skeleton, helper_idxs = create_rig()
+    thetas = create_animation(skeleton, 48)
+    V_rest = rng.random((200, 3)) * [3., 1., 2.]
+    W = rng.random((200, len(skeleton.rest_bones) - 1))
+
+    # Bake matches the frame by frame simulation, and the handler is unchanged
+    handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, stiffness=50.)
+    handler.update_bones(skeleton.pose_bones(thetas[0])) # Start from a simulated state
+    state = handler.snapshot()
+    baked = BakedHelperAnimation.bake(handler, thetas, algorithm="RST")
+    assert np.array_equal(handler.snapshot(), state), "Expected baking to restore the handler state."
+
+    rest_locations = np.array(skeleton.get_rest_bone_locations(exclude_root=False))
+    for frame, theta in enumerate(thetas):
+        locations, abs_rot_quat, abs_trans = skeleton.pose_bones(theta, get_transforms=True)
+        locations = handler.update_bones(locations)
+        assert np.allclose(baked.get_bone_locations(frame, exclude_root=False), locations), "Expected baked locations to match the simulation."
+
+        M = skinning.get_transform_mats_from_quat_rots(abs_trans, abs_rot_quat)
+        M[helper_idxs] = inverse_kinematics.get_absolute_transformations(rest_locations, locations, return_mat=True)[helper_idxs]
+        V = skinning.LBS_from_mat(V_rest, W, M[1:])
+        assert np.allclose(baked.deform(frame, V_rest, W), V), "Expected skinning the baked transforms to match the posed mesh."
+
+    # Cache is hit for the same inputs, and missed for changed inputs
+    with tempfile.TemporaryDirectory() as cache_dir:
+        handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, stiffness=50.)
+        start = time.time()
+        baked = BakedHelperAnimation.bake(handler, thetas, cache_dir=cache_dir, verbose=False)
+        bake_time = time.time() - start
+        assert os.listdir(cache_dir) == [f"bake_{baked.key}.npz"], "Expected the bake to be saved under its key."
+
+        start = time.time()
+        cached = BakedHelperAnimation.bake(handler, thetas, cache_dir=cache_dir, verbose=False)
+        cache_time = time.time() - start
+        assert cached.key == baked.key and np.array_equal(cached.transforms, baked.transforms), "Expected the cached bake."
+        assert len(os.listdir(cache_dir)) == 1, "Expected a cache hit for the same inputs."
+
+        keys = {baked.key, get_bake_key(handler, thetas[:-1]), get_bake_key(handler, thetas, algorithm="T")}
+        handler.set_parameters(stiffness=[50., 80.])
+        keys.add(get_bake_key(handler, thetas))
+        assert len(keys) == 4, "Expected changed animations, algorithms and parameters to change the key."
+
+        # Collisions and the substep controller change the key, and baking doesn't change it
+        hand_skeleton, hand_helper_idxs = create_rig()
+        hand_skeleton.insert_bone([2.5, 0., 1.], 2) # Bone colliders are the bones without helpers
+        hand_thetas = create_animation(hand_skeleton, 24)
+        variants = [dict(), dict(self_collision=True), dict(bone_colliders=0.1), dict(bone_colliders=0.2),
+                    dict(substep_controller=SubstepController()), dict(substep_controller=SubstepController(safety=0.5)),
+                    dict(backend="NUMBA")]
+        variant_keys = set()
+        for kwargs in variants:
+            variant = HelperBonesHandler(hand_skeleton, hand_helper_idxs, point_spring=False, stiffness=50., **kwargs)
+            key = get_bake_key(variant, hand_thetas)
+            assert key not in variant_keys, f"Expected {kwargs} to change the key."
+            variant_keys.add(key)
+            BakedHelperAnimation.bake(variant, hand_thetas, verbose=False)
+            assert get_bake_key(variant, hand_thetas) == key, f"Expected the bake to keep the key with {kwargs}."
+        variant.simulator.radii[:] = 0.3
+        variant_keys.add(get_bake_key(variant, hand_thetas))
+        variant.simulator.add_collider(SDFCollider(np.ones((2, 2, 2)), np.zeros(3), 1.0))
+        variant_keys.add(get_bake_key(variant, hand_thetas))
+        assert len(variant_keys) == len(variants) + 2, "Expected the radii and colliders to change the key."
+
+        start = time.time()
+        for frame in range(cached.n_frames): cached.deform(frame, V_rest, W)
+        print(f">> Baked {baked.n_frames} frames in {bake_time:.3f} seconds, loaded in {cache_time:.3f} seconds, "
+              f"played back in {time.time() - start:.3f} seconds.")
+
+    print(">> Tests ran successfully.")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:37:02 2026
+
+Check the capsule colliders of the rigid bones: the refit hierarchy finds
+the same contacts as testing all capsules, particles falling on a capsule
+rest on its surface, and a posed bone pushes the helper tip away.
+
+@author: bartu
+"""
+import time
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.skeleton import Skeleton, add_helper_bones
+from src.helper_handler import HelperBonesHandler
+from src.simulation.colliders import CapsuleColliders, closest_points_on_segments
+
+def brute_force_contacts(P, point_radii, colliders):
+    n, m = len(P), colliders.n_capsules
+    i, c = np.repeat(np.arange(n), m), np.tile(np.arange(m), n)
+    closest = closest_points_on_segments(P[i], colliders.starts[c], colliders.ends[c])
+    overlap = np.linalg.norm(P[i] - closest, axis=-1) < point_radii[i] + colliders.radii[c]
+    return np.stack([i[overlap], c[overlap]], axis=-1)
+
+def sorted_pairs(pairs):
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+if __name__ == "__main__":
+    print(">> Testing bone colliders...")
+    rng = np.random.default_rng(5)
+
+    # Hierarchy finds all the overlapping capsules, before and after a refit
+    starts = rng.random((200, 3))
+    colliders = CapsuleColliders(starts, starts + rng.normal(0, 0.05, (200, 3)), rng.uniform(0.01, 0.03, 200))
+    P = rng.random((2000, 3))
+    point_radii = np.full(2000, 0.01)
+    for _ in range(2):
+        contacts = sorted_pairs(colliders.find_contacts(P, point_radii))
+        expected = brute_force_contacts(P, point_radii, colliders)
+        assert len(contacts) > 0 and np.array_equal(contacts, expected), "Expected hierarchy to find the same contacts as all capsules."
+        colliders.update(colliders.starts + 0.1, colliders.ends + rng.normal(0, 0.02, (200, 3)))
+    assert colliders.bvh.depth <= 9, f"Expected a balanced hierarchy, got depth {colliders.bvh.depth}."
+
+    # Falling particles rest on a capsule in PBD and XPBD
+    for mode in ["PBD", "XPBD"]:
+        system = MassSpringSystem(1./24, mode=mode, substeps=4)
+        system.add_masses([[0., 1., 0.], [0.3, 0.8, 0.]], mass=1.0, gravity=[0., -9.81, 0.], radius=0.05, verbose=False)
+        system.fix_mass(system.add_mass([2., 0., 0.], verbose=False), verbose=False) # Fixed particles don't move
+        capsule = system.add_collider(CapsuleColliders([[-1., 0., 0.]], [[1., 0., 0.]], 0.2))
+        for _ in range(96):
+            system.simulate()
+        heights = system.positions[:2, 1]
+        assert np.all(np.abs(heights - 0.25) < 1e-2), f"Expected {mode} particles to rest on the capsule, got heights {heights}."
+        assert np.all(system.positions[2] == [2., 0., 0.]), "Expected fixed particle to stay in place."
+
+    # A posed bone sweeps through the helper tip and pushes it away
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    arm = skeleton.insert_bone([1., 0., 1.], 0)
+    sweeping = skeleton.insert_bone([0., 1., 1.], 0)
+    helper_idxs = add_helper_bones(skeleton, [[1., 0., 1.]], [arm])
+    handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=True, stiffness=50., bone_colliders=0.1)
+    assert np.array_equal(handler.collider_idxs, [sweeping]), f"Expected only the sweeping bone to be a capsule, got {handler.collider_idxs}."
+
+    for frame in range(24):
+        theta = np.zeros((len(skeleton.rest_bones), 3))
+        theta[sweeping] = [0., 0., -0.5 * np.pi * min(frame / 16, 1.0)]
+        rigid_locations = skeleton.pose_bones(theta)
+        simulated_locations = handler.update_bones(rigid_locations)
+
+    tip = simulated_locations[2 * helper_idxs[0] + 1]
+    bone_start, bone_end = rigid_locations[2 * sweeping], rigid_locations[2 * sweeping + 1]
+    assert np.allclose(bone_end, [1., 0., 1.]), "Expected the bone to end at the helper tip."
+    distance = np.linalg.norm(tip - closest_points_on_segments(tip[None], bone_start[None], bone_end[None])[0])
+    assert distance > 0.15 - 1e-2, f"Expected helper tip to be pushed out of the capsule, got distance {distance}."
+
+    # Timing of many particles against a skeleton sized set of capsules
+    system = MassSpringSystem(1./24)
+    system.add_masses(rng.random((20000, 3)), mass=1.0, radius=0.01, verbose=False)
+    system.add_collider(CapsuleColliders(starts[:50], starts[:50] + 0.1, 0.03))
+    start = time.time()
+    system.simulate()
+    print(f">> Resolved {len(system.colliders[0].contacts)} capsule contacts of {system.n_masses} particles in {time.time() - start:.3f} seconds.")
+
+    print(">> Tests ran successfully.")
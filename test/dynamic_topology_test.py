@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:21:45 2026
+
+Check particle and spring removal: handles stay valid, the edge coloring
+stays valid after incremental updates, and the edited system simulates the
+same as a system that's built from scratch with the final topology. Also
+check bone removal in the skeleton.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.skeleton import Skeleton
+
+def create_grid(n, edge_constraint=False):
+    system = MassSpringSystem(1./24, edge_constraint=edge_constraint)
+    for i in range(n):
+        for j in range(n):
+            system.add_mass([i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n: system.connect_masses(i*n + j, (i+1)*n + j, stiffness=50., damping=1.0, verbose=False)
+            if j + 1 < n: system.connect_masses(i*n + j, i*n + j + 1, stiffness=50., damping=1.0, verbose=False)
+    system.fix_mass(0, verbose=False)
+    system.fix_mass((n-1)*n, verbose=False)
+    return system
+
+def check_coloring(system):
+    static = ~system.free_mask
+    for group in system.get_edge_colors():
+        vertices = system.edges[group].ravel()
+        vertices = vertices[~static[vertices]]
+        assert len(np.unique(vertices)) == len(vertices), "Expected edges of a color to not share movable particles."
+    n_colored = sum(len(group) for group in system.get_edge_colors())
+    assert n_colored == system.n_springs, f"Expected every spring to have a color, got {n_colored} of {system.n_springs}."
+
+if __name__ == "__main__":
+    print(">> Testing dynamic topology...")
+    n = 6
+    system = create_grid(n, edge_constraint=True)
+    system.get_edge_colors() # Edits below update the coloring in place
+
+    corner = system.masses[n*n - 1]
+    tracked_spring = system.springs[system.n_springs - 1]
+    corner_location = corner.center.copy()
+    tracked_edge = system.edges[tracked_spring.idx].copy()
+
+    # Tear a few springs, remove a particle and add a new spring
+    n_removed = system.disconnect_masses(system.masses[7], system.masses[8])
+    assert n_removed == 1, f"Expected a single spring between the masses, got {n_removed}."
+    system.remove_spring(0)
+    system.remove_mass(14)
+    system.connect_masses(20, 3, stiffness=50., damping=1.0, verbose=False)
+
+    assert system.n_masses == n*n - 1, f"Expected {n*n - 1} masses, got {system.n_masses}."
+    assert np.all(corner.center == corner_location), "Expected particle handle to follow the moved particle."
+    assert corner.idx == 14, f"Expected the last particle to be moved to the freed row, got {corner.idx}."
+    m1, m2 = tracked_spring.m1.id, tracked_spring.m2.id
+    assert (m1, m2) == tuple(tracked_edge[::-1]) or (m1, m2) == tuple(tracked_edge), "Expected spring handle to keep its particles."
+    assert not np.any(system.edges == system.n_masses), "Expected springs to point to the moved particle."
+    check_coloring(system)
+
+    # Repeated removals only relabel the moved particle and keep the free and fixed sets
+    edited = create_grid(n)
+    edited.fix_masses([0, 5, 30], verbose=False)
+    rng = np.random.default_rng(4)
+    for _ in range(12):
+        edited.remove_mass(int(rng.integers(edited.n_masses)))
+        edited.connect_masses(0, int(rng.integers(1, edited.n_masses)), verbose=False)
+        assert np.array_equal(np.sort(edited.free_indices), np.flatnonzero(edited.free_mask)), "Expected free indices to match the mask."
+        assert np.array_equal(np.sort(edited.fixed_indices), np.flatnonzero(~edited.free_mask)), "Expected fixed indices to match the mask."
+        for mass_idx, springs in enumerate(edited._get_incidence()):
+            assert springs == set(np.flatnonzero(np.any(edited.edges == mass_idx, axis=1))), "Expected incidence to match the edges."
+
+    # Same simulation as a system that's built from the edited arrays
+    system.edge_constraint = False
+    rebuilt = MassSpringSystem(1./24, edge_constraint=False)
+    rebuilt.add_masses(system.positions, mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    rebuilt.connect_many(system.edges, stiffness=50., damping=1.0, verbose=False)
+    rebuilt.fix_masses(system.fixed_indices, verbose=False)
+    for _ in range(48):
+        system.simulate()
+        rebuilt.simulate()
+    diff = np.abs(system.positions - rebuilt.positions).max()
+    assert diff < 1e-10, f"Expected edited and rebuilt systems to match, got difference {diff}."
+
+    # Removing a bone keeps the other bone indices and reattaches the children
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    b1 = skeleton.insert_bone([0., 1., 1.], 0)
+    b2 = skeleton.insert_bone([0., 2., 1.], b1)
+    b3 = skeleton.insert_bone([0., 3., 1.], b2)
+    b4 = skeleton.insert_bone([1., 1., 1.], b1)
+    moved_idx = skeleton.remove_bone(b2)
+    assert moved_idx == b4, f"Expected the last bone to be moved, got {moved_idx}."
+    assert all(bone.idx == i for i, bone in enumerate(skeleton.rest_bones)), "Expected bone indices to match their places."
+    assert skeleton.rest_bones[b3].parent is skeleton.rest_bones[b1], "Expected the child to be attached to its grandparent."
+    assert [b1, b3] in skeleton.kintree and [b1, b2] in skeleton.kintree, "Expected kintree to be updated."
+    skeleton.pose_bones(np.zeros((4, 3)), degrees=False)
+
+    print(">> Tests ran successfully.")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:21:09 2026
+
+Check the colored edge constraint projection against a sequential per-edge 
+projection in the same order, and check that the Jacobi projection reduces 
+the constraint error and matches Gauss-Seidel with compliance.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+
+def _sequential_projection(P, edges, rest_lengths, inv_masses, alpha_tilde, order):
+    for spring_idx in order:
+        idx1, idx2 = edges[spring_idx]
+        w1, w2 = inv_masses[idx1], inv_masses[idx2]
+        spring_vec = P[idx1] - P[idx2]
+        spring_len = np.linalg.norm(spring_vec)
+        if spring_len < 1e-20 or w1 + w2 + alpha_tilde == 0.0:
+            continue
+        C = spring_len - rest_lengths[spring_idx]
+        lmbd = - C / (w1 + w2 + alpha_tilde)
+        P[idx1] += lmbd * w1 * spring_vec / spring_len
+        P[idx2] -= lmbd * w2 * spring_vec / spring_len
+    return P
+
+def _constraint_error(P, system):
+    lengths = np.linalg.norm(P[system.edges[:,0]] - P[system.edges[:,1]], axis=-1)
+    return np.abs(lengths - system.rest_lengths).max()
+
+def _random_system(n_masses, n_springs, constraint_solver):
+    system = MassSpringSystem(1./24, edge_constraint=True, constraint_solver=constraint_solver)
+    for i in range(n_masses):
+        system.add_mass(np.random.rand(3), mass=np.random.rand() + 0.5, verbose=False)
+    for _ in range(n_springs):
+        m1, m2 = np.random.choice(n_masses, 2, replace=False)
+        system.connect_masses(int(m1), int(m2), verbose=False)
+    for i in range(3): system.fix_mass(i, verbose=False)
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing edge constraint projections...")
+    np.random.seed(0)
+    
+    for alpha in [0.0, 0.001]:
+        system = _random_system(60, 150, "GAUSS-SEIDEL")
+        colors = system.get_edge_colors()
+        
+        # Sanity check the coloring
+        assert sum(len(c) for c in colors) == system.n_springs
+        for group in colors:
+            movable = system.edges[group][system.inv_masses[system.edges[group]] > 0]
+            assert len(np.unique(movable)) == len(movable), "Expected colors to have independent edges."
+        
+        P = system.positions + np.random.randn(system.n_masses, 3) * 0.05
+        P_ref = _sequential_projection(P.copy(), system.edges, system.rest_lengths, system.inv_masses,
+                                       alpha * 24 * 24, np.concatenate(colors))
+        P_colored = system.satisfy_edge_constraints(P.copy(), alpha)
+        diff = np.abs(P_ref - P_colored).max()
+        assert diff < 1e-12, f"Expected colored projection to match sequential projection, got difference {diff}."
+    
+    # Jacobi iterations should converge to the rest lengths as well
+    system = _random_system(60, 80, "JACOBI")
+    P = system.positions + np.random.randn(system.n_masses, 3) * 0.05
+    initial_err = _constraint_error(P, system)
+    for _ in range(300): P = system.satisfy_edge_constraints(P, 0.0)
+    final_err = _constraint_error(P, system)
+    assert final_err < initial_err * 0.1, f"Expected Jacobi projection to reduce constraint error, got {initial_err} -> {final_err}."
+    
+    # With compliance, the multipliers of a shared particle follow its averaged
+    # corrections, so Jacobi converges to the Gauss-Seidel solution. The 
+    # particle is on a line with its fixed neighbors, so the gradients are constant.
+    for alpha in [1e-4, 1e-3, 1e-2]:
+        solutions = []
+        for constraint_solver in ["JACOBI", "GAUSS-SEIDEL"]:
+            system = MassSpringSystem(1./24, edge_constraint=True, constraint_solver=constraint_solver)
+            system.add_masses([[0., 0., 0.], [2., 0., 0.], [3., 0., 0.], [-1., 0., 0.], [2.5, 0., 0.]], mass=1.0, verbose=False)
+            system.connect_many([[0, 1], [0, 2], [0, 3], [0, 4]], verbose=False)
+            system.fix_masses([1, 2, 3, 4], verbose=False)
+            system.rest_lengths[:] = 0.5
+            P, lambdas = system.positions.copy(), np.zeros(system.n_springs)
+            for _ in range(500): P = system.satisfy_edge_constraints(P, alpha, lambdas=lambdas)
+            solutions.append(P[0])
+        diff = np.abs(solutions[0] - solutions[1]).max()
+        assert diff < 1e-10, f"Expected compliant Jacobi projection to match Gauss-Seidel, got difference {diff}."
+    
+    print(">> Tests ran successfully.")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:41:08 2026
+
+Check that every copy of an ensemble simulation matches an independent
+simulation with the same parameters, both for a mass-spring lattice and
+for a helper bone rig.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.ensemble import EnsembleMassSpringSystem
+from src.helper_handler import HelperBonesHandler, EnsembleHelperBonesHandler
+from src.skeleton import Skeleton, add_helper_bones
+
+STIFFNESSES = np.array([20., 50., 100.])
+DAMPINGS = np.array([0.5, 1.0, 5.0])
+
+def create_grid(n, mode, stiffness=50., damping=1.0, edge_constraint=False):
+    system = MassSpringSystem(1./24, mode=mode, edge_constraint=edge_constraint)
+    for i in range(n):
+        for j in range(n):
+            system.add_mass([i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n: system.connect_masses(i*n + j, (i+1)*n + j, stiffness=stiffness, damping=damping, verbose=False)
+            if j + 1 < n: system.connect_masses(i*n + j, i*n + j + 1, stiffness=stiffness, damping=damping, verbose=False)
+    system.fix_mass(0, verbose=False)
+    system.fix_mass((n-1)*n, verbose=False)
+    return system
+
+def create_rig():
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    b1 = skeleton.insert_bone([0., 1., 1.], 0)
+    b2 = skeleton.insert_bone([0., 2., 1.5], b1)
+    helper_ends = np.array([[0.3, 1.2, 1.0], [0.5, 1.4, 1.0]])
+    helper_idxs = add_helper_bones(skeleton, helper_ends, [b1, b2])
+    helper_idxs += add_helper_bones(skeleton, helper_ends + 0.3, helper_idxs)
+    return skeleton, helper_idxs
+
+def animate(skeleton, handler, n_steps=40):
+    n_bones = len(skeleton.rest_bones)
+    locations = []
+    for step in range(n_steps):
+        theta = np.zeros((n_bones, 3))
+        theta[1] = [0.3*np.sin(step/5.), 0.2, 0.0]
+        t = np.zeros((n_bones, 3))
+        t[0] = [0.1*np.sin(step/3.), 0.0, 0.0]
+        rigid_locations = skeleton.pose_bones(theta, t, degrees=False)
+        locations.append(handler.update_bones(rigid_locations))
+    return np.array(locations)
+
+if __name__ == "__main__":
+    print(">> Testing ensemble simulation...")
+    N_STEPS = 48
+
+    for mode, edge_constraint in [("PBD", False), ("PBD", True), ("XPBD", True), ("IMPLICIT", False)]:
+        ensemble = EnsembleMassSpringSystem(create_grid(5, mode, edge_constraint=edge_constraint),
+                                            len(STIFFNESSES), stiffness=STIFFNESSES, damping=DAMPINGS)
+        singles = [create_grid(5, mode, k, kd, edge_constraint) for k, kd in zip(STIFFNESSES, DAMPINGS)]
+        for _ in range(N_STEPS):
+            ensemble.simulate(alpha=0.001)
+            for system in singles: system.simulate(alpha=0.001)
+
+        for i, system in enumerate(singles):
+            diff = np.abs(ensemble.positions[i] - system.positions).max()
+            assert diff < 1e-8, f"Expected ensemble copy {i} to match its {mode} simulation, got difference {diff}."
+
+    # Helper rig variants follow the same animation with their own parameters
+    skeleton, helper_idxs = create_rig()
+    rig_ensemble = EnsembleHelperBonesHandler(skeleton, helper_idxs, len(STIFFNESSES),
+                                              stiffness=STIFFNESSES, damping=DAMPINGS,
+                                              fixed_scale=True, compliance=0.01, mass_dscale=0.8)
+    ensemble_locations = animate(skeleton, rig_ensemble)
+    for i, (k, kd) in enumerate(zip(STIFFNESSES, DAMPINGS)):
+        skeleton, helper_idxs = create_rig()
+        rig = HelperBonesHandler(skeleton, helper_idxs, stiffness=k, damping=kd,
+                                 fixed_scale=True, compliance=0.01, mass_dscale=0.8)
+        diff = np.abs(ensemble_locations[:, i] - animate(skeleton, rig)).max()
+        assert diff < 1e-8, f"Expected helper rig variant {i} to match its own simulation, got difference {diff}."
+
+    print(">> Tests ran successfully.")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:18:45 2026
+
+Check the per-helper physical parameters: the parameters changed in place
+with set_parameters() give the same frames as a rig built with them, also
+for the cached solvers of PD and implicit Euler, and the ensemble variants
+with a parameter per helper match the single rigs.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.skeleton import Skeleton, add_helper_bones
+from src.helper_handler import HelperBonesHandler, EnsembleHelperBonesHandler
+
+def create_rig():
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    arm = skeleton.insert_bone([1., 0., 1.], 0)
+    forearm = skeleton.insert_bone([2., 0., 1.], arm)
+    helper_idxs = add_helper_bones(skeleton, [[1.5, 0.5, 1.], [2.5, 0.5, 1.], [2.5, -0.5, 1.]], [arm, forearm, forearm],
+                                   startpoints=[[1., 0., 1.], [2., 0., 1.], [2., 0., 1.]])
+    return skeleton, helper_idxs
+
+def animate(skeleton, handler, frames):
+    locations = []
+    for frame in frames:
+        theta = np.zeros((len(skeleton.rest_bones), 3))
+        theta[1] = [0., 0.4 * np.sin(frame / 4), 0.]
+        locations.append(handler.update_bones(skeleton.pose_bones(theta)))
+    return np.array(locations)
+
+if __name__ == "__main__":
+    print(">> Testing helper parameters...")
+    skeleton, helper_idxs = create_rig()
+    params = dict(mass=[1.0, 2.0, 0.5], stiffness=[20., 80., 40.], damping=[0.5, 1.0, 2.0])
+    new_params = dict(mass=[0.5, 1.0, 3.0], stiffness=[60., 30., 90.], damping=[1.0, 0.2, 0.5], mass_dscale=0.9)
+
+    # Parameters per helper are set in the order of helper_idxs
+    handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, **params)
+    stored = handler.get_parameters()
+    for name, values in params.items():
+        assert np.allclose(stored[name], values), f"Expected {name} {values}, got {stored[name]}."
+
+    # Updating the parameters in place matches a rig that's built with them
+    for mode in ["PBD", "XPBD", "PD", "IMPLICIT"]:
+        handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, simulation_mode=mode, **params)
+        animate(skeleton, handler, range(10))
+        state = handler.snapshot()
+        handler.set_parameters(**new_params)
+        locations = animate(skeleton, handler, range(10, 30))
+
+        rebuilt = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, simulation_mode=mode, **new_params)
+        rebuilt.restore(state)
+        expected = animate(skeleton, rebuilt, range(10, 30))
+        diff = np.abs(locations - expected).max()
+        assert diff < 1e-10, f"Expected {mode} parameters to be updated in place, got difference {diff}."
+
+    # Ensemble variants with parameters per helper match the single rigs
+    stiffnesses = np.array([params["stiffness"], new_params["stiffness"]])
+    ensemble_handler = EnsembleHelperBonesHandler(skeleton, helper_idxs, 2, point_spring=False, mass=params["mass"][0])
+    ensemble_handler.set_parameters(stiffness=stiffnesses, damping=[0.5, 1.0])
+    assert np.allclose(ensemble_handler.get_parameters()["stiffness"], stiffnesses), "Expected stiffnesses per variant and helper."
+    locations = animate(skeleton, ensemble_handler, range(20))
+    for k in range(2):
+        handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, mass=params["mass"][0],
+                                     stiffness=stiffnesses[k], damping=[0.5, 1.0][k])
+        diff = np.abs(locations[:, k] - animate(skeleton, handler, range(20))).max()
+        assert diff < 1e-10, f"Expected variant {k} to match the single rig, got difference {diff}."
+
+    print(">> Tests ran successfully.")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:20:31 2026
+
+Check the compiled helper rig: the vectorized update_bones() gives the same
+locations as updating the helpers one by one, the fixed masses of rigs
+without point springs follow the helper starts, chains of helpers are
+updated level by level in tree order, and a frame of a rig with many helpers
+is quick.
+
+@author: bartu
+"""
+import time
+import numpy as np
+
+import __init__
+from src.skeleton import Skeleton, add_helper_bones
+from src.helper_handler import HelperBonesHandler, EnsembleHelperBonesHandler
+
+def create_rig(n_chains, chain_length):
+    # Helper chains hanging from a row of rigid bones
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    parent = 0
+    helper_idxs = []
+    for c in range(n_chains):
+        parent = skeleton.insert_bone([c + 1., 0., 1.], parent)
+        chain_parent = parent
+        for k in range(chain_length):
+            endpoint = [c + 1.2 + 0.2 * k, 0.3 + 0.3 * k, 1.]
+            chain_parent = add_helper_bones(skeleton, [endpoint], [chain_parent])[0]
+            helper_idxs.append(chain_parent)
+    return skeleton, helper_idxs
+
+def reference_update(handler, rigidly_posed_locations):
+    # Helper by helper update, as in the original implementation
+    simulator = handler.simulator
+    simulated_locations = rigidly_posed_locations.copy()
+    if handler.prev_sim_locations is None: handler.prev_sim_locations = rigidly_posed_locations
+
+    helper_end_idxs = 2 * handler.helper_idxs + 1
+    translate_vec = (rigidly_posed_locations - handler.prev_sim_locations)[helper_end_idxs]
+    simulator.set_kinematic_positions(handler.fixed_idxs, simulator.positions[handler.fixed_idxs] + translate_vec)
+    simulator.simulate(alpha=handler.compliance)
+    simulated_locations[helper_end_idxs] = simulator.positions[handler.free_idxs]
+
+    for i, helper_idx in enumerate(handler.helper_idxs):
+        bone = handler.skeleton.rest_bones[helper_idx]
+        end_idx = 2 * helper_idx + 1
+        if handler.FIXED_SCALE:
+            _, new_endpoint = simulator.kernels.preserve_bone_length(simulator.positions, simulated_locations[2 * helper_idx],
+                                                                     handler.free_idxs[i], handler.helper_lengths[i])
+            simulated_locations[end_idx] = new_endpoint
+        for child in bone.children:
+            child_bone_start = simulated_locations[end_idx] - child.t
+            translation_amount = child_bone_start - simulated_locations[2 * child.idx]
+            simulated_locations[2 * child.idx] = child_bone_start
+            simulated_locations[2 * child.idx + 1] += translation_amount
+
+    handler.prev_sim_locations = simulated_locations
+    return simulated_locations
+
+def pose(skeleton, frame):
+    theta = np.zeros((len(skeleton.rest_bones), 3))
+    theta[1] = [0.3 * np.sin(frame / 5), 0.2, 0.]
+    return skeleton.pose_bones(theta)
+
+def swing(skeleton, frame):
+    # Pose that also rotates the root, so that the helper starts move
+    theta = np.zeros((len(skeleton.rest_bones), 3))
+    theta[0] = [0., 0., 0.4 * np.sin(frame / 6)]
+    theta[1] = [0.3 * np.sin(frame / 5), 0.2, 0.]
+    return skeleton.pose_bones(theta)
+
+if __name__ == "__main__":
+    print(">> Testing compiled helper rig...")
+
+    # The original update anchors the fixed masses at the helper tips, i.e.
+    # where they're placed with point springs
+    for fixed_scale in [False, True]:
+        skeleton, helper_idxs = create_rig(n_chains=3, chain_length=1)
+        handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=True, fixed_scale=fixed_scale, stiffness=50.)
+        reference = HelperBonesHandler(skeleton, helper_idxs, point_spring=True, fixed_scale=fixed_scale, stiffness=50.)
+        assert len(handler._levels) == 1, f"Expected a single level without chains, got {len(handler._levels)}."
+
+        for frame in range(40):
+            rigid_locations = pose(skeleton, frame)
+            diff = np.abs(handler.update_bones(rigid_locations) - reference_update(reference, rigid_locations)).max()
+            assert diff < 1e-12, f"Expected the compiled rig to match the helper by helper update, got difference {diff}."
+
+    # Without point springs the fixed masses are at the helper starts, and they
+    # follow the starts instead of the tips of the original update
+    expected_tips = {False : [[0.5171530045, 0.1960001277, 1.], [1.3343344053, -1.0599241715, 1.], 
+                              [3.3468950223, -1.4822463714, 1.]],
+                     True : [[1.2509405356, 0.0438803342, 0.9023012009], [2.0287657921, 0.0009118707, 0.7592170943], 
+                             [2.9853469741, -0.2244708756, 0.6594486625]]}
+    for fixed_scale in [False, True]:
+        skeleton, helper_idxs = create_rig(n_chains=3, chain_length=1)
+        handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, fixed_scale=fixed_scale, stiffness=50.)
+        for frame in range(60):
+            locations = handler.update_bones(swing(skeleton, frame))
+        diff = np.abs(locations[2 * np.array(helper_idxs) + 1] - expected_tips[fixed_scale]).max()
+        assert diff < 1e-8, f"Expected the helper tips of the start anchored rig, got difference {diff}."
+    
+    # Chains are updated in tree order, whatever the order of helper_idxs
+    skeleton, helper_idxs = create_rig(n_chains=3, chain_length=3)
+    handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, fixed_scale=True, stiffness=50.)
+    reversed_handler = HelperBonesHandler(skeleton, helper_idxs[::-1], point_spring=False, fixed_scale=True, stiffness=50.)
+    ensemble_handler = EnsembleHelperBonesHandler(skeleton, helper_idxs, 2, point_spring=False, fixed_scale=True, stiffness=50.)
+    assert len(handler._levels) == 3, f"Expected a level per chain link, got {len(handler._levels)}."
+    for frame in range(40):
+        rigid_locations = pose(skeleton, frame)
+        locations = handler.update_bones(rigid_locations)
+        diff = np.abs(locations - reversed_handler.update_bones(rigid_locations)).max()
+        assert diff < 1e-12, f"Expected the helper order to not change the result, got difference {diff}."
+        diff = np.abs(locations[None] - ensemble_handler.update_bones(rigid_locations)).max()
+        assert diff < 1e-12, f"Expected the ensemble copies to match the single rig, got difference {diff}."
+        for helper_idx in helper_idxs:
+            bone = skeleton.rest_bones[helper_idx]
+            expected_start = locations[2 * bone.parent.idx + 1] - bone.t
+            assert np.allclose(locations[2 * helper_idx], expected_start), "Expected chained helpers to start at the simulated parent tip."
+        # Fixed masses keep their offset to the helper starts, that's from the rest pose to the first frame
+        anchor_offsets = handler.simulator.positions[handler.fixed_idxs] - locations[2 * handler.helper_idxs]
+        if frame == 0: first_offsets = anchor_offsets
+        assert np.allclose(anchor_offsets, first_offsets), "Expected the fixed masses to follow the helper starts on every level."
+
+    # Timing of a rig with many helpers
+    skeleton, helper_idxs = create_rig(n_chains=34, chain_length=1)
+    handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, fixed_scale=True, stiffness=50.)
+    reference = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, fixed_scale=True, stiffness=50.)
+    locations = [pose(skeleton, frame) for frame in range(100)]
+    start = time.time()
+    for rigid_locations in locations: handler.update_bones(rigid_locations)
+    compiled_time = time.time() - start
+    start = time.time()
+    for rigid_locations in locations: reference_update(reference, rigid_locations)
+    print(f">> Updated {len(helper_idxs)} helpers for 100 frames in {compiled_time:.3f} seconds, helper by helper in {time.time() - start:.3f} seconds.")
+
+    print(">> Tests ran successfully.")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:58:14 2026
+
+Compare the implicit Euler integrator at a large time step with a small step
+reference, for stiff springs where explicit integrators explode.
+
+@author: bartu
+"""
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.implicit import preconditioned_cg
+
+def create_grid(n, mode, dt, stiffness=3000., damping=30.):
+    system = MassSpringSystem(dt, mode=mode)
+    for i in range(n):
+        for j in range(n):
+            system.add_mass([i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, verbose=False)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n: system.connect_masses(i*n + j, (i+1)*n + j, stiffness=stiffness, damping=damping, verbose=False)
+            if j + 1 < n: system.connect_masses(i*n + j, i*n + j + 1, stiffness=stiffness, damping=damping, verbose=False)
+    system.fix_mass(0, verbose=False)
+    system.fix_mass((n-1)*n, verbose=False)
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing implicit integration...")
+    np.random.seed(0)
+    
+    # Preconditioned CG on a random SPD system
+    B = sparse.random(60, 60, density=0.1, random_state=0)
+    A = (B @ B.T + sparse.eye(60)).tocsr()
+    b = np.random.rand(60)
+    x, _, residual = preconditioned_cg(A, b, tol=1e-12, maxiter=500)
+    assert np.abs(x - spsolve(A.tocsc(), b)).max() < 1e-8, "Expected CG to match the direct solver."
+    
+    # One step per frame vs. a small step reference
+    DURATION = 2.0
+    large_dt, small_dt = 1./24, 1./2400
+    implicit = create_grid(6, "IMPLICIT", large_dt)
+    reference = create_grid(6, "PBD", small_dt)
+    for _ in range(int(DURATION / large_dt)): implicit.simulate()
+    for _ in range(int(DURATION / small_dt)): reference.simulate()
+    
+    diff = np.abs(implicit.positions - reference.positions).max()
+    assert diff < 1e-2, f"Expected implicit integration to settle at the reference, got difference {diff}."
+    
+    # Explicit integration explodes at the same large step
+    explicit = create_grid(6, "PBD", large_dt)
+    try:
+        for _ in range(int(DURATION / large_dt)): explicit.simulate()
+        print(">> WARNING: Expected explicit integration to be unstable for this setting.")
+    except AssertionError:
+        print(">> Caught expected explosion of explicit integration.")
+        
+    print(">> Tests ran successfully.")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:15:08 2026
+
+Check the parallel island solver: islands are packed into balanced batches,
+and projecting the batches in threads gives the same simulation as the 
+sequential Gauss-Seidel sweep, for separate lattices and for an ensemble 
+of helper rigs.
+
+@author: bartu
+"""
+import time
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.graph import balanced_batches
+from src.simulation.numba_kernels import NUMBA_AVAILABLE
+
+def create_lattices(n, n_lattices, mode, n_threads):
+    system = MassSpringSystem(1./24, mode=mode, edge_constraint=True, substeps=2, iterations=3,
+                              backend="numba", n_threads=n_threads)
+    for k in range(n_lattices):
+        start = system.n_masses
+        x, z = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, -1, n), indexing="ij")
+        V = np.stack([x.ravel() + 2.0*k, np.zeros(n*n), z.ravel()], axis=-1)
+        system.add_masses(V, mass=1.0, gravity=True, dscale=0.9, verbose=False)
+        idx = start + np.arange(n*n).reshape(n, n)
+        edges = np.concatenate([np.stack([idx[:-1].ravel(), idx[1:].ravel()], axis=-1),
+                                np.stack([idx[:, :-1].ravel(), idx[:, 1:].ravel()], axis=-1)])
+        system.connect_many(edges, stiffness=50., damping=1.0, verbose=False)
+        system.fix_masses([idx[0, 0], idx[-1, 0]], verbose=False)
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing parallel island solver...")
+    
+    # Heaviest islands are spread over the batches
+    batch_ids, n_batches = balanced_batches([5, 1, 4, 2, 3, 3], 3)
+    loads = np.bincount(batch_ids, weights=[5, 1, 4, 2, 3, 3])
+    assert n_batches == 3 and np.all(loads == 6), f"Expected batches of equal load, got {loads}."
+    assert balanced_batches([1, 2], 8)[1] == 2, "Expected at most a batch per island."
+    
+    if not NUMBA_AVAILABLE:
+        print(">> Numba is not installed, skipping the threaded projection.")
+        raise SystemExit
+    
+    for mode in ["PBD", "XPBD"]:
+        sequential = create_lattices(6, 5, mode, n_threads=1)
+        threaded = create_lattices(6, 5, mode, n_threads=4)
+        batches = threaded.get_island_batches()
+        assert len(batches) == 4, f"Expected 4 batches, got {len(batches)}."
+        assert sum(len(order) for order in batches) == threaded.n_springs, "Expected every spring in a batch."
+        
+        for _ in range(48):
+            sequential.simulate(alpha=0.001)
+            threaded.simulate(alpha=0.001)
+        diff = np.abs(sequential.positions - threaded.positions).max()
+        assert diff < 1e-12, f"Expected threaded {mode} projection to match the sequential one, got difference {diff}."
+    
+    # Batches follow topology changes
+    threaded.connect_masses(35, 37, stiffness=50., damping=1.0, verbose=False)
+    assert sum(len(order) for order in threaded.get_island_batches()) == threaded.n_springs, "Expected new spring in a batch."
+    
+    # Timing on many islands
+    for n_threads in [1, 4]:
+        system = create_lattices(12, 32, "XPBD", n_threads=n_threads)
+        system.simulate()
+        start = time.time()
+        for _ in range(20): system.simulate()
+        print(f">> {n_threads} thread(s): {(time.time() - start) / 20 * 1000:.2f} ms per step.")
+    
+    print(">> Tests ran successfully.")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:10:37 2026
+
+Check that building a mass-spring system from mesh faces with the bulk API
+gives the same springs and the same simulation as adding the masses and
+springs one by one, without duplicate springs at the shared edges.
+
+@author: bartu
+"""
+import time
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.graph import mesh_edges, shear_edges, bending_edges
+
+def create_grid_mesh(n):
+    # Triangulated n x n grid in xz plane
+    x, z = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, -1, n), indexing="ij")
+    V = np.stack([x.ravel(), np.zeros(n*n), z.ravel()], axis=-1)
+    idx = np.arange(n*n).reshape(n, n)
+    a, b, c, d = idx[:-1, :-1].ravel(), idx[1:, :-1].ravel(), idx[1:, 1:].ravel(), idx[:-1, 1:].ravel()
+    F = np.concatenate([np.stack([a, b, c], axis=-1), np.stack([a, c, d], axis=-1)])
+    return V, F
+
+if __name__ == "__main__":
+    print(">> Testing mesh construction...")
+    n = 8
+    V, F = create_grid_mesh(n)
+    fixed_idxs = [0, (n-1)*n]
+
+    # One by one, connecting every face edge only once
+    system = MassSpringSystem(1./24)
+    for v in V:
+        system.add_mass(v, mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    connected = set()
+    for face in F:
+        for f in range(3):
+            i, j = int(face[f]), int(face[(f+1) % 3])
+            if (j, i) in connected: continue
+            connected.add((i, j))
+            system.connect_masses(i, j, stiffness=50., damping=1.0, verbose=False)
+    for idx in fixed_idxs:
+        system.fix_mass(idx, verbose=False)
+
+    bulk_system = MassSpringSystem.from_mesh(V, F, 1./24, mass=1.0, stiffness=50., damping=1.0,
+                                             dscale=0.9, gravity=True, fixed_idxs=fixed_idxs)
+    n_edges = 3*(n-1)**2 + 2*(n-1)
+    assert bulk_system.n_springs == n_edges, f"Expected {n_edges} unique springs, got {bulk_system.n_springs}."
+    assert np.all(bulk_system.edges == system.edges), "Expected the same springs in the same order."
+    assert np.all(bulk_system.fixed_indices == system.fixed_indices), "Expected the same fixed masses."
+
+    for _ in range(48):
+        system.simulate()
+        bulk_system.simulate()
+    diff = np.abs(system.positions - bulk_system.positions).max()
+    assert diff < 1e-10, f"Expected bulk construction to give the same simulation, got difference {diff}."
+
+    # Shear and bending edges
+    quad = np.array([[0, 1, 2, 3]])
+    assert len(shear_edges(quad)) == 2 and len(shear_edges(F)) == 0, "Expected quads to have two diagonals and triangles none."
+    n_interior = 3*(n-1)**2 - 2*(n-1)
+    assert len(bending_edges(F)) == n_interior, f"Expected a bending edge per interior edge, got {len(bending_edges(F))}."
+    tet_edges = mesh_edges(np.array([[0, 1, 2, 3], [1, 2, 3, 4]]), tetrahedral=True)
+    assert len(tet_edges) == 9, f"Expected two tetrahedra sharing a face to have 9 edges, got {len(tet_edges)}."
+
+    # Large meshes should be built quickly
+    V, F = create_grid_mesh(150)
+    start = time.time()
+    bulk_system = MassSpringSystem.from_mesh(V, F, 1./24, bending=True, verbose=False)
+    print(f">> Built {bulk_system.n_masses} masses and {bulk_system.n_springs} springs in {time.time() - start:.3f} seconds.")
+
+    print(">> Tests ran successfully.")
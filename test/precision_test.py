@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:40:16 2026
+
+Check the single precision mode: the simulation, skinning and kinematics 
+arrays keep the float32 dtype through the pipeline, and the maximum vertex 
+deviation from the float64 results stays small.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.skeleton import Skeleton
+from src.skinning import LBS_from_mat
+from src.kinematics.inverse_kinematics import get_absolute_transformations
+from src.utils.precision import set_default_dtype, get_default_dtype, compare_precision, max_deviation, torch_dtype
+
+def create_lattice(n, mode, dtype):
+    x, z = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, -1, n), indexing="ij")
+    V = np.stack([x.ravel(), np.zeros(n*n), z.ravel()], axis=-1)
+    idx = np.arange(n*n).reshape(n, n)
+    F = np.stack([idx[:-1, :-1].ravel(), idx[1:, :-1].ravel(), idx[1:, 1:].ravel(), idx[:-1, 1:].ravel()], axis=-1)
+    system = MassSpringSystem.from_mesh(V, F, 1./24, mass=1.0, stiffness=20., damping=1.0, dscale=0.95, gravity=True, 
+                                        fixed_idxs=[0, (n-1)*n], mode=mode, edge_constraint=mode in ("PBD", "XPBD"),
+                                        substeps=2, iterations=2, dtype=dtype, verbose=False)
+    system.connect_masses(1, n+1, stiffness=20., damping=1.0, verbose=False) # Springs can be added one by one
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing single precision...")
+    
+    for mode in ["PBD", "XPBD", "PD", "IMPLICIT"]:
+        single = create_lattice(6, mode, np.float32)
+        double = create_lattice(6, mode, "float64")
+        for _ in range(48):
+            single.simulate()
+            double.simulate()
+        for name in MassSpringSystem._FLOAT_ARRAYS:
+            assert getattr(single, name).dtype == np.float32, f"Expected {name} to stay float32 in {mode}, got {getattr(single, name).dtype}."
+        deviation = max_deviation(single.positions, double.positions)
+        assert deviation < 1e-3, f"Expected float32 {mode} simulation to be close to float64, got deviation {deviation}."
+    
+    # Skinning a large mesh
+    rng = np.random.default_rng(0)
+    n_verts, n_bones = 20000, 24
+    V = rng.random((n_verts, 3))
+    W = rng.random((n_verts, n_bones))
+    W /= W.sum(axis=1, keepdims=True)
+    skeleton = Skeleton(root_vec=[0., 0., 1.], dtype=np.float32)
+    for b in range(1, n_bones):
+        skeleton.insert_bone(rng.random(3) + [0., 0., 1.], b - 1)
+    rest = skeleton.pose_bones(np.zeros((n_bones, 3)))
+    posed = skeleton.pose_bones(rng.normal(scale=0.3, size=(n_bones, 3)))
+    assert posed.dtype == np.float32, f"Expected float32 bone locations, got {posed.dtype}."
+    
+    M = get_absolute_transformations(rest, posed, return_mat=True, algorithm="RST", dtype=np.float32)
+    assert M.dtype == np.float32, f"Expected float32 transformations, got {M.dtype}."
+    V_posed, deviation = compare_precision(LBS_from_mat, V, W, M, dtype=np.float32)
+    assert V_posed.dtype == np.float32, f"Expected float32 skinned vertices, got {V_posed.dtype}."
+    assert deviation < 1e-4, f"Expected float32 skinning to be close to float64, got deviation {deviation}."
+    
+    # Default policy
+    assert get_default_dtype() == np.float64, "Expected float64 to be the default dtype."
+    set_default_dtype("float32")
+    assert MassSpringSystem(1./24).positions.dtype == np.float32, "Expected the system to follow the default dtype."
+    assert str(torch_dtype()) == "torch.float32", "Expected the torch dtype to follow the default dtype."
+    set_default_dtype(np.float64)
+    
+    print(">> Tests ran successfully.")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:37:52 2026
+
+Check that Projective Dynamics converges to the implicit Euler solution with
+enough local-global iterations, and that its factorization is cached.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+
+def create_grid(n, mode, iterations=1):
+    system = MassSpringSystem(1./24, mode=mode, iterations=iterations)
+    for i in range(n):
+        for j in range(n):
+            system.add_mass([i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n: system.connect_masses(i*n + j, (i+1)*n + j, stiffness=3000., damping=0.0, verbose=False)
+            if j + 1 < n: system.connect_masses(i*n + j, i*n + j + 1, stiffness=3000., damping=0.0, verbose=False)
+    system.fix_mass(0, verbose=False)
+    system.fix_mass((n-1)*n, verbose=False)
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing Projective Dynamics...")
+    N_STEPS = 24 * 5
+    
+    implicit = create_grid(6, "IMPLICIT")
+    pd = create_grid(6, "PD", iterations=50)
+    for _ in range(N_STEPS):
+        implicit.simulate_implicit(tol=1e-12)
+        pd.simulate()
+    diff = np.abs(implicit.positions - pd.positions).max()
+    assert diff < 1e-5, f"Expected converged PD to match implicit Euler, got difference {diff}."
+    
+    # Factorization is reused between steps and rebuilt after topology changes
+    solver = pd._pd_solver
+    pd.simulate()
+    assert pd._pd_solver is solver, "Expected PD factorization to be cached."
+    pd.connect_masses(0, 35, verbose=False)
+    pd.simulate()
+    assert pd._pd_solver is not solver, "Expected PD factorization to be rebuilt after topology change."
+    
+    print(">> Tests ran successfully.")
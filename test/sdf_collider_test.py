@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:08:44 2026
+
+Check the signed distance field colliders: trilinear lookups match the
+exact distances and normals, particles rest on the surface of a moved
+collider, and cached grids are loaded back by the hash of the mesh.
+
+@author: bartu
+"""
+import os
+import tempfile
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.colliders import SDFCollider, _sdf_cache_key
+
+def sphere_sdf_grid(radius, resolution):
+    # Exact distances of a sphere at the origin, instead of a mesh
+    origin = np.full(3, -2.0 * radius)
+    spacing = 4.0 * radius / (resolution - 1)
+    axes = origin[0] + spacing * np.arange(resolution)
+    points = np.stack(np.meshgrid(axes, axes, axes, indexing="ij"), axis=-1)
+    return np.linalg.norm(points, axis=-1) - radius, origin, spacing
+
+if __name__ == "__main__":
+    print(">> Testing SDF colliders...")
+    rng = np.random.default_rng(7)
+    collider = SDFCollider(*sphere_sdf_grid(0.5, 65))
+
+    # Lookups match the sphere away from its center, and the outside is far
+    points = rng.normal(size=(1000, 3))
+    points *= rng.uniform(0.3, 0.9, (1000, 1)) / np.linalg.norm(points, axis=-1, keepdims=True)
+    distances, gradients = collider.sample(points)
+    exact = np.linalg.norm(points, axis=-1) - 0.5
+    assert np.abs(distances - exact).max() < 1e-3, f"Expected trilinear distances to match, got error {np.abs(distances - exact).max()}."
+    normals = points / np.linalg.norm(points, axis=-1, keepdims=True)
+    assert np.all(np.sum(gradients * normals, axis=-1) > 0.99), "Expected gradients to be the sphere normals."
+    assert np.all(np.isinf(collider.sample(np.array([[1.5, 0., 0.]]))[0])), "Expected points outside the grid to be far."
+
+    # Falling particles rest on the moved sphere in PBD and XPBD
+    collider.set_transform(translation=[0., -1., 0.])
+    for mode in ["PBD", "XPBD"]:
+        system = MassSpringSystem(1./24, mode=mode, substeps=4)
+        system.add_masses([[0., 0., 0.], [0., 0.2, 0.]], mass=1.0, gravity=[0., -9.81, 0.], radius=0.05, verbose=False)
+        system.fix_mass(1, verbose=False)
+        system.add_collider(collider)
+        for _ in range(96):
+            system.simulate()
+        height = system.positions[0, 1]
+        assert abs(height - (-0.45)) < 1e-2, f"Expected {mode} particle to rest on the sphere, got height {height}."
+        assert np.all(system.positions[1] == [0., 0.2, 0.]), "Expected fixed particle to stay in place."
+
+    # Cached grid is loaded without computing the distances again
+    V = rng.random((4, 3))
+    F = np.array([[0, 1, 2], [0, 2, 3], [0, 3, 1], [1, 3, 2]])
+    with tempfile.TemporaryDirectory() as cache_dir:
+        collider.save(os.path.join(cache_dir, f"sdf_{_sdf_cache_key(V, F, 65, 0.1)}.npz"))
+        cached = SDFCollider.from_mesh(V, F, resolution=65, padding=0.1, cache_dir=cache_dir)
+    assert np.array_equal(cached.sdf, collider.sdf) and np.array_equal(cached.gradients, collider.gradients), "Expected the cached grid to be loaded."
+    assert _sdf_cache_key(V + 1e-3, F, 65, 0.1) != _sdf_cache_key(V, F, 65, 0.1), "Expected a different key for a different mesh."
+
+    print(">> Tests ran successfully.")
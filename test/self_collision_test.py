@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:52:09 2026
+
+Check the particle self-collision: the spatial hash finds the same contacts 
+as testing all pairs, colliding particles are pushed apart in PBD and XPBD,
+connected particles, collision groups and ensemble copies don't collide.
+
+@author: bartu
+"""
+import time
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.simulation.collision import find_contacts
+from src.simulation.ensemble import EnsembleMassSpringSystem
+
+def brute_force_contacts(P, radii):
+    distances = np.linalg.norm(P[:, None] - P[None], axis=-1)
+    i, j = np.nonzero(np.triu(distances < radii[:, None] + radii[None], k=1))
+    return np.stack([i, j], axis=-1)
+
+def min_gap(system):
+    # Smallest distance minus the contact distance over the unconnected pairs
+    P, r = system.positions, system.radii
+    gaps = np.linalg.norm(P[:, None] - P[None], axis=-1) - (r[:, None] + r[None])
+    gaps[np.diag_indices(len(P))] = np.inf
+    gaps[system.edges[:, 0], system.edges[:, 1]] = np.inf
+    gaps[system.edges[:, 1], system.edges[:, 0]] = np.inf
+    return gaps.min()
+
+if __name__ == "__main__":
+    print(">> Testing self-collision...")
+    rng = np.random.default_rng(3)
+    
+    # Broad phase finds all the overlapping pairs
+    P = rng.random((400, 3))
+    radii = rng.uniform(0.01, 0.04, 400)
+    contacts = find_contacts(P, radii)
+    expected = brute_force_contacts(P, radii)
+    assert len(contacts) > 0 and np.array_equal(contacts, expected), "Expected spatial hash to find the same contacts as all pairs."
+    
+    excluded = contacts[:3, 0] * len(P) + contacts[:3, 1]
+    assert len(find_contacts(P, radii, excluded_keys=np.sort(excluded))) == len(contacts) - 3, "Expected excluded pairs to be ignored."
+    
+    # Groups have separate grids, stacked copies only find the contacts of their own group
+    groups = np.repeat(np.arange(4), len(P))
+    grouped = find_contacts(np.tile(P, (4, 1)), np.tile(radii, 4), groups=groups)
+    expected = np.concatenate([contacts + k * len(P) for k in range(4)])
+    assert np.array_equal(grouped, expected), "Expected the contacts of every group and none across the groups."
+    
+    # Overlapping cluster is pushed apart, the chain links don't collide
+    for mode in ["PBD", "XPBD"]:
+        system = MassSpringSystem(1./24, mode=mode, edge_constraint=True, substeps=4, self_collision=True)
+        system.add_masses(rng.random((60, 3)) * 0.3, mass=1.0, dscale=0.5, radius=0.05, verbose=False)
+        system.connect_many([[0, 1], [1, 2]], stiffness=10., damping=1.0, verbose=False)
+        assert min_gap(system) < -0.05, "Expected the initial particles to overlap."
+        for _ in range(48):
+            system.simulate()
+        gap = min_gap(system)
+        assert gap > -1e-2, f"Expected {mode} self-collision to separate the particles, got gap {gap}."
+        assert np.all(np.isfinite(system.positions))
+    
+    # Ensemble copies share the space but don't collide with each other
+    system = MassSpringSystem(1./24, self_collision=True)
+    system.add_masses([[0., 0., 0.], [0.2, 0., 0.]], mass=1.0, radius=0.05, verbose=False)
+    ensemble = EnsembleMassSpringSystem(system, 3)
+    ensemble.simulate()
+    assert len(ensemble.system.contacts) == 0, "Expected copies to not collide with each other."
+    
+    # Timing of a dense cluster
+    system = MassSpringSystem(1./24, self_collision=True)
+    system.add_masses(rng.random((20000, 3)) * 2.0, mass=1.0, radius=0.02, verbose=False)
+    start = time.time()
+    system.simulate()
+    print(f">> Resolved {len(system.contacts)} contacts of {system.n_masses} particles in {time.time() - start:.3f} seconds.")
+    
+    print(">> Tests ran successfully.")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:37:12 2026
+
+Check the island sleeping of the mass-spring system: two separate lattices 
+fall asleep after they settle, a lattice wakes up when its fixed particles 
+move while the other one keeps sleeping, and the motion stays close to the 
+simulation without sleeping.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+
+def create_lattices(n, sleep_threshold, mode="PBD"):
+    # Two n x n lattices hanging from their corners, side by side
+    system = MassSpringSystem(1./24, mode=mode, edge_constraint=True, substeps=2, iterations=2,
+                              sleep_threshold=sleep_threshold, sleep_frames=5)
+    for offset in [0.0, 2.0]:
+        start = system.n_masses
+        for i in range(n):
+            for j in range(n):
+                system.add_mass([offset + i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, dscale=0.8, verbose=False)
+        idx = start + np.arange(n*n).reshape(n, n)
+        edges = np.concatenate([np.stack([idx[:-1].ravel(), idx[1:].ravel()], axis=-1),
+                                np.stack([idx[:, :-1].ravel(), idx[:, 1:].ravel()], axis=-1)])
+        system.connect_many(edges, stiffness=50., damping=1.0, verbose=False)
+        system.fix_masses([idx[0, 0], idx[-1, 0]], verbose=False)
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing island sleeping...")
+    n = 5
+    for mode in ["PBD", "XPBD"]:
+        system = create_lattices(n, sleep_threshold=1e-6, mode=mode)
+        reference = create_lattices(n, sleep_threshold=None, mode=mode)
+        vertex_islands, edge_islands, n_islands = system.get_islands()
+        assert n_islands == 2, f"Expected two islands, got {n_islands}."
+        assert np.all(vertex_islands[system.fixed_indices] == -1), "Expected fixed particles to not belong to islands."
+        
+        for _ in range(400):
+            system.simulate()
+            reference.simulate()
+        assert np.all(system._sleeping), "Expected the settled lattices to sleep."
+        diff = np.abs(system.positions - reference.positions).max()
+        assert diff < 1e-2, f"Expected sleeping lattices to stay close to the reference, got difference {diff}."
+        
+        # Sleeping lattices don't move
+        resting = system.positions.copy()
+        system.simulate()
+        assert np.all(system.positions == resting), "Expected sleeping particles to keep their locations."
+        
+        # Moving a fixed particle of the first lattice wakes only the first island
+        driver = system.fixed_indices[:1]
+        for step in range(24):
+            target = system.positions[driver] + [0.0, 0.02, 0.0]
+            system.set_kinematic_positions(driver, target)
+            reference.set_kinematic_positions(driver, target)
+            assert not system._sleeping[0], "Expected moving a fixed particle to wake its island before the step."
+            system.simulate()
+            reference.simulate()
+            assert not system._sleeping[0] and system._sleeping[1], "Expected only the driven island to wake up."
+        second = vertex_islands == 1
+        assert np.all(system.positions[second] == resting[second]), "Expected the other island to keep sleeping."
+        first = vertex_islands == 0
+        diff = np.abs(system.positions[first] - reference.positions[first]).max()
+        assert diff < 1e-2, f"Expected the woken island to follow the reference, got difference {diff}."
+        
+        # Topology changes wake every island
+        system.connect_masses(n*n - 1, n*n + 1, stiffness=50., damping=1.0, verbose=False)
+        assert system._sleeping is None and system.get_islands()[2] == 1, "Expected the islands to be merged and awake."
+        
+    print(">> Tests ran successfully.")
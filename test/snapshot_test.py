@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:46:13 2026
+
+Check the snapshots of the simulation state: continuing from a restored
+snapshot, or from its checkpoint file, gives the same frames as the
+uninterrupted simulation, for a lattice, float32 and float64 helper rigs and
+an ensemble rig.
+
+@author: bartu
+"""
+import os
+import tempfile
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.skeleton import Skeleton, add_helper_bones
+from src.helper_handler import HelperBonesHandler, EnsembleHelperBonesHandler
+
+def create_rig():
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    arm = skeleton.insert_bone([1., 0., 1.], 0)
+    forearm = skeleton.insert_bone([2., 0., 1.], arm)
+    helper_idxs = add_helper_bones(skeleton, [[1.5, 0.5, 1.], [2.5, 0.5, 1.]], [arm, forearm],
+                                   startpoints=[[1., 0., 1.], [2., 0., 1.]])
+    return skeleton, helper_idxs
+
+def animate(skeleton, handler, frames):
+    locations = []
+    for frame in frames:
+        theta = np.zeros((len(skeleton.rest_bones), 3))
+        theta[1] = [0., 0., 0.5 * np.sin(frame / 5)]
+        locations.append(handler.update_bones(skeleton.pose_bones(theta)))
+    return np.array(locations)
+
+if __name__ == "__main__":
+    print(">> Testing snapshots...")
+    
+    # XPBD lattice, including the multipliers
+    system = MassSpringSystem(1./24, mode="XPBD", edge_constraint=True, substeps=2)
+    n = 5
+    x, z = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, -1, n), indexing="ij")
+    system.add_masses(np.stack([x.ravel(), np.zeros(n*n), z.ravel()], axis=-1), mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    idx = np.arange(n*n).reshape(n, n)
+    system.connect_many(np.concatenate([np.stack([idx[:-1].ravel(), idx[1:].ravel()], axis=-1), 
+                                        np.stack([idx[:, :-1].ravel(), idx[:, 1:].ravel()], axis=-1)]), 
+                        stiffness=50., damping=1.0, verbose=False)
+    system.fix_masses([0, (n-1)*n], verbose=False)
+    for _ in range(12): system.simulate(alpha=1e-3)
+    state = system.snapshot()
+    for _ in range(12): system.simulate(alpha=1e-3)
+    expected = system.positions.copy()
+    system.restore(state)
+    for _ in range(12): system.simulate(alpha=1e-3)
+    assert np.array_equal(system.positions, expected), "Expected the restored lattice to repeat the same frames."
+    assert not np.shares_memory(system.positions, state), "Expected the snapshot to be kept after the restore."
+    
+    other = MassSpringSystem(1./24)
+    other.add_masses(np.zeros((3, 3)), verbose=False)
+    try:
+        other.restore(state)
+        raise RuntimeError("Expected restoring another topology to fail.")
+    except AssertionError:
+        pass
+    
+    # Counts of the header are exact in float32, also above 2**24
+    single = MassSpringSystem(1./24, dtype=np.float32)
+    single.add_masses(np.zeros((3, 3)), verbose=False)
+    state = single.snapshot()
+    state[:6] = np.array([2**24 + 1, 0, 0], dtype=np.int64).view(np.float32)
+    try:
+        single.restore(state)
+        raise RuntimeError("Expected restoring another topology to fail.")
+    except AssertionError as error:
+        assert "got 16777217 and 0" in str(error), f"Expected the exact count in the header, got '{error}'."
+    
+    # Float32 helper rigs keep the header of their system exact
+    skeleton, helper_idxs = create_rig()
+    handler = HelperBonesHandler(skeleton, helper_idxs, point_spring=False, dtype=np.float32)
+    animate(skeleton, handler, range(10))
+    state = handler.snapshot()
+    assert state.dtype == np.float32, f"Expected a float32 snapshot, got {state.dtype}."
+    expected = animate(skeleton, handler, range(10, 20))
+    handler.restore(state)
+    assert np.array_equal(handler.snapshot(), state), "Expected the float32 rig to restore its snapshot."
+    diff = np.abs(animate(skeleton, handler, range(10, 20)) - expected).max()
+    assert diff < 1e-4, f"Expected the float32 rig to repeat the frames up to float32 rounding, got difference {diff}."
+    
+    # Helper rigs continue from a checkpoint file
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        for Handler, kwargs in [(HelperBonesHandler, {}), (EnsembleHelperBonesHandler, {"n_copies" : 3, "stiffness" : [20., 50., 100.]})]:
+            skeleton, helper_idxs = create_rig()
+            handler = Handler(skeleton, helper_idxs, point_spring=False, fixed_scale=True, **kwargs)
+            path = os.path.join(checkpoint_dir, f"{Handler.__name__}.npy")
+            
+            animate(skeleton, handler, range(30))
+            handler.snapshot(path)
+            expected = animate(skeleton, handler, range(30, 50))
+            
+            skeleton, helper_idxs = create_rig()
+            restored = Handler(skeleton, helper_idxs, point_spring=False, fixed_scale=True, **kwargs)
+            restored.restore(path)
+            frames = animate(skeleton, restored, range(30, 50))
+            assert np.array_equal(frames, expected), f"Expected {Handler.__name__} to continue from the checkpoint."
+            
+            # The memory mapped checkpoint is read-only, restoring without a copy still simulates
+            restored.restore(path, copy=False)
+            frames = animate(skeleton, restored, range(30, 50))
+            assert np.array_equal(frames, expected), f"Expected {Handler.__name__} to continue from the checkpoint without a copy."
+    
+    print(">> Tests ran successfully.")
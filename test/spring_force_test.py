@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 11:40:27 2026
+
+Compare the vectorized spring force kernel with the per-spring reference
+implementation, i.e. the force computation the Spring class used to have.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+
+def _reference_forces(system, tol=1e-12):
+    # Evaluates every spring twice, once for each of its endpoints
+    forces = np.zeros((system.n_masses, 3))
+    for i in range(system.n_masses):
+        if system.particle_masses[i] < 1e-20:
+            continue
+        for spring_idx, (m1, m2) in enumerate(system.edges):
+            if i != m1 and i != m2:
+                continue
+            distance = np.linalg.norm(system.positions[m1] - system.positions[m2])
+            spring_force_amount = (distance - system.rest_lengths[spring_idx]) * system.stiffnesses[spring_idx] * system.spring_dscales[spring_idx]
+            distance = max(distance, tol)
+            normalized_dir = (system.positions[m2] - system.positions[m1]) / distance
+            s1 = np.dot(system.velocities[m1], normalized_dir)
+            s2 = np.dot(system.velocities[m2], normalized_dir)
+            damping_force_amount = -system.dampings[spring_idx] * (s1 + s2)
+            if i == m1: forces[i] += (spring_force_amount + damping_force_amount) * normalized_dir
+            else:       forces[i] += (-spring_force_amount + damping_force_amount) * normalized_dir
+        forces[i] += system.particle_masses[i] * system.gravities[i]
+    return forces
+
+if __name__ == "__main__":
+    print(">> Testing vectorized spring forces...")
+    np.random.seed(0)
+    
+    n_samples = 10
+    n_masses, n_springs = 40, 120
+    for _ in range(n_samples):
+        system = MassSpringSystem(1./24)
+        for i in range(n_masses):
+            system.add_mass(np.random.rand(3), mass=np.random.rand() + 0.5, 
+                            gravity=True, verbose=False)
+        for _ in range(n_springs):
+            m1, m2 = np.random.choice(n_masses, 2, replace=False)
+            system.connect_masses(int(m1), int(m2), stiffness=np.random.rand() * 100,
+                                  damping=np.random.rand(), dscale=np.random.rand() * 2,
+                                  verbose=False)
+        # Add a point spring, and fix a few masses
+        system.connect_masses(0, n_masses - 1, verbose=False)
+        system.positions[0] = system.positions[n_masses - 1]
+        for i in range(5): system.fix_mass(i, verbose=False)
+        
+        system.positions += np.random.randn(n_masses, 3) * 0.1
+        system.velocities = np.random.randn(n_masses, 3)
+        
+        diff = np.abs(system.get_spring_forces() - _reference_forces(system)).max()
+        assert diff < 1e-9, f"Expected vectorized forces to match the reference, got difference {diff}."
+    
+    print(">> Tests ran successfully.")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:02:14 2026
+
+Check that the Taichi backend gives the same simulation as the NumPy kernels,
+for a mass-spring lattice with both constraint solvers and for a helper bone rig.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+from src.helper_handler import HelperBonesHandler
+from src.skeleton import Skeleton, add_helper_bones
+
+def create_grid(n, mode, backend, constraint_solver):
+    system = MassSpringSystem(1./24, mode=mode, edge_constraint=True, constraint_solver=constraint_solver,
+                              substeps=4, iterations=3, backend=backend)
+    for i in range(n):
+        for j in range(n):
+            system.add_mass([i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, dscale=0.9, verbose=False)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n: system.connect_masses(i*n + j, (i+1)*n + j, stiffness=50., damping=1.0, verbose=False)
+            if j + 1 < n: system.connect_masses(i*n + j, i*n + j + 1, stiffness=50., damping=1.0, verbose=False)
+    system.fix_mass(0, verbose=False)
+    system.fix_mass((n-1)*n, verbose=False)
+    return system
+
+def animate_rig(backend, n_steps=40):
+    skeleton = Skeleton(root_vec=[0., 0., 1.])
+    b1 = skeleton.insert_bone([0., 1., 1.], 0)
+    b2 = skeleton.insert_bone([0., 2., 1.5], b1)
+    helper_idxs = add_helper_bones(skeleton, np.array([[0.3, 1.2, 1.0], [0.5, 1.4, 1.0]]), [b1, b2])
+    handler = HelperBonesHandler(skeleton, helper_idxs, fixed_scale=True, edge_constraint=True,
+                                 compliance=0.01, mass_dscale=0.8, backend=backend)
+
+    n_bones = len(skeleton.rest_bones)
+    locations = []
+    for step in range(n_steps):
+        theta = np.zeros((n_bones, 3))
+        theta[1] = [0.3*np.sin(step/5.), 0.2, 0.0]
+        rigid_locations = skeleton.pose_bones(theta, np.zeros((n_bones, 3)), degrees=False)
+        locations.append(handler.update_bones(rigid_locations))
+    return np.array(locations)
+
+if __name__ == "__main__":
+    print(">> Testing Taichi backend...")
+    try:
+        import taichi
+    except ImportError:
+        print(">> Taichi is not installed, skipping the test.")
+        raise SystemExit
+    N_STEPS = 48
+
+    for mode in ["PBD", "XPBD"]:
+        for constraint_solver in ["GAUSS-SEIDEL", "JACOBI"]:
+            numpy_system = create_grid(6, mode, "numpy", constraint_solver)
+            taichi_system = create_grid(6, mode, "taichi", constraint_solver)
+            assert taichi_system.backend == "TAICHI", "Expected the Taichi backend to be selected."
+
+            for _ in range(N_STEPS):
+                numpy_system.simulate(alpha=0.001)
+                taichi_system.simulate(alpha=0.001)
+            diff = np.abs(numpy_system.positions - taichi_system.positions).max()
+            assert diff < 1e-10, f"Expected Taichi and NumPy {mode} simulations to match with {constraint_solver}, got difference {diff}."
+            if mode == "XPBD":
+                assert taichi_system.solver_info["iterations"] == numpy_system.solver_info["iterations"], "Expected the same number of XPBD iterations."
+
+    diff = np.abs(animate_rig("numpy") - animate_rig("taichi")).max()
+    assert diff < 1e-10, f"Expected Taichi and NumPy helper rigs to match, got difference {diff}."
+
+    print(">> Tests ran successfully.")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 18:45:33 2026
+
+Sanity checks for the substepped XPBD solver on a hanging grid lattice.
+
+@author: bartu
+"""
+import numpy as np
+
+import __init__
+from src.mass_spring import MassSpringSystem
+
+def create_grid(n, mode, damping=5.0, **kwargs):
+    system = MassSpringSystem(1./24, mode=mode, edge_constraint=True, **kwargs)
+    for i in range(n):
+        for j in range(n):
+            system.add_mass([i / (n-1), 0.0, -j / (n-1)], mass=1.0, gravity=True, verbose=False)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n: system.connect_masses(i*n + j, (i+1)*n + j, stiffness=300., damping=damping, verbose=False)
+            if j + 1 < n: system.connect_masses(i*n + j, i*n + j + 1, stiffness=300., damping=damping, verbose=False)
+    system.fix_mass(0, verbose=False)
+    system.fix_mass((n-1)*n, verbose=False)
+    return system
+
+if __name__ == "__main__":
+    print(">> Testing XPBD solver...")
+    N_STEPS = 48
+    
+    # Single substep and iteration is the same as PBD
+    pbd, xpbd = create_grid(6, "PBD"), create_grid(6, "XPBD")
+    for _ in range(N_STEPS):
+        pbd.simulate(alpha=0.001)
+        xpbd.simulate(alpha=0.001)
+    diff = np.abs(pbd.positions - xpbd.positions).max()
+    assert diff < 1e-12, f"Expected XPBD with a single substep to match PBD, got difference {diff}."
+    
+    # More iterations should leave a smaller residual
+    residuals = []
+    for iterations in [1, 4, 16]:
+        system = create_grid(6, "XPBD", iterations=iterations)
+        for _ in range(N_STEPS): system.simulate()
+        residuals.append(system.solver_info["residual"])
+    assert residuals[0] > residuals[1] > residuals[2], f"Expected residuals to decrease with iterations, got {residuals}."
+    
+    # Early exit with tolerance
+    system = create_grid(6, "XPBD", iterations=500, tolerance=1e-3)
+    system.simulate()
+    assert system.solver_info["iterations"] < 500 and system.solver_info["residual"] < 1e-3
+    
+    # Heavy damping that explodes PBD at 24 fps stays stable with substeps
+    system = create_grid(8, "XPBD", damping=30.0, substeps=4, iterations=2)
+    for _ in range(N_STEPS * 2): system.simulate()
+    assert np.all(np.isfinite(system.positions)) and np.abs(system.positions).max() < 10.0
+    
+    print(">> Tests ran successfully.")